@@ -14,7 +14,7 @@ socketio = SocketIO(cors_allowed_origins="*")
 
 # --- Import models agar Flask-Migrate dapat menemukannya ---
 # Ini sangat penting untuk perintah CLI seperti 'flask db migrate'
-from apps.home.models import AlarmLog, GlobalSettings, Camera, AIModel, Count
+from apps.home.models import AlarmLog, GlobalSettings, Camera, AIModel, Count, CountRollup
 
 # --- Fungsi-fungsi Pembantu ---
 def register_extensions(app):
@@ -46,6 +46,12 @@ def create_app(config):
 
     # Inisialisasi Flask-Migrate setelah ekstensi didaftarkan
     Migrate(app, db)
+
+    # Perintah CLI: flask rebuild-rollups (backfill rollup dari tabel Count)
+    # dan flask check-rollups (verifikasi rollup terhadap tabel Count)
+    from apps.home.rollup import rebuild_rollups_command, check_rollups_command
+    app.cli.add_command(rebuild_rollups_command)
+    app.cli.add_command(check_rollups_command)
     
     # Jika menggunakan github login
     try:
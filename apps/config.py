@@ -21,8 +21,33 @@ class Config(object):
     #SQLALCHEMY_TRACK_MODIFICATIONS = False 
     
     # Assets Management
-    ASSETS_ROOT = os.getenv('ASSETS_ROOT', '/static/assets') 
-    
+    ASSETS_ROOT = os.getenv('ASSETS_ROOT', '/static/assets')
+
+    # Penjadwalan inferensi: total core CPU untuk AI (dibagi ke semua kamera aktif)
+    AI_CPU_BUDGET = float(os.getenv('AI_CPU_BUDGET', os.cpu_count() or 1))
+    AI_MAX_FPS = float(os.getenv('AI_MAX_FPS', 15))
+    AI_MAX_STRIDE = int(os.getenv('AI_MAX_STRIDE', 30))
+
+    # Inferensi batch lintas kamera untuk model YOLO yang sama
+    AI_BATCH_INFERENCE = os.getenv('AI_BATCH_INFERENCE', 'True') == 'True'
+    AI_BATCH_MAX_SIZE = int(os.getenv('AI_BATCH_MAX_SIZE', 8))
+    AI_BATCH_MAX_WAIT_MS = float(os.getenv('AI_BATCH_MAX_WAIT_MS', 10))
+
+    # Jumlah model idle (tidak dipakai kamera mana pun) yang tetap disimpan di memori
+    AI_MODEL_IDLE_CACHE = int(os.getenv('AI_MODEL_IDLE_CACHE', 2))
+
+    # Backend ONNX Runtime untuk model YOLO .pt (diekspor sekali, di-cache per hash file).
+    # Membutuhkan paket onnx, onnxruntime, dan onnxslim yang tidak ada di requirements.txt
+    AI_ONNX_RUNTIME = os.getenv('AI_ONNX_RUNTIME', 'False') == 'True'
+    AI_ONNX_INT8 = os.getenv('AI_ONNX_INT8', 'False') == 'True'
+    AI_ONNX_THREADS = int(os.getenv('AI_ONNX_THREADS', 0))  # 0 = ikuti AI_CPU_BUDGET
+
+    # Penulisan event (Count, AlarmLog, FileRecord) secara batch di luar jalur video
+    AI_DB_BATCH_SIZE = int(os.getenv('AI_DB_BATCH_SIZE', 50))
+    AI_DB_FLUSH_INTERVAL_MS = float(os.getenv('AI_DB_FLUSH_INTERVAL_MS', 1000))
+    AI_DB_MAX_QUEUE = int(os.getenv('AI_DB_MAX_QUEUE', 10000))
+    AI_DB_RETRIES = int(os.getenv('AI_DB_RETRIES', 5))
+
     # Konfigurasi Social Authentication Github
     SOCIAL_AUTH_GITHUB = False
     GITHUB_ID = os.getenv('GITHUB_ID')
@@ -228,8 +228,8 @@ def ai_stream(socketio, app, cam_id, rtsp_url, stop_event, client_sids):
 
     with app.app_context():
         today = datetime.date.today()
-        daily_in = Count.query.filter(Count.camera_id == cam_id, Count.direction == 'in', db.func.date(Count.timestamp) == today).count()
-        daily_out = Count.query.filter(Count.camera_id == cam_id, Count.direction == 'out', db.func.date(Count.timestamp) == today).count()
+        daily_in = Count.query.filter(Count.camera_id == cam_id, Count.direction == 'in', Count.on_day(today)).count()
+        daily_out = Count.query.filter(Count.camera_id == cam_id, Count.direction == 'out', Count.on_day(today)).count()
 
     total_counts[cam_id] = {'in': daily_in, 'out': daily_out}
     socketio.emit('ai_count_update', {'cam_id': cam_id, 'counts': total_counts[cam_id]})
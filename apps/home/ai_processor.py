@@ -3,20 +3,35 @@
 # -*- encoding: utf-8 -*-
 import os
 import cv2
+import numpy as np
 import threading
 import time
 import json
 import logging
 import base64
-import math
 import requests
 import datetime
 import subprocess
 from ultralytics import YOLO
 from flask_socketio import SocketIO
-from .models import AlarmLog, Camera, AIModel, Count, GlobalSettings, FileRecord
+from .models import AlarmLog, Count, FileRecord
 from .yolov5_processor import YOLOv5Processor
 from .ssdmobilenet_processor import SSDMobileNetProcessor
+from .yolov3_processor import YOLOv3Processor
+from .capture import capture_hub, STREAMING as CAPTURE_STREAMING, BACKOFF as CAPTURE_BACKOFF, FAILED as CAPTURE_FAILED
+from .scheduler import InferenceScheduler
+from .motion import MotionGate
+from .roi import RegionOfInterest
+from .tiling import TileGrid, merge_detections, detections_from_dicts
+from .flow import FlowTracker
+from .object_tracker import ObjectTracker
+from .counting import LineCounter
+from .event_writer import event_writer
+from .config_cache import config_cache
+from .rollup import daily_totals
+from .inference_server import TrackingClient, acquire_inference_server
+from .model_registry import model_registry, model_key
+from .onnx_backend import resolve_runtime_model
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -92,60 +107,213 @@ def download_ssdmobilenet_if_not_exists():
     
     return all_downloaded, model_path, config_path, labels_path
 
-# --- Fungsi-fungsi lainnya (draw_counting_line, check_line_crossing, execute_action) tidak berubah ---
-def draw_counting_line(frame, line_coords):
-    if line_coords and 'x1' in line_coords and 'y1' in line_coords and 'x2' in line_coords and 'y2' in line_coords:
-        h, w, _ = frame.shape
-        start_point = (int(line_coords['x1'] * w), int(line_coords['y1'] * h))
-        end_point = (int(line_coords['x2'] * w), int(line_coords['y2'] * h))
-        
-        cv2.line(frame, start_point, end_point, (0, 0, 255), 2)
-        mid_point_x = int((start_point[0] + end_point[0]) / 2)
-        mid_point_y = int((start_point[1] + end_point[1]) / 2)
-
-        font = cv2.FONT_HERSHEY_SIMPLEX
-        font_scale = 0.4
-        font_thickness = 1
-        text_color = (255, 255, 255)
+def _warmup_processor(processor):
+    # Inferensi dummy agar alokasi memori dan inisialisasi backend tidak terjadi di frame pertama
+    processor.process_frame(np.zeros((640, 640, 3), dtype=np.uint8))
 
-        dx = end_point[0] - start_point[0]
-        dy = end_point[1] - start_point[1]
-        
-        offset = 20
-        length = (dx**2 + dy**2)**0.5
-        if length == 0:
-            return
-        
-        offset_x = int((-dy / length) * offset)
-        offset_y = int((dx / length) * offset)
+def load_yolo_model(model_path, app):
+    """
+    Memuat model YOLO untuk satu kamera lewat inference server bersama. Jika
+    AI_BATCH_INFERENCE aktif, frame dari semua kamera digabung menjadi batch;
+    jika tidak, server memproses satu frame per panggilan. Kamera hanya
+    memegang TrackingClient dengan tracker miliknya sendiri. Jika
+    AI_ONNX_RUNTIME aktif, file .pt diekspor sekali ke ONNX dan dijalankan
+    dengan ONNX Runtime.
+    """
+    batched = app.config.get('AI_BATCH_INFERENCE')
+    runtime_path = resolve_runtime_model(
+        model_path,
+        enabled=app.config.get('AI_ONNX_RUNTIME', False),
+        quantize=app.config.get('AI_ONNX_INT8', False)
+    )
+    server = acquire_inference_server(
+        runtime_path,
+        max_batch_size=app.config.get('AI_BATCH_MAX_SIZE', 8) if batched else 1,
+        max_wait=app.config.get('AI_BATCH_MAX_WAIT_MS', 10) / 1000.0 if batched else 0,
+        threads=app.config.get('AI_ONNX_THREADS') or max(int(app.config.get('AI_CPU_BUDGET', 1)), 1)
+    )
+    return TrackingClient(server)
+
+def build_model_processor(user_model, app):
+    """
+    Memilih dan mengambil model untuk satu kamera dari model registry.
+    Mengembalikan (model_processor, model_all_class_names, registry_key);
+    registry_key bernilai None untuk TrackingClient yang dilepas lewat close().
+    """
+    model_registry.max_idle = app.config.get('AI_MODEL_IDLE_CACHE', 2)
+
+    if user_model and user_model.model_type == 'ssdmobilenet':
+        logger.info(f"⏳ Mengunduh atau memverifikasi file SSD MobileNetV3...")
+        download_success, model_path, config_path, labels_path = download_ssdmobilenet_if_not_exists()
+        if download_success:
+            logger.info(f"✅ Menggunakan SSD MobileNetV3: {model_path}")
+            key = model_key('ssdmobilenet', model_path)
+            model_processor = model_registry.acquire(
+                key,
+                loader=lambda: SSDMobileNetProcessor(model_path=model_path, config_path=config_path, labels_path=labels_path),
+                warmup=_warmup_processor
+            )
+            return model_processor, model_processor.get_class_names(), key
+        logger.error("❌ Gagal mengunduh file SSD MobileNetV3. Kembali ke YOLOv8n bawaan.")
+
+    elif user_model and user_model.model_type == 'yolov3':
+        # Bobot YOLOv3-tiny diunduh sendiri oleh processor; ambang ditanam saat dibuat
+        conf_threshold = user_model.conf_threshold if user_model.conf_threshold is not None else 0.5
+        iou_threshold = user_model.iou_threshold if user_model.iou_threshold is not None else 0.6
+        logger.info("✅ Menggunakan YOLOv3-tiny (OpenCV DNN)")
+        key = model_key('yolov3', 'yolov3-tiny.weights', conf_threshold, iou_threshold)
+        model_processor = model_registry.acquire(
+            key,
+            loader=lambda: YOLOv3Processor(confidence_threshold=conf_threshold, nms_threshold=iou_threshold),
+            warmup=_warmup_processor
+        )
+        return model_processor, model_processor.get_class_names(), key
+
+    elif user_model and os.path.exists(user_model.file_path):
+        if user_model.model_type == 'yolov5':
+            logger.info(f"✅ Menggunakan YOLOv5: {user_model.filename}")
+            key = model_key('yolov5', user_model.file_path)
+            model_processor = model_registry.acquire(
+                key,
+                loader=lambda: YOLOv5Processor(model_path=user_model.file_path),
+                warmup=_warmup_processor
+            )
+            return model_processor, [], key
+
+        elif user_model.model_type == 'yolov8' or user_model.model_type == 'yolo-pose':
+            logger.info(f"✅ Menggunakan YOLOv8/YOLO-Pose: {user_model.filename}")
+            model_processor = load_yolo_model(user_model.file_path, app)
+            return model_processor, model_processor.names.values(), None
+
+        logger.error(f"❌ Tipe model '{user_model.model_type}' tidak didukung. Menggunakan YOLOv8n bawaan.")
+
+    download_yolov8n_if_not_exists()
+    logger.info("✅ Menggunakan model bawaan: yolov8n.pt")
+    model_processor = load_yolo_model(os.path.join(UPLOAD_FOLDER, 'yolov8n.pt'), app)
+    return model_processor, model_processor.names.values(), None
+
+def release_model_processor(model_processor, registry_key):
+    if isinstance(model_processor, TrackingClient):
+        model_processor.close()
+    elif registry_key is not None:
+        model_registry.release(registry_key)
+
+def preload_camera_model(app, cam_id):
+    """
+    Memuat dan memanaskan model kamera di registry tanpa menjalankan stream,
+    sehingga menyalakan AI berikutnya tidak perlu menunggu model dimuat.
+    """
+    user_model = config_cache.model(app, cam_id)
+    try:
+        model_processor, _, registry_key = build_model_processor(user_model, app)
+        release_model_processor(model_processor, registry_key)
+    except Exception as e:
+        logger.error(f"❌ Gagal memuat model untuk kamera {cam_id}: {e}")
 
-        in_pos = (mid_point_x + offset_x, mid_point_y + offset_y)
-        cv2.putText(frame, 'IN', in_pos, font, font_scale, text_color, font_thickness, cv2.LINE_AA)
+def resolve_thresholds(user_model, global_settings):
+    """Ambang conf/IoU: pengaturan model kamera, lalu pengaturan global, lalu bawaan."""
+    try:
+        conf_threshold = user_model.conf_threshold if user_model and user_model.conf_threshold is not None else None
+        iou_threshold = user_model.iou_threshold if user_model and user_model.iou_threshold is not None else None
 
-        out_pos = (mid_point_x - offset_x, mid_point_y - offset_y)
-        cv2.putText(frame, 'OUT', out_pos, font, font_scale, text_color, font_thickness, cv2.LINE_AA)
+        if conf_threshold is None:
+            conf_threshold = global_settings.conf_threshold if global_settings and global_settings.conf_threshold is not None else 0.40
+            
+        if iou_threshold is None:
+            iou_threshold = global_settings.iou_threshold if global_settings and global_settings.iou_threshold is not None else 0.7
+            
+    except Exception as e:
+        logger.error(f"Error getting AI settings: {e}")
+        conf_threshold = 0.25
+        iou_threshold = 0.7
+    return conf_threshold, iou_threshold
 
-def check_line_crossing(p1, p2, p3, p4):
-    def orientation(p, q, r):
-        val = (q[1] - p[1]) * (r[0] - q[0]) - (q[0] - p[0]) * (r[1] - q[1])
-        if val == 0: return 0
-        return 1 if val > 0 else 2
+def alarm_triggers(camera_data):
+    return [camera_data.alarm_trigger] if isinstance(camera_data.alarm_trigger, str) else camera_data.alarm_trigger or []
 
-    def on_segment(p, q, r):
-        return (q[0] <= max(p[0], r[0]) and q[0] >= min(p[0], r[0]) and
-                q[1] <= max(p[1], r[1]) and q[1] >= min(p[1], r[1]))
+def counting_enabled(camera_data):
+    """People counting aktif jika kamera punya garis hitung atau geometri garis/zona."""
+    return bool(camera_data.counting_line or camera_data.counting_geometry)
 
-    o1 = orientation(p1, p2, p3)
-    o2 = orientation(p1, p2, p4)
-    o3 = orientation(p3, p4, p1)
-    o4 = orientation(p3, p4, p2)
+def class_filter_key(camera_data):
+    """Bagian konfigurasi kamera yang menentukan set kelas minimal."""
+    return (counting_enabled(camera_data), tuple(alarm_triggers(camera_data)))
 
-    if o1 != o2 and o3 != o4: return True
-    if o1 == 0 and on_segment(p1, p3, p2): return True
-    if o2 == 0 and on_segment(p1, p4, p2): return True
-    if o3 == 0 and on_segment(p3, p1, p4): return True
-    if o4 == 0 and on_segment(p3, p2, p4): return True
-    return False
+def build_class_filter(camera_data, model_processor):
+    """
+    Set id kelas minimal yang dibutuhkan kamera: 'person' untuk people counting
+    ditambah kelas alarm_trigger. Id mengikuti pemetaan names milik backend
+    (Ultralytics, OpenCV DNN, atau label SSD). None berarti semua kelas,
+    yaitu saat people counting tidak aktif.
+    """
+    if not counting_enabled(camera_data):
+        return None
+
+    wanted = {'person', *alarm_triggers(camera_data)}
+    names = model_processor.names
+    class_ids = sorted(class_id for class_id, name in names.items() if name in wanted)
+    missing = wanted - {names[class_id] for class_id in class_ids}
+    if missing:
+        logger.warning(f"⚠️ Kelas {', '.join(sorted(missing))} tidak dikenal model kamera {camera_data.id}.")
+    return class_ids or None
+
+def detections_to_dicts(detections, class_names):
+    """
+    Mengubah array deteksi (N, 6) -- x1, y1, x2, y2, confidence, class_id --
+    dari YOLOv3Processor/YOLOv5Processor ke format yang dipakai pelacakan
+    (name, box, confidence, center). Titik tengah dihitung sekaligus.
+    """
+    boxes = detections[:, :4].astype(int)
+    centers = (boxes[:, :2] + boxes[:, 2:]) // 2
+    results = []
+    for box, center, conf, cls in zip(boxes.tolist(), centers.tolist(), detections[:, 4].tolist(), detections[:, 5].astype(int).tolist()):
+        name = class_names.get(cls)
+        if name:
+            results.append({'name': name, 'box': box, 'confidence': conf, 'center': tuple(center)})
+    return results
+
+def draw_detections(frame, detections, camera_data):
+    """
+    Menggambar kotak, ID, dan titik tengah deteksi pada salinan frame.
+    """
+    triggers = alarm_triggers(camera_data)
+    is_people_counting_active = counting_enabled(camera_data)
+
+    annotated_frame = frame.copy()
+    for obj_data in detections:
+        name, box, obj_id = obj_data['name'], obj_data['box'], obj_data.get('id', 'N/A')
+        x1, y1, x2, y2 = box
+        color = (0, 255, 0) # Hijau default
+        if triggers and name in triggers:
+            color = (0, 0, 255) # Merah untuk alarm
+
+        cv2.rectangle(annotated_frame, (x1, y1), (x2, y2), color, 2)
+
+        # Gambar titik tengah untuk tracking/counting
+        if is_people_counting_active:
+            cx = int((x1 + x2) / 2)
+            cy = int((y1 + y2) / 2)
+            cv2.circle(annotated_frame, (cx, cy), 5, (0, 255, 255), -1) # Kuning untuk titik tengah
+
+        label = f'{name} ID:{obj_id}'
+        cv2.putText(annotated_frame, label, (x1, max(y1 - 10, 0)), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
+    return annotated_frame
+
+def emit_capture_health(socketio, cam_id, health):
+    """
+    Mengirim status kesehatan capture (connecting/streaming/backoff/failed) ke UI
+    lewat event 'ai_status'.
+    """
+    state = health['state']
+    if state == CAPTURE_STREAMING:
+        message = "✅ Stream kamera terhubung."
+    elif state == CAPTURE_BACKOFF:
+        message = f"⏳ Kamera terputus, mencoba lagi dalam {health['retry_in']} detik (percobaan {health['attempts']})."
+    elif state == CAPTURE_FAILED:
+        message = f"❌ Kamera tidak merespons setelah {health['attempts']} percobaan. Tetap mencoba setiap {health['retry_in']} detik."
+    else:
+        message = "⏳ Menghubungkan ke kamera..."
+    socketio.emit('ai_status', {'cam_id': cam_id, 'type': 'health', 'state': state, 'health': health, 'message': message})
 
 def execute_action(action_code, camera_data):
     """
@@ -205,81 +373,30 @@ def ai_stream(socketio, app, cam_id, rtsp_url, stop_event, client_sids):
     """
     from apps import db 
     
-    with app.app_context():
-        try:
-            camera_data = Camera.query.get(cam_id)
-            if not camera_data:
-                logger.error(f"❌ Kamera dengan ID {cam_id} tidak ditemukan di database.")
-                socketio.emit('ai_status', {'cam_id': cam_id, 'type': 'error', 'message': f"❌ Kamera ID {cam_id} tidak ditemukan."}, room=client_sids)
-                return
-
-            camera_name = camera_data.name 
-
-            global_settings = GlobalSettings.query.first()
-            user_model = AIModel.query.filter_by(cam_id=cam_id).first()
+    # Konfigurasi dibaca dari cache memori (lihat config_cache); route yang mengubah
+    # kamera, model, atau pengaturan global menaikkan versinya
+    camera_data = config_cache.camera(app, cam_id)
+    if not camera_data:
+        logger.error(f"❌ Kamera dengan ID {cam_id} tidak ditemukan di database.")
+        socketio.emit('ai_status', {'cam_id': cam_id, 'type': 'error', 'message': f"❌ Kamera ID {cam_id} tidak ditemukan."}, room=client_sids)
+        return
 
-            conf_threshold = user_model.conf_threshold if user_model and user_model.conf_threshold is not None else None
-            iou_threshold = user_model.iou_threshold if user_model and user_model.iou_threshold is not None else None
+    camera_name = camera_data.name 
 
-            if conf_threshold is None:
-                conf_threshold = global_settings.conf_threshold if global_settings and global_settings.conf_threshold is not None else 0.40
-                
-            if iou_threshold is None:
-                iou_threshold = global_settings.iou_threshold if global_settings and global_settings.iou_threshold is not None else 0.7
-                
-        except Exception as e:
-            logger.error(f"Error getting AI settings: {e}")
-            conf_threshold = 0.25
-            iou_threshold = 0.7
+    global_settings = config_cache.global_settings(app)
+    user_model = config_cache.model(app, cam_id)
+    conf_threshold, iou_threshold = resolve_thresholds(user_model, global_settings)
 
-        logger.info(f"✅ Menggunakan conf_threshold={conf_threshold} dan iou_threshold={iou_threshold} untuk kamera {cam_id}.")
+    logger.info(f"✅ Menggunakan conf_threshold={conf_threshold} dan iou_threshold={iou_threshold} untuk kamera {cam_id}.")
 
-        model_processor = None
-        yolo_classes = None # Ini sebenarnya untuk kelas yang difilter (misal hanya 'person'), bukan daftar semua kelas model
-        model_all_class_names = [] # Untuk menyimpan semua nama kelas dari model yang digunakan
+    model_processor = None
+    yolo_classes = None # Ini sebenarnya untuk kelas yang difilter (misal hanya 'person'), bukan daftar semua kelas model
+    model_all_class_names = [] # Untuk menyimpan semua nama kelas dari model yang digunakan
             
     try:
-        # Perbarui logika untuk menentukan kelas yang akan dideteksi
-        if camera_data.counting_line:
-            # Jika counting_line aktif, kita hanya tertarik pada 'person'
-            # Kita akan memfilter hasil deteksi nanti berdasarkan nama kelas 'person'
-            logger.info("⚠️ Pembatasan deteksi: Fokus pada 'person' karena ada garis penghitungan.")
-        else:
-            logger.info("ℹ️ Tidak ada batasan deteksi. Mendeteksi semua objek.")
-        
         # --- Inisialisasi Model ---
-        if user_model and user_model.model_type == 'ssdmobilenet':
-            logger.info(f"⏳ Mengunduh atau memverifikasi file SSD MobileNetV3...")
-            download_success, model_path, config_path, labels_path = download_ssdmobilenet_if_not_exists()
-            if download_success:
-                logger.info(f"✅ Menggunakan SSD MobileNetV3: {model_path}")
-                model_processor = SSDMobileNetProcessor(model_path=model_path, config_path=config_path, labels_path=labels_path)
-                model_all_class_names = model_processor.get_class_names()
-            else:
-                logger.error("❌ Gagal mengunduh file SSD MobileNetV3. Kembali ke YOLOv8n bawaan.")
-                download_yolov8n_if_not_exists()
-                model_processor = YOLO(os.path.join(UPLOAD_FOLDER, 'yolov8n.pt'))
-                model_all_class_names = model_processor.names.values()
-
-        elif user_model and os.path.exists(user_model.file_path):
-            if user_model.model_type == 'yolov5':
-                logger.info(f"✅ Menggunakan YOLOv5: {user_model.filename}")
-                model_processor = YOLOv5Processor(model_path=user_model.file_path)
-
-            elif user_model.model_type == 'yolov8' or user_model.model_type == 'yolo-pose':
-                logger.info(f"✅ Menggunakan YOLOv8/YOLO-Pose: {user_model.filename}")
-                model_processor = YOLO(user_model.file_path)
-                model_all_class_names = model_processor.names.values()
-            else:
-                logger.error(f"❌ Tipe model '{user_model.model_type}' tidak didukung. Menggunakan YOLOv8n bawaan.")
-                download_yolov8n_if_not_exists()
-                model_processor = YOLO(os.path.join(UPLOAD_FOLDER, 'yolov8n.pt'))
-                model_all_class_names = model_processor.names.values()
-        else:
-            download_yolov8n_if_not_exists()
-            logger.info("✅ Menggunakan model bawaan: yolov8n.pt")
-            model_processor = YOLO(os.path.join(UPLOAD_FOLDER, 'yolov8n.pt'))
-            model_all_class_names = model_processor.names.values()
+        # Model diambil dari registry bersama, jadi restart thread tidak memuat ulang bobot
+        model_processor, model_all_class_names, model_registry_key = build_model_processor(user_model, app)
             
     except Exception as e:
         socketio.emit('ai_status', {'cam_id': cam_id, 'type': 'error', 'message': f"❌ Gagal memuat model: {e}"})
@@ -291,25 +408,48 @@ def ai_stream(socketio, app, cam_id, rtsp_url, stop_event, client_sids):
         socketio.emit('ai_status', {'cam_id': cam_id, 'type': 'error', 'message': "❌ Gagal menginisialisasi model AI."})
         return
 
-    cap = cv2.VideoCapture(rtsp_url)
-    if not cap.isOpened():
-        socketio.emit('ai_status', {'cam_id': cam_id, 'type': 'error', 'message': "❌ Gagal membuka stream kamera."})
-        logger.error(f"❌ Gagal membuka stream untuk kamera {cam_id} dari {rtsp_url}")
-        return
+    # Event Count/AlarmLog/FileRecord ditulis batch oleh satu thread writer per proses
+    event_writer.start(app)
+
+    # Decoder dibagi lewat capture hub; loop analisis selalu mengambil frame terbaru.
+    # Koneksi, reconnect, dan backoff ditangani grabber di thread native.
+    cap = capture_hub.subscribe(rtsp_url, name=f"ai-{cam_id}")
+    last_health_state = None
 
     socketio.emit('ai_status', {'cam_id': cam_id, 'type': 'info', 'message': "✅ AI Live View dimulai."})
     logger.info(f"✅ AI stream untuk kamera {cam_id} dimulai.")
 
+    # Total harian awal dari rollup (satu bucket per arah), bukan menghitung baris Count
     with app.app_context():
-        today = datetime.date.today()
-        daily_in = Count.query.filter(Count.camera_id == cam_id, Count.direction == 'in', db.func.date(Count.timestamp) == today).count()
-        daily_out = Count.query.filter(Count.camera_id == cam_id, Count.direction == 'out', db.func.date(Count.timestamp) == today).count()
+        daily = daily_totals(datetime.date.today(), cam_id).get(cam_id, {'in': 0, 'out': 0})
 
     with lock:
-        total_counts[cam_id] = {'in': daily_in, 'out': daily_out}
+        total_counts[cam_id] = daily
     socketio.emit('ai_count_update', {'cam_id': cam_id, 'counts': total_counts[cam_id]})
     
     tracked_objects = {}
+    detections_info = []
+    detected_alarm_object = False
+
+    # Stride inferensi dipilih dari latensi deteksi yang diukur (lihat AI_CPU_BUDGET)
+    scheduler = InferenceScheduler.from_config(cam_id, app.config)
+    # Motion gate melewati detektor selama adegan statis (ambang diatur per kamera)
+    motion_gate = MotionGate.from_camera(camera_data)
+    # ROI: detektor hanya melihat crop di sekitar garis hitung/polygon
+    roi = RegionOfInterest.from_camera(camera_data)
+    # Mode tile untuk kamera resolusi tinggi (grid dan overlap per kamera)
+    tiles = TileGrid.from_camera(camera_data)
+    # Mode keyframe: detektor hanya di keyframe, optical flow di antaranya
+    flow = FlowTracker.from_camera(camera_data)
+    # Pelacak SORT untuk model tanpa .track() bawaan (YOLOv5/YOLOv3/SSD)
+    tracker = ObjectTracker()
+    # Penghitung garis: posisi dan status hitung semua track disimpan dalam array
+    counter = LineCounter.from_camera(camera_data)
+    # Set kelas minimal (person + alarm_trigger) dibangun ulang saat konfigurasi kamera berubah
+    yolo_classes_key = None
+    # Ambang conf/IoU dihitung ulang hanya saat snapshot model/pengaturan global berganti
+    threshold_source = (user_model, global_settings)
+    last_stats_emit = time.time()
     
     video_writer = None
     is_recording = False
@@ -322,30 +462,64 @@ def ai_stream(socketio, app, cam_id, rtsp_url, stop_event, client_sids):
             socketio.emit('ai_status', {'cam_id': cam_id, 'type': 'info', 'message': "🛑 AI Live View dihentikan."})
             break
 
+        health = cap.health()
+        if health['state'] != last_health_state:
+            emit_capture_health(socketio, cam_id, health)
+            last_health_state = health['state']
+
         ret, frame = cap.read()
         if not ret:
-            logger.warning(f"⚠️ Frame kosong dari kamera {cam_id}. Mencoba reconnect...")
-            cap.release()
-            time.sleep(1)
-            cap = cv2.VideoCapture(rtsp_url)
-            if not cap.isOpened():
-                socketio.emit('ai_status', {'cam_id': cam_id, 'type': 'error', 'message': "❌ Gagal reconnect ke kamera."})
-                break
+            # Menunggu frame baru; polling lebih jarang selama kamera terputus
+            time.sleep(0.005 if health['state'] == CAPTURE_STREAMING else 0.2)
             continue
 
-        with app.app_context():
-            camera_data = Camera.query.get(cam_id)
-            if not camera_data or not camera_data.is_ai_enabled:
-                running = False
-                continue
-            
-            global_settings = GlobalSettings.query.first()
+        # Tanpa query selama konfigurasi tidak berubah; snapshot baru setelah invalidasi
+        camera_data = config_cache.camera(app, cam_id)
+        if not camera_data or not camera_data.is_ai_enabled:
+            running = False
+            continue
+        camera_name = camera_data.name
+
+        global_settings = config_cache.global_settings(app)
+        user_model = config_cache.model(app, cam_id)
+        if (user_model, global_settings) != threshold_source:
+            threshold_source = (user_model, global_settings)
+            conf_threshold, iou_threshold = resolve_thresholds(user_model, global_settings)
         
-        # PERBAIKAN: Meneruskan model_processor ke fungsi, dan model_all_class_names
-        annotated_frame, detections_info, detected_alarm_object = process_frame_with_ai(
-            frame, model_processor, camera_data, tracked_objects, app, socketio, cam_id, 
-            yolo_classes, conf_threshold, iou_threshold, model_all_class_names
-        )
+        motion_gate.configure(camera_data)
+        roi.configure(camera_data)
+        tiles.configure(camera_data)
+        flow.configure(camera_data)
+        counter.configure(camera_data)
+        if class_filter_key(camera_data) != yolo_classes_key:
+            yolo_classes_key = class_filter_key(camera_data)
+            yolo_classes = build_class_filter(camera_data, model_processor)
+            if yolo_classes is None:
+                logger.info(f"ℹ️ Tidak ada batasan deteksi untuk kamera {cam_id}. Mendeteksi semua objek.")
+            else:
+                class_labels = ', '.join(model_processor.names[class_id] for class_id in yolo_classes)
+                logger.info(f"⚠️ Pembatasan deteksi kamera {cam_id}: hanya {class_labels}.")
+        # Saat stride > 1, track di frame yang dilewati stride digeser optical flow
+        # agar penyeberangan garis di antara dua deteksi tetap terhitung
+        flow.bridge = scheduler.stride > 1
+        detect_due = scheduler.should_detect()
+        if detect_due and flow.keyframe_due() and motion_gate.should_detect(frame):
+            # PERBAIKAN: Meneruskan model_processor ke fungsi, dan model_all_class_names
+            detect_started = time.time()
+            annotated_frame, detections_info, detected_alarm_object = process_frame_with_ai(
+                frame, model_processor, camera_data, tracked_objects, app, socketio, cam_id, 
+                yolo_classes, conf_threshold, iou_threshold, model_all_class_names, roi, tiles, tracker, counter
+            )
+            scheduler.record_detection(time.time() - detect_started)
+            flow.start(frame, detections_info)
+        elif flow.active and (flow.enabled or not detect_due):
+            # Di antara keyframe/deteksi: kotak digeser dengan optical flow, penghitungan tetap berjalan
+            annotated_frame, detections_info, detected_alarm_object = process_flow_frame(
+                frame, flow, camera_data, tracked_objects, app, socketio, cam_id, counter
+            )
+        else:
+            # Frame tanpa gerakan (motion gate) atau tanpa track: pakai hasil pelacakan terakhir
+            annotated_frame = draw_detections(frame, detections_info, camera_data)
 
         with lock:
             now = time.time()
@@ -353,15 +527,11 @@ def ai_stream(socketio, app, cam_id, rtsp_url, stop_event, client_sids):
                 if now - alarm_cooldowns.get(cam_id, 0) > 10:
                     logger.warning(f"🚨 ALARM: Objek alarm terdeteksi di kamera {cam_id}! Mengirim aksi...")
                     
-                    with app.app_context():
-                        try:
-                            alarm_log_entry = AlarmLog(camera_id=cam_id, camera_name=camera_name, message=f"Objek '{camera_data.alarm_trigger}' terdetksi")
-                            db.session.add(alarm_log_entry)
-                            db.session.commit()
-                            logger.info("✅ Log alarm berhasil dicatat di database.")
-                        except Exception as db_e:
-                            db.session.rollback()
-                            logger.error(f"❌ Gagal mencatat log alarm ke database: {db_e}")
+                    alarm_message = f"Objek '{camera_data.alarm_trigger}' terdetksi"
+                    alarm_time = datetime.datetime.now()
+                    event_writer.submit(AlarmLog, camera_id=cam_id, camera_name=camera_name,
+                                        message=alarm_message, timestamp=alarm_time)
+                    logger.info("✅ Log alarm dicatat.")
                     
                     action_thread = threading.Thread(target=execute_action, args=(camera_data.alarm_action, camera_data))
                     action_thread.start()
@@ -382,21 +552,15 @@ def ai_stream(socketio, app, cam_id, rtsp_url, stop_event, client_sids):
                     logger.info(f"📸 Screenshot alarm berhasil disimpan: {filepath}")
                     screenshot_cooldowns[cam_id] = now
                     
-                    with app.app_context():
-                        try:
-                            new_file_record = FileRecord(
-                                cam_id=cam_id,
-                                filename=filename,
-                                file_type='screenshot',
-                                date_created=datetime.date.today(),
-                                time_created=datetime.datetime.now().time()
-                            )
-                            db.session.add(new_file_record)
-                            db.session.commit()
-                            logger.info("✅ Entri file record screenshot berhasil disimpan di database.")
-                        except Exception as e:
-                            db.session.rollback()
-                            logger.error(f"❌ Gagal menyimpan entri file record screenshot: {e}")
+                    event_writer.submit(
+                        FileRecord,
+                        cam_id=cam_id,
+                        filename=filename,
+                        file_type='screenshot',
+                        date_created=datetime.date.today(),
+                        time_created=datetime.datetime.now().time()
+                    )
+                    logger.info("✅ Entri file record screenshot dicatat.")
                 
                 if global_settings and global_settings.save_videos and not is_recording:
                     video_folder = global_settings.video_folder or 'apps/static/videos'
@@ -441,21 +605,15 @@ def ai_stream(socketio, app, cam_id, rtsp_url, stop_event, client_sids):
                                 os.rename(optimized_output_path, input_path)
                                 logger.info("✅ File asli dihapus dan file baru diganti namanya.")
                                 
-                                with app.app_context():
-                                    try:
-                                        new_file_record = FileRecord(
-                                            cam_id=cam_id,
-                                            filename=output_filename,
-                                            file_type='video',
-                                            date_created=datetime.date.today(),
-                                            time_created=datetime.datetime.now().time()
-                                        )
-                                        db.session.add(new_file_record)
-                                        db.session.commit()
-                                        logger.info("✅ Entri file record video berhasil disimpan di database.")
-                                    except Exception as e:
-                                        db.session.rollback()
-                                        logger.error(f"❌ Gagal menyimpan entri file record video: {e}")
+                                event_writer.submit(
+                                    FileRecord,
+                                    cam_id=cam_id,
+                                    filename=output_filename,
+                                    file_type='video',
+                                    date_created=datetime.date.today(),
+                                    time_created=datetime.datetime.now().time()
+                                )
+                                logger.info("✅ Entri file record video dicatat.")
                                 
                             except subprocess.CalledProcessError as e:
                                 logger.error(f"❌ Gagal mentranscode video dengan FFmpeg: {e}")
@@ -467,12 +625,9 @@ def ai_stream(socketio, app, cam_id, rtsp_url, stop_event, client_sids):
                     video_writer = None
             
             if len(client_sids.get(cam_id, set())) > 0:
-                if camera_data.counting_line and camera_data.counting_line != "":
-                    try:
-                        line_coords = json.loads(camera_data.counting_line)
-                        draw_counting_line(annotated_frame, line_coords)
-                    except (json.JSONDecodeError, TypeError):
-                        logger.error(f"❌ Gagal memuat koordinat garis untuk kamera {cam_id}.")
+                # Garis dan zona sudah dalam piksel (dikompilasi sekali per resolusi)
+                counter.draw(annotated_frame)
+                roi.draw(annotated_frame)
 
                 _, jpeg = cv2.imencode('.jpg', annotated_frame)
                 b64_frame = base64.b64encode(jpeg.tobytes()).decode('utf-8')
@@ -481,10 +636,32 @@ def ai_stream(socketio, app, cam_id, rtsp_url, stop_event, client_sids):
                 with app.app_context():
                     for sid in sids_to_emit:
                         socketio.emit('ai_frame', {'cam_id': cam_id, 'frame': b64_frame}, room=sid)
-        
-        time.sleep(0.03)
 
-    cap.release()
+        scheduler.wait()
+        if time.time() - last_stats_emit >= 2:
+            stats = scheduler.stats()
+            stats.update(motion_gate.stats())
+            stats.update(roi.stats())
+            stats.update(tiles.stats())
+            stats.update(flow.stats())
+            stats.update(tracker.stats())
+            stats.update(counter.stats())
+            stats['capture'] = cap.health()
+            stats['db_writer'] = event_writer.stats()
+            stats['config_cache'] = config_cache.stats()
+            if isinstance(model_processor, TrackingClient):
+                stats['inference'] = model_processor.server.stats()
+            socketio.emit('ai_status', {
+                'cam_id': cam_id,
+                'type': 'stats',
+                'message': f"⚡ {stats['fps']} FPS, deteksi {stats['detect_fps']} FPS (stride {stats['stride']})",
+                'stats': stats
+            })
+            last_stats_emit = time.time()
+
+    scheduler.close()
+    cap.close()
+    release_model_processor(model_processor, model_registry_key)
     if video_writer:
         video_writer.release()
         logger.info("⏹️ Perekaman video dihentikan karena thread berhenti.")
@@ -511,25 +688,108 @@ def ai_stream(socketio, app, cam_id, rtsp_url, stop_event, client_sids):
 
 
 
-def process_frame_with_ai(frame, model_processor, camera_data, tracked_objects, app, socketio, cam_id, yolo_classes, conf_threshold, iou_threshold, model_all_class_names):
+def update_line_counts(frame, all_detections, camera_data, counter, app, socketio, cam_id):
     """
-    Melakukan deteksi objek, pelacakan, dan logika bisnis (penghitungan/alarm) pada satu frame.
+    Menyaring deteksi untuk people counting/alarm lalu menjalankan mesin
+    penghitung garis dan zona (LineCounter) untuk semua person sekaligus. Dipakai untuk
+    frame hasil detektor maupun frame hasil propagasi optical flow.
     """
-    from apps import db 
+    triggers = alarm_triggers(camera_data)
+
+    # Tanpa garis/zona yang valid: penghitungan nonaktif, semua deteksi diproses
+    if counter is None or not counter.active:
+        return all_detections
+
+    # Kelas alarm tetap dipertahankan agar alarm berfungsi saat people counting aktif
+    detections_to_process = [d for d in all_detections if d.get('name') == 'person' or d.get('name') in triggers]
+
+    # --- Logika People Counting ---
+    persons = [d for d in detections_to_process if d.get('name') == 'person' and 'id' in d]
+    events = counter.update(frame.shape, [d['id'] for d in persons], [d['center'] for d in persons])
+    if not events:
+        return detections_to_process
+
+    # Baris Count ditulis event writer secara batch; hitungan di memori langsung diperbarui
+    now = datetime.datetime.now()
+    for obj_id, direction, line_name in events:
+        event_writer.submit(Count, camera_id=cam_id, camera_name=camera_data.name, direction=direction,
+                            line_name=line_name, timestamp=now)
+        logger.info(f"✅ Count dicatat: {direction} ({line_name}) untuk objek ID {obj_id} di kamera {cam_id}.")
+
+    # Operasi thread-safe pada variabel global
+    with lock:
+        if cam_id not in total_counts:
+            total_counts[cam_id] = {'in': 0, 'out': 0}
+        for _, direction, _ in events:
+            total_counts[cam_id][direction] += 1
+        counts = dict(total_counts[cam_id])
+    socketio.emit('ai_count_update', {'cam_id': cam_id, 'counts': counts})
+
+    return detections_to_process
+
+
+def process_flow_frame(frame, flow, camera_data, tracked_objects, app, socketio, cam_id, counter=None):
+    """
+    Frame di antara keyframe: kotak dari keyframe dipropagasi dengan optical
+    flow, lalu diteruskan ke logika penghitungan yang sama dengan frame detektor.
+    """
+    detections = flow.propagate(frame)
+    with lock:
+        tracked_objects.clear()
+        tracked_objects.update({det['id']: det for det in detections if 'id' in det})
+
+    detections_to_process = update_line_counts(frame, detections, camera_data, counter, app, socketio, cam_id)
+    triggers = alarm_triggers(camera_data)
+    detected_alarm_object = any(d['name'] in triggers for d in detections_to_process)
+    return draw_detections(frame, detections_to_process, camera_data), detections_to_process, detected_alarm_object
 
-    triggers = [camera_data.alarm_trigger] if isinstance(camera_data.alarm_trigger, str) else camera_data.alarm_trigger or []
+def detect_regions(model_processor, frame, regions, yolo_classes, conf_threshold, iou_threshold):
+    """
+    Menjalankan YOLOv5/YOLOv3/SSD pada satu atau beberapa area frame (crop ROI
+    atau tile) dan mengembalikan deteksi format dict dalam koordinat frame penuh.
+    Beberapa area digabung dengan NMS lintas tile.
+    """
+    crops = [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in regions]
+    if isinstance(model_processor, YOLOv5Processor):
+        # Ambang dan filter kelas diterapkan di dalam model; semua crop dalam satu batch
+        arrays = model_processor.process_frames(crops, classes=yolo_classes, conf=conf_threshold, iou=iou_threshold)
+    elif isinstance(model_processor, YOLOv3Processor):
+        arrays = [model_processor.process_frame(crop, classes=yolo_classes) for crop in crops]
+    else:
+        arrays = [detections_from_dicts(model_processor.process_frame(crop, classes=yolo_classes), model_processor.names) for crop in crops]
+    merged = merge_detections(arrays, [(x1, y1) for x1, y1, _, _ in regions])
+    return detections_to_dicts(merged, model_processor.names)
+
+def process_frame_with_ai(frame, model_processor, camera_data, tracked_objects, app, socketio, cam_id, yolo_classes, conf_threshold, iou_threshold, model_all_class_names, roi=None, tiles=None, tracker=None, counter=None):
+    """
+    Melakukan deteksi objek, pelacakan, dan logika bisnis (penghitungan/alarm) pada satu frame.
+    Jika roi diberikan, detektor hanya dijalankan pada crop ROI; jika tiles
+    (TileGrid) aktif, area tersebut dipecah menjadi tile yang diproses dalam satu
+    batch. Semua kotak dipetakan kembali ke koordinat frame penuh. tracker
+    (ObjectTracker) menyimpan state pelacakan YOLOv5/YOLOv3/SSD antar frame,
+    counter (LineCounter) state penyeberangan garis semua track.
+    """
+    triggers = alarm_triggers(camera_data)
     
     all_detections = []
+
+    # Area yang dianalisis: crop ROI (atau frame penuh), opsional dipecah menjadi tile
+    h, w = frame.shape[:2]
+    roi_box = roi.box(frame.shape) if roi else None
+    region = roi_box or (0, 0, w, h)
+    tile_regions = tiles.boxes(region) if tiles else None
     
     # --- Pemrosesan Deteksi Berdasarkan Tipe Model ---
-    if isinstance(model_processor, YOLO):
+    if isinstance(model_processor, TrackingClient):
         results = model_processor.track(
             frame, 
             persist=True, 
-            classes=None, # Jangan gunakan yolo_classes di sini, kita akan filter nanti
+            classes=yolo_classes, # Set kelas minimal, sehingga NMS dan tracker hanya memproses kelas ini
             verbose=False, 
             conf=conf_threshold, 
-            iou=iou_threshold
+            iou=iou_threshold,
+            roi=roi_box,
+            tiles=tile_regions
         )
         current_frame_detections = {}
         
@@ -541,7 +801,7 @@ def process_frame_with_ai(frame, model_processor, camera_data, tracked_objects,
                 results[0].boxes.conf.cpu().numpy().astype(float)
             ):
                 name = model_processor.names.get(cls)
-                if name:
+                if name and (roi is None or roi.contains(((box[0] + box[2]) / 2, (box[1] + box[3]) / 2))):
                     obj_id = int(id)
                     current_center = (int((box[0] + box[2]) / 2), int((box[1] + box[3]) / 2))
                     
@@ -552,16 +812,7 @@ def process_frame_with_ai(frame, model_processor, camera_data, tracked_objects,
                         'center': current_center,
                         'conf': conf
                     }
-                    
-                    # Tambahkan data pelacakan dari frame sebelumnya dengan thread-safe
-                    with lock:
-                        if obj_id in tracked_objects:
-                            det_data['prev_center'] = tracked_objects[obj_id]['center']
-                            det_data['counted'] = tracked_objects[obj_id].get('counted', False)
-                        else:
-                            det_data['prev_center'] = None
-                            det_data['counted'] = False
-                        
+
                     current_frame_detections[obj_id] = det_data
         
         with lock:
@@ -574,58 +825,27 @@ def process_frame_with_ai(frame, model_processor, camera_data, tracked_objects,
         # Plotting akan dilakukan pada detections_info setelah filtering, bukan di sini langsung
         annotated_frame = frame.copy() # Kita akan menggambar secara manual nanti
 
-    elif isinstance(model_processor, (YOLOv5Processor, SSDMobileNetProcessor)):
-        # Dapatkan deteksi dari YOLOv5Processor atau SSDMobileNetProcessor
-        # Kedua kelas ini mengembalikan format yang serupa
-        raw_detections = model_processor.process_frame(frame)
+    elif isinstance(model_processor, (YOLOv5Processor, SSDMobileNetProcessor, YOLOv3Processor)):
+        # Dapatkan deteksi dari YOLOv5Processor, SSDMobileNetProcessor, atau YOLOv3Processor
+        # pada crop ROI atau tile, sudah dalam koordinat frame penuh
+        raw_detections = detect_regions(model_processor, frame, tile_regions or [region], yolo_classes, conf_threshold, iou_threshold)
+        if roi:
+            raw_detections = [d for d in raw_detections if roi.contains(d['center'])]
         
-        # Saring deteksi berdasarkan confidence threshold
-        detections_filtered_by_conf = [d for d in raw_detections if d['confidence'] >= conf_threshold]
+        # Saring deteksi berdasarkan confidence threshold (YOLOv5 sudah disaring di dalam model)
+        if isinstance(model_processor, YOLOv5Processor):
+            detections_filtered_by_conf = raw_detections
+        else:
+            detections_filtered_by_conf = [d for d in raw_detections if d['confidence'] >= conf_threshold]
 
-        tracking_distance_threshold = 100 
-        
-        temp_tracked_objects = {}
-        # Simple centroid tracking (bukan deep sort atau sejenisnya)
-        # Akan lebih baik menggunakan library tracking eksternal jika performa ini kurang
-        for det in detections_filtered_by_conf:
-            min_dist = float('inf')
-            matched_id = None
-            
-            # Operasi thread-safe pada tracked_objects
-            with lock:
-                for obj_id, last_obj in tracked_objects.items():
-                    # Pastikan kita membandingkan objek dengan nama kelas yang sama
-                    if det['name'] == last_obj.get('name'):
-                        dist = math.dist(det['center'], last_obj['center'])
-                        if dist < min_dist and dist < tracking_distance_threshold:
-                            min_dist = dist
-                            matched_id = obj_id
-            
-            if matched_id:
-                det['id'] = matched_id
-                # Operasi thread-safe pada tracked_objects
-                with lock:
-                    if matched_id in tracked_objects:
-                        det['prev_center'] = tracked_objects[matched_id]['center']
-                        det['counted'] = tracked_objects[matched_id].get('counted', False)
-                    else:
-                        det['prev_center'] = None
-                        det['counted'] = False
-            else:
-                # Objek baru, berikan ID baru
-                new_id = 0
-                with lock:
-                    new_id = max(tracked_objects.keys()) + 1 if tracked_objects else 1
-                det['id'] = new_id
-                det['prev_center'] = None
-                det['counted'] = False
-            
-            temp_tracked_objects[det['id']] = det
-            all_detections.append(det)
+        # Pelacakan SORT (Kalman + Hungarian atas IoU) per kelas, ID selalu naik
+        if tracker is None:
+            tracker = ObjectTracker()
+        all_detections = tracker.update(detections_filtered_by_conf)
 
         with lock:
             tracked_objects.clear()
-            tracked_objects.update(temp_tracked_objects)
+            tracked_objects.update({det['id']: det for det in all_detections})
 
         annotated_frame = frame.copy()
     
@@ -634,150 +854,22 @@ def process_frame_with_ai(frame, model_processor, camera_data, tracked_objects,
         return frame, [], False
 
 
-    is_people_counting_active = camera_data.counting_line is not None and camera_data.counting_line != ""
-    is_people_counting_inactive = not camera_data.counting_line
-
-    # Filter deteksi untuk people counting atau alarm
-    detections_to_process = all_detections
-    if is_people_counting_active:
-        detections_to_process = [d for d in all_detections if d.get('name') == 'person']
+    is_people_counting_inactive = not counting_enabled(camera_data)
+    detections_to_process = update_line_counts(frame, all_detections, camera_data, counter, app, socketio, cam_id)
 
-    
-    # --- Logika People Counting ---
-    if is_people_counting_active:
-        try:
-            line_coords = json.loads(camera_data.counting_line)
-            h, w, _ = frame.shape
-            line_start = (int(line_coords['x1'] * w), int(line_coords['y1'] * h))
-            line_end = (int(line_coords['x2'] * w), int(line_coords['y2'] * h))
-            
-            for obj_data in detections_to_process:
-                obj_id = obj_data['id']
-                
-                # Gunakan lock saat mengakses tracked_objects
-                with lock:
-                    obj_in_tracked = obj_id in tracked_objects
-                
-                if obj_in_tracked and 'prev_center' in tracked_objects[obj_id] and tracked_objects[obj_id]['prev_center'] is not None:
-                    with lock:
-                        current_center = tracked_objects[obj_id]['center']
-                        prev_center = tracked_objects[obj_id]['prev_center']
-                    
-                    if check_line_crossing(line_start, line_end, prev_center, current_center):
-                        with lock:
-                            counted_status = tracked_objects[obj_id].get('counted', False)
-
-                        if not counted_status:
-                            # Tentukan arah (IN/OUT)
-                            cross_product_old = (line_end[0] - line_start[0]) * (prev_center[1] - line_start[1]) - (line_end[1] - line_start[1]) * (prev_center[0] - line_start[0])
-                            cross_product_new = (line_end[0] - line_start[0]) * (current_center[1] - line_start[1]) - (line_end[1] - line_start[1]) * (current_center[0] - line_start[0])
-                            
-                            direction = 'out' if cross_product_old > 0 else 'in'
-
-                            with app.app_context():
-                                try:
-                                    camera_data = Camera.query.get(cam_id)
-                                    camera_name = camera_data.name if camera_data else "Kamera Dihapus"
-                                    count_entry = Count(camera_id=cam_id, camera_name=camera_name, direction=direction)
-                                    db.session.add(count_entry)
-                                    db.session.commit()
-                                    logger.info(f"✅ Count berhasil dicatat: {direction} untuk objek ID {obj_id} di kamera {cam_id}.")
-
-                                    # Operasi thread-safe pada variabel global
-                                    with lock:
-                                        if cam_id not in total_counts:
-                                            total_counts[cam_id] = {'in': 0, 'out': 0}
-                                        total_counts[cam_id][direction] += 1
-                                        tracked_objects[obj_id]['counted'] = True
-                                        
-                                    socketio.emit('ai_count_update', {'cam_id': cam_id, 'counts': total_counts[cam_id]})
-                                    
-                                except Exception as db_e:
-                                    db.session.rollback()
-                                    logger.error(f"❌ Gagal mencatat hitungan ke database: {db_e}")
-
-            # Reset status 'counted' jika objek sudah cukup jauh dari garis
-            reset_threshold = 50 # Jarak piksel untuk mereset
-            # Operasi thread-safe pada tracked_objects
-            with lock:
-                obj_ids_to_check = list(tracked_objects.keys())
-
-            for obj_id in obj_ids_to_check:
-                with lock:
-                    obj_data = tracked_objects.get(obj_id)
-                if not obj_data:
-                    continue
-
-                center = obj_data.get('center')
-                if center and obj_data.get('counted', False):
-                    # Hitung jarak titik ke garis
-                    line_length = math.sqrt((line_end[1] - line_start[1])**2 + (line_end[0] - line_start[0])**2)
-                    if line_length > 0:
-                        distance = abs((line_end[1] - line_start[1]) * center[0] - 
-                                            (line_end[0] - line_start[0]) * center[1] +
-                                            line_end[0] * line_start[1] - line_end[1] * line_start[0]) / line_length
-                    else:
-                        distance = float('inf') # Hindari pembagian dengan nol
-                    
-                    if distance > reset_threshold:
-                        with lock:
-                            if obj_id in tracked_objects:
-                                tracked_objects[obj_id]['counted'] = False
-                        logger.info(f"🔄 Reset status hitung untuk objek ID {obj_id}.")
-                
-        except (json.JSONDecodeError, TypeError) as e:
-            logger.error(f"❌ Gagal memuat atau memproses koordinat garis untuk kamera {cam_id}: {e}")
-            # Jika ada masalah dengan garis, fallback untuk memproses semua deteksi
-            detections_to_process = all_detections
-    
     # --- Anotasi Frame ---
     # Jika menggunakan YOLOv8, kita bisa pakai plot() bawaannya
-    if isinstance(model_processor, YOLO):
+    if isinstance(model_processor, TrackingClient):
         # YOLOv8 plot() sudah cukup pintar, tapi kita perlu memfilter dulu jika ada counting_line
         # Solusi terbaik adalah menggambar secara manual jika ada counting line atau alarm trigger spesifik
         # Karena kita sudah punya `detections_to_process` yang difilter, kita akan menggambar secara manual untuk konsistensi
-        annotated_frame = frame.copy()
-        for obj_data in detections_to_process:
-            name, box, obj_id = obj_data['name'], obj_data['box'], obj_data.get('id', 'N/A')
-            x1, y1, x2, y2 = box
-            color = (0, 255, 0) # Hijau default
-            if triggers and name in triggers:
-                color = (0, 0, 255) # Merah untuk alarm
-            
-            cv2.rectangle(annotated_frame, (x1, y1), (x2, y2), color, 2)
-            
-            # Gambar titik tengah untuk tracking/counting
-            if is_people_counting_active:
-                cx = int((x1 + x2) / 2)
-                cy = int((y1 + y2) / 2)
-                cv2.circle(annotated_frame, (cx, cy), 5, (0, 255, 255), -1) # Kuning untuk titik tengah
-            
-            
-            label = f'{name} ID:{obj_id}'
-            cv2.putText(annotated_frame, label, (x1, max(y1 - 10, 0)), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
-            if is_people_counting_inactive:
-                annotated_frame = results[0].plot()
+        annotated_frame = draw_detections(frame, detections_to_process, camera_data)
+        if is_people_counting_inactive and detections_to_process:
+            annotated_frame = results[0].plot()
 
-    elif isinstance(model_processor, (YOLOv5Processor, SSDMobileNetProcessor)):
-        # Untuk YOLOv5 dan SSDMobileNet, kita menggambar secara manual
-        annotated_frame = frame.copy()
-        for obj_data in detections_to_process:
-            name, box, obj_id = obj_data['name'], obj_data['box'], obj_data.get('id', 'N/A')
-            x1, y1, x2, y2 = box
-            color = (0, 255, 0)
-            if triggers and name in triggers:
-                color = (0, 0, 255) # Merah untuk alarm
-            
-            cv2.rectangle(annotated_frame, (x1, y1), (x2, y2), color, 2)
-            
-            # Gambar titik tengah untuk tracking/counting
-            if is_people_counting_active:
-                cx = int((x1 + x2) / 2)
-                cy = int((y1 + y2) / 2)
-                cv2.circle(annotated_frame, (cx, cy), 5, (0, 255, 255), -1) # Kuning untuk titik tengah
-            
-            label = f'{name} ID:{obj_id}'
-            cv2.putText(annotated_frame, label, (x1, max(y1 - 10, 0)), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
+    elif isinstance(model_processor, (YOLOv5Processor, SSDMobileNetProcessor, YOLOv3Processor)):
+        # Untuk YOLOv5, YOLOv3, dan SSDMobileNet, kita menggambar secara manual
+        annotated_frame = draw_detections(frame, detections_to_process, camera_data)
     
     # Tentukan apakah ada objek alarm yang terdeteksi dalam detections_to_process
     detected_alarm_object = any(d['name'] in triggers for d in detections_to_process)
@@ -0,0 +1,289 @@
+# apps/home/capture.py
+# -*- encoding: utf-8 -*-
+import os
+import cv2
+import time
+import random
+import logging
+from . import native
+
+logger = logging.getLogger(__name__)
+
+
+# Status kesehatan capture
+CONNECTING = 'connecting'
+STREAMING = 'streaming'
+BACKOFF = 'backoff'
+FAILED = 'failed'
+
+# Timeout buka/baca untuk backend FFMPEG (tidak tersedia di OpenCV lama)
+_OPEN_TIMEOUT_PROP = getattr(cv2, 'CAP_PROP_OPEN_TIMEOUT_MSEC', None)
+_READ_TIMEOUT_PROP = getattr(cv2, 'CAP_PROP_READ_TIMEOUT_MSEC', None)
+
+
+class FrameGrabber:
+    """
+    Membaca frame dari kamera secara terus-menerus di thread native dan hanya
+    menyimpan frame terbaru (latest-frame slot). Grabber tidak dipakai langsung
+    oleh pipeline, melainkan lewat CaptureSubscription dari CaptureHub.
+
+    Koneksi dikelola sebagai state machine: connecting -> streaming, dan saat
+    gagal masuk ke backoff dengan jeda eksponensial ber-jitter. Setelah
+    max_retries percobaan berturut-turut status menjadi failed, tetapi grabber
+    tetap mencoba lagi setiap max_delay detik sehingga kamera yang hidup
+    kembali akan pulih tanpa restart.
+    """
+    def __init__(self, rtsp_url, name=None, base_delay=1.0, max_delay=60.0, max_retries=8,
+                 open_timeout=10.0, read_timeout=10.0):
+        self.rtsp_url = rtsp_url
+        self.name = name or rtsp_url
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retries = max_retries
+        self.open_timeout = open_timeout
+        self.read_timeout = read_timeout
+        # File video lokal dibaca sesuai FPS aslinya, bukan secepat decoder
+        self.is_file = isinstance(rtsp_url, str) and os.path.exists(rtsp_url)
+
+        self._lock = native.threading.Lock()
+        self._stop_event = native.threading.Event()
+        self._thread = None
+        self._frame = None
+        self._seq = 0
+
+        self.state = CONNECTING
+        self._logged_state = None
+        self.attempts = 0
+        self.next_retry_at = None
+        self.last_error = None
+        self.frames_read = 0
+        self.props = {}
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return self
+        self._stop_event.clear()
+        self.state = CONNECTING
+        self.attempts = 0
+        self._thread = native.threading.Thread(target=self._run, name=f"grabber-{self.name}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+
+    def is_alive(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def get(self, prop_id, default=0):
+        """Pengganti cap.get() untuk properti yang dibaca saat stream dibuka."""
+        return self.props.get(prop_id, default)
+
+    def latest(self):
+        """Mengembalikan (nomor_urut, frame) terbaru."""
+        with self._lock:
+            return self._seq, self._frame
+
+    def health(self):
+        retry_in = None
+        if self.next_retry_at is not None and self.state in (BACKOFF, FAILED):
+            retry_in = max(round(self.next_retry_at - time.time(), 1), 0)
+        return {
+            'state': self.state,
+            'attempts': self.attempts,
+            'retry_in': retry_in,
+            'error': self.last_error,
+            'frames_read': self.frames_read,
+        }
+
+    def _set_state(self, state, error=None):
+        # Hanya perubahan status "menetap" yang di-log, supaya kamera yang terus
+        # gagal tidak membanjiri log dengan connecting -> backoff di setiap percobaan
+        if state == CONNECTING:
+            logger.debug(f"Capture {self.name}: connecting (percobaan {self.attempts + 1})")
+        elif state != self._logged_state:
+            if state in (BACKOFF, FAILED):
+                logger.warning(f"⚠️ Capture {self.name}: {self._logged_state or CONNECTING} -> {state} ({error})")
+            else:
+                logger.info(f"ℹ️ Capture {self.name}: {self._logged_state or CONNECTING} -> {state}")
+            self._logged_state = state
+        self.state = state
+        if error is not None:
+            self.last_error = error
+
+    def _backoff_delay(self):
+        # Equal jitter: setengah jeda tetap, setengah acak, agar kamera tidak reconnect serempak
+        delay = min(self.max_delay, self.base_delay * (2 ** max(self.attempts - 1, 0)))
+        return random.uniform(delay / 2, delay)
+
+    def _open(self):
+        if self.is_file or '://' not in str(self.rtsp_url) or _OPEN_TIMEOUT_PROP is None:
+            cap = cv2.VideoCapture(self.rtsp_url)
+        else:
+            params = [_OPEN_TIMEOUT_PROP, int(self.open_timeout * 1000)]
+            if _READ_TIMEOUT_PROP is not None:
+                params += [_READ_TIMEOUT_PROP, int(self.read_timeout * 1000)]
+            cap = cv2.VideoCapture(self.rtsp_url, cv2.CAP_FFMPEG, params)
+        if not cap.isOpened():
+            cap.release()
+            return None
+        self.props = {
+            cv2.CAP_PROP_FPS: cap.get(cv2.CAP_PROP_FPS),
+            cv2.CAP_PROP_FRAME_WIDTH: cap.get(cv2.CAP_PROP_FRAME_WIDTH),
+            cv2.CAP_PROP_FRAME_HEIGHT: cap.get(cv2.CAP_PROP_FRAME_HEIGHT),
+        }
+        return cap
+
+    def _fail(self, error):
+        """Masuk ke backoff/failed lalu menunggu jeda (bisa diinterupsi stop())."""
+        self.attempts += 1
+        delay = self._backoff_delay()
+        self.next_retry_at = time.time() + delay
+        self._set_state(FAILED if self.attempts >= self.max_retries else BACKOFF, error)
+        self._stop_event.wait(delay)
+
+    def _run(self):
+        cap = None
+        frame_interval = 0
+
+        while not self._stop_event.is_set():
+            if cap is None:
+                self._set_state(CONNECTING)
+                cap = self._open()
+                if cap is None:
+                    self._fail(f"Gagal membuka stream (percobaan {self.attempts + 1})")
+                    continue
+                if self.is_file:
+                    frame_interval = 1.0 / (self.props.get(cv2.CAP_PROP_FPS) or 25)
+
+            started = native.monotonic()
+            ret, frame = cap.read()
+            if not ret:
+                cap.release()
+                cap = None
+                self._fail(f"Frame kosong atau timeout baca (percobaan {self.attempts + 1})")
+                continue
+
+            with self._lock:
+                self._frame = frame
+                self._seq += 1
+                self.frames_read += 1
+            if self.state != STREAMING:
+                self.attempts = 0
+                self.next_retry_at = None
+                self._set_state(STREAMING)
+
+            if frame_interval:
+                remaining = frame_interval - (native.monotonic() - started)
+                if remaining > 0:
+                    native.sleep(remaining)
+
+        if cap is not None:
+            cap.release()
+        logger.info(f"🛑 Grabber untuk {self.name} dihentikan.")
+
+
+class CaptureSubscription:
+    """
+    Handle milik satu pelanggan (pipeline AI, live view, perekam) atas sebuah
+    FrameGrabber bersama. Setiap pelanggan mencatat frame terakhir yang ia
+    baca, sehingga frame yang terlewat dihitung per pelanggan.
+
+    Frame yang dikembalikan dipakai bersama oleh semua pelanggan, jadi jangan
+    menggambar langsung di atasnya tanpa frame.copy().
+    """
+    def __init__(self, hub, grabber, name):
+        self._hub = hub
+        self._grabber = grabber
+        self.name = name
+        self.rtsp_url = grabber.rtsp_url
+        self._last_seq = 0
+        self.frames_dropped = 0
+        self.closed = False
+
+    @property
+    def state(self):
+        return self._grabber.state
+
+    @property
+    def frames_read(self):
+        return self._grabber.frames_read
+
+    def get(self, prop_id, default=0):
+        return self._grabber.get(prop_id, default)
+
+    def health(self):
+        """Kesehatan grabber ditambah frame yang terlewat oleh pelanggan ini."""
+        return dict(self._grabber.health(), frames_dropped=self.frames_dropped)
+
+    def read(self):
+        """
+        Mengambil frame terbaru yang belum pernah dibaca pelanggan ini.
+        Mengembalikan (False, None) jika belum ada frame baru.
+        """
+        seq, frame = self._grabber.latest()
+        if frame is None or seq == self._last_seq:
+            return False, None
+        if self._last_seq and seq > self._last_seq + 1:
+            self.frames_dropped += seq - self._last_seq - 1
+        self._last_seq = seq
+        return True, frame
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self._hub.unsubscribe(self)
+
+
+class CaptureHub:
+    """
+    Registry grabber per rtsp_url. Setiap sumber hanya di-decode sekali dan
+    frame-nya dibagikan ke semua pelanggan dengan reference counting; decoder
+    dihentikan saat pelanggan terakhir keluar.
+    """
+    def __init__(self):
+        self._lock = native.threading.Lock()
+        self._grabbers = {}
+        self._subscribers = {}
+
+    def subscribe(self, rtsp_url, name=None):
+        with self._lock:
+            grabber = self._grabbers.get(rtsp_url)
+            if grabber is None:
+                grabber = FrameGrabber(rtsp_url, name=name)
+                self._grabbers[rtsp_url] = grabber
+                self._subscribers[rtsp_url] = set()
+                logger.info(f"✅ Decoder baru untuk {rtsp_url} dibuat oleh {name}.")
+            # Mulai decoder jika belum berjalan
+            if not grabber.is_alive():
+                grabber.start()
+            subscription = CaptureSubscription(self, grabber, name or rtsp_url)
+            self._subscribers[rtsp_url].add(subscription)
+            logger.info(f"ℹ️ {subscription.name} berlangganan {rtsp_url} ({len(self._subscribers[rtsp_url])} pelanggan).")
+            return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.rtsp_url)
+            if subscribers is None:
+                return
+            subscribers.discard(subscription)
+            if not subscribers:
+                grabber = self._grabbers.pop(subscription.rtsp_url)
+                del self._subscribers[subscription.rtsp_url]
+                grabber.stop()
+                logger.info(f"🛑 Pelanggan terakhir keluar, decoder {subscription.rtsp_url} dihentikan.")
+
+    def stats(self):
+        with self._lock:
+            return {
+                url: {
+                    'subscribers': sorted(sub.name for sub in self._subscribers[url]),
+                    'frames_dropped': {sub.name: sub.frames_dropped for sub in self._subscribers[url]},
+                    **grabber.health(),
+                }
+                for url, grabber in self._grabbers.items()
+            }
+
+
+capture_hub = CaptureHub()
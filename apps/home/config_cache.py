@@ -0,0 +1,100 @@
+# apps/home/config_cache.py
+# -*- encoding: utf-8 -*-
+import logging
+import threading
+from types import SimpleNamespace
+
+logger = logging.getLogger(__name__)
+
+CAMERA = 'camera'
+MODEL = 'model'
+GLOBAL = 'global'
+
+
+def snapshot(obj):
+    """
+    Salinan nilai kolom sebuah baris model sebagai objek biasa (tanpa session),
+    sehingga aman dibaca dari thread AI setelah app context ditutup.
+    """
+    if obj is None:
+        return None
+    return SimpleNamespace(**{column.name: getattr(obj, column.name) for column in obj.__table__.columns})
+
+
+class ConfigCache:
+    """
+    Cache konfigurasi kamera, model AI, dan pengaturan global di memori proses.
+    Setiap entri menyimpan versi saat dimuat; route yang mengubah data memanggil
+    invalidate_* setelah commit sehingga versi naik dan pipeline memuat ulang
+    tepat satu kali pada frame berikutnya. Selama tidak ada perubahan, get
+    tidak menjalankan query sama sekali. Perubahan yang tidak lewat route
+    (misalnya edit database manual) memerlukan invalidate_all.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions = {}
+        self._entries = {}
+        self._epoch = 0
+
+        self.hits = 0
+        self.loads = 0
+
+    def version(self, kind, key=None):
+        return (self._epoch, self._versions.get((kind, key), 0))
+
+    def invalidate(self, kind, key=None):
+        with self._lock:
+            self._versions[(kind, key)] = self._versions.get((kind, key), 0) + 1
+
+    def invalidate_camera(self, cam_id):
+        """Dipanggil setelah kolom kamera (alarm, AI, ROI, garis hitung, dll.) berubah."""
+        self.invalidate(CAMERA, int(cam_id))
+
+    def invalidate_model(self, cam_id):
+        """Dipanggil setelah model AI atau ambang kepercayaan/IoU kamera berubah."""
+        self.invalidate(MODEL, int(cam_id))
+
+    def invalidate_global(self):
+        self.invalidate(GLOBAL)
+
+    def invalidate_all(self):
+        """Untuk perubahan massal (hapus kamera, factory default)."""
+        with self._lock:
+            self._epoch += 1
+
+    def _get(self, app, kind, key, loader):
+        version = self.version(kind, key)
+        entry = self._entries.get((kind, key))
+        if entry is not None and entry[0] == version:
+            self.hits += 1
+            return entry[1]
+
+        # Versi dibaca sebelum query: invalidasi selama memuat memicu muat ulang berikutnya
+        with app.app_context():
+            value = snapshot(loader())
+        self._entries[(kind, key)] = (version, value)
+        self.loads += 1
+        logger.debug(f"🔄 Konfigurasi {kind} {key if key is not None else ''} dimuat ulang (versi {version}).")
+        return value
+
+    def camera(self, app, cam_id):
+        """Snapshot baris Camera, atau None jika kamera tidak ada."""
+        from .models import Camera
+        cam_id = int(cam_id)
+        return self._get(app, CAMERA, cam_id, lambda: Camera.query.get(cam_id))
+
+    def model(self, app, cam_id):
+        """Snapshot AIModel milik kamera, atau None jika belum diatur."""
+        from .models import AIModel
+        cam_id = int(cam_id)
+        return self._get(app, MODEL, cam_id, lambda: AIModel.query.filter_by(cam_id=cam_id).first())
+
+    def global_settings(self, app):
+        from .models import GlobalSettings
+        return self._get(app, GLOBAL, None, lambda: GlobalSettings.query.first())
+
+    def stats(self):
+        return {'entries': len(self._entries), 'hits': self.hits, 'loads': self.loads}
+
+
+config_cache = ConfigCache()
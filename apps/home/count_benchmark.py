@@ -0,0 +1,148 @@
+# apps/home/count_benchmark.py
+# -*- encoding: utf-8 -*-
+"""
+Benchmark query hitungan harian pada tabel Count.
+
+    python -m apps.home.count_benchmark --rows 2000000
+
+Mengisi database SQLite sementara dengan --rows baris Count (tersebar di
+--days hari dan --cameras kamera), lalu membandingkan filter lama
+func.date(timestamp) == hari dengan filter rentang Count.on_day(hari) yang
+bisa memakai index ix_count_camera_timestamp_direction, serta dengan
+rollup harian. Setelah itu rollup dibangun ulang, ditambah lewat event
+writer, dua kamera dilepas seperti saat dihapus, dan check_rollups()
+memastikan total rollup tetap sama dengan COUNT(*) tabel Count.
+"""
+import os
+import time
+import random
+import argparse
+import datetime
+import tempfile
+import statistics
+from flask import Flask
+from sqlalchemy import insert, text
+from apps import db
+from .models import Camera, Count
+from .event_writer import event_writer
+from .rollup import rebuild_rollups, daily_totals, detach_camera_rollups, check_rollups
+
+SEED_BATCH_SIZE = 50000
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark func.date vs rentang timestamp pada tabel Count')
+    parser.add_argument('--rows', type=int, default=500000, help='Jumlah baris Count yang diisi')
+    parser.add_argument('--days', type=int, default=90, help='Rentang hari data')
+    parser.add_argument('--cameras', type=int, default=8, help='Jumlah kamera')
+    parser.add_argument('--repeat', type=int, default=5, help='Pengulangan setiap query')
+    parser.add_argument('--db', default=None, help='File SQLite (bawaan: file sementara)')
+    return parser.parse_args()
+
+
+def seed(rows, days, cameras):
+    """Mengisi tabel Camera dan Count dengan data acak yang bisa diulang."""
+    rng = random.Random(0)
+    db.session.execute(insert(Camera), [{'id': cam_id, 'name': f'Kamera {cam_id}'} for cam_id in range(1, cameras + 1)])
+    start = datetime.datetime.combine(datetime.date.today() - datetime.timedelta(days=days - 1), datetime.time.min)
+    span = days * 86400
+    for offset in range(0, rows, SEED_BATCH_SIZE):
+        batch = [{
+            'camera_id': rng.randint(1, cameras),
+            'camera_name': None,
+            'direction': rng.choice(('in', 'out')),
+            'timestamp': start + datetime.timedelta(seconds=rng.randrange(span)),
+        } for _ in range(min(SEED_BATCH_SIZE, rows - offset))]
+        db.session.execute(insert(Count), batch)
+    db.session.commit()
+    db.session.execute(text('ANALYZE'))
+
+
+def daily_counts_by_date(cameras, day):
+    """Filter lama: func.date(timestamp) harus dihitung untuk setiap baris."""
+    return {cam_id: {direction: Count.query.filter(
+        Count.camera_id == cam_id,
+        Count.direction == direction,
+        db.func.date(Count.timestamp) == day.strftime('%Y-%m-%d')
+    ).count() for direction in ('in', 'out')} for cam_id in cameras}
+
+
+def daily_counts_by_range(cameras, day):
+    """Filter rentang setengah terbuka: dijawab dari index tanpa membaca tabel."""
+    return {cam_id: {direction: Count.query.filter(
+        Count.camera_id == cam_id,
+        Count.direction == direction,
+        Count.on_day(day)
+    ).count() for direction in ('in', 'out')} for cam_id in cameras}
+
+
+def verify_rollups(app, cameras, events=2000):
+    """
+    Rollup hasil rebuild ditambah event baru lewat event writer, lalu dua
+    kamera dilepas (bucket NULL digabung). Gagal jika rollup tidak sama
+    dengan tabel Count.
+    """
+    rebuild_rollups()
+    rng = random.Random(1)
+    now = datetime.datetime.now()
+    event_writer.start(app)
+    for _ in range(events):
+        event_writer.submit(Count, camera_id=rng.choice(cameras), camera_name=None, direction=rng.choice(('in', 'out')),
+                            timestamp=now - datetime.timedelta(seconds=rng.randrange(3600)))
+    event_writer.stop()
+
+    for cam_id in cameras[:2]:
+        Count.query.filter_by(camera_id=cam_id).update({'camera_id': None})
+        detach_camera_rollups(cam_id)
+        db.session.commit()
+
+    problems = check_rollups()
+    assert not problems, "\n".join(problems)
+    return event_writer.written
+
+
+def timed(query, *args, repeat=5):
+    """Median durasi (ms) dari beberapa pengulangan, beserta hasil terakhir."""
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = query(*args)
+        durations.append((time.perf_counter() - started) * 1000)
+    return statistics.median(durations), result
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    path = args.db or os.path.join(tempfile.mkdtemp(), 'count_benchmark.db')
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        if Count.query.first() is None:
+            started = time.perf_counter()
+            seed(args.rows, args.days, args.cameras)
+            print(f"Mengisi {args.rows} baris Count dalam {time.perf_counter() - started:.1f} detik ({path})")
+
+        cameras = [cam.id for cam in Camera.query.order_by(Camera.id)]
+        today = datetime.date.today()
+        by_date_ms, by_date = timed(daily_counts_by_date, cameras, today, repeat=args.repeat)
+        by_range_ms, by_range = timed(daily_counts_by_range, cameras, today, repeat=args.repeat)
+        assert by_date == by_range, "Hasil filter func.date dan rentang berbeda"
+
+        rebuild_rollups()
+        rollup_ms, by_rollup = timed(daily_totals, today, repeat=args.repeat)
+        assert by_rollup == {cam_id: counts for cam_id, counts in by_range.items() if counts['in'] or counts['out']}, \
+            "Hasil rollup harian berbeda dengan tabel Count"
+
+        print(f"{'filter':<14}{'median ms':>12}")
+        print(f"{'func.date':<14}{by_date_ms:>12.1f}")
+        print(f"{'rentang':<14}{by_range_ms:>12.1f}")
+        print(f"{'rollup':<14}{rollup_ms:>12.1f}")
+        print(f"Percepatan {by_date_ms / max(by_range_ms, 1e-6):.0f}x untuk {len(cameras)} kamera x 2 arah, "
+              f"total hari ini {sum(c['in'] + c['out'] for c in by_range.values())}")
+
+        written = verify_rollups(app, cameras)
+        print(f"✅ Rollup = COUNT(*) setelah rebuild, {written} event lewat event writer, dan 2 kamera dilepas.")
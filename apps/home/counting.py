@@ -0,0 +1,308 @@
+# apps/home/counting.py
+# -*- encoding: utf-8 -*-
+import json
+import logging
+import numpy as np
+import cv2
+from .roi import parse_polygon
+
+logger = logging.getLogger(__name__)
+
+# Jarak piksel dari garis sebelum status 'sudah dihitung' sebuah track direset
+DEFAULT_RESET_DISTANCE = 50
+
+LINE_COLOR = (0, 0, 255)
+ZONE_COLOR = (255, 0, 255)
+
+def parse_geometry(counting_geometry, counting_line=None):
+    """
+    Membaca geometri penghitungan kamera dari JSON berupa
+    {"lines": [{"name": ..., "x1": ..., "y1": ..., "x2": ..., "y2": ...}, ...],
+     "zones": [{"name": ..., "points": [[x, y], ...]}, ...]}
+    dengan koordinat ternormalisasi. Tanpa counting_geometry, counting_line lama
+    dipakai sebagai satu garis. Mengembalikan (lines, zones), masing-masing
+    daftar (nama, array titik); entri yang tidak valid dilewati.
+    """
+    if counting_geometry:
+        geometry = json.loads(counting_geometry) if isinstance(counting_geometry, str) else counting_geometry
+    elif counting_line:
+        line = json.loads(counting_line) if isinstance(counting_line, str) else counting_line
+        geometry = {'lines': [line]} if line else {}
+    else:
+        return [], []
+    if not isinstance(geometry, dict):
+        raise TypeError("geometri harus berupa objek JSON")
+
+    lines = []
+    for index, line in enumerate(geometry.get('lines') or []):
+        try:
+            points = np.array([[line['x1'], line['y1']], [line['x2'], line['y2']]], dtype=np.float64)
+        except (TypeError, KeyError, ValueError):
+            logger.warning(f"⚠️ Garis hitung ke-{index + 1} tidak valid, dilewati.")
+            continue
+        lines.append((str(line.get('name') or f"garis {index + 1}"), points))
+
+    zones = []
+    for index, zone in enumerate(geometry.get('zones') or []):
+        points = parse_polygon(zone.get('points')) if isinstance(zone, dict) else None
+        if points is None:
+            logger.warning(f"⚠️ Zona hitung ke-{index + 1} tidak valid, dilewati.")
+            continue
+        zones.append((str(zone.get('name') or f"zona {index + 1}"), points.astype(np.float64)))
+    return lines, zones
+
+
+def serialize_geometry(lines, zones):
+    """Kebalikan parse_geometry: bentuk JSON yang disimpan di counting_geometry."""
+    return {
+        'lines': [
+            {'name': name, 'x1': float(points[0, 0]), 'y1': float(points[0, 1]), 'x2': float(points[1, 0]), 'y2': float(points[1, 1])}
+            for name, points in lines
+        ],
+        'zones': [{'name': name, 'points': points.tolist()} for name, points in zones],
+    }
+
+
+def points_in_polygons(points, edge_a, edge_b, edge_starts):
+    """
+    Ray casting untuk N titik terhadap semua polygon sekaligus. Sisi semua
+    polygon digabung (edge_a -> edge_b, E sisi) dan edge_starts menandai awal
+    sisi setiap polygon. Mengembalikan matriks boolean (N, Z).
+    """
+    px, py = points[:, None, 0], points[:, None, 1]
+    ax, ay, bx, by = edge_a[:, 0], edge_a[:, 1], edge_b[:, 0], edge_b[:, 1]
+    straddles = (ay > py) != (by > py)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        crossing_x = (bx - ax) * (py - ay) / (by - ay) + ax
+    crossings = straddles & (px < crossing_x)
+    return (np.add.reduceat(crossings.astype(np.int32), edge_starts, axis=1) % 2).astype(bool)
+
+
+def _draw_line(frame, start, end, name):
+    cv2.line(frame, start, end, LINE_COLOR, 2)
+    dx, dy = end[0] - start[0], end[1] - start[1]
+    length = (dx ** 2 + dy ** 2) ** 0.5
+    if length == 0:
+        return
+    mid_x, mid_y = (start[0] + end[0]) // 2, (start[1] + end[1]) // 2
+    offset_x, offset_y = int((-dy / length) * 20), int((dx / length) * 20)
+    font = cv2.FONT_HERSHEY_SIMPLEX
+    cv2.putText(frame, 'IN', (mid_x + offset_x, mid_y + offset_y), font, 0.4, (255, 255, 255), 1, cv2.LINE_AA)
+    cv2.putText(frame, 'OUT', (mid_x - offset_x, mid_y - offset_y), font, 0.4, (255, 255, 255), 1, cv2.LINE_AA)
+    if name:
+        cv2.putText(frame, name, (start[0], max(start[1] - 8, 0)), font, 0.4, LINE_COLOR, 1, cv2.LINE_AA)
+
+
+def _orientation(p, q, r):
+    """Tanda orientasi (-1, 0, 1) tiga titik; p, q, r berbentuk (N, 2) atau (2,)."""
+    return np.sign((q[..., 1] - p[..., 1]) * (r[..., 0] - q[..., 0]) - (q[..., 0] - p[..., 0]) * (r[..., 1] - q[..., 1]))
+
+
+def _on_segment(p, q, r):
+    """True jika q (kolinear dengan p-r) berada di dalam kotak pembatas segmen p-r."""
+    return ((q[..., 0] <= np.maximum(p[..., 0], r[..., 0])) & (q[..., 0] >= np.minimum(p[..., 0], r[..., 0])) &
+            (q[..., 1] <= np.maximum(p[..., 1], r[..., 1])) & (q[..., 1] >= np.minimum(p[..., 1], r[..., 1])))
+
+
+def segments_intersect(p1, p2, p3, p4):
+    """
+    Apakah segmen p1-p2 berpotongan dengan segmen p3-p4, termasuk kasus
+    bersinggungan/kolinear (uji orientasi yang sama dengan pengecekan per objek
+    sebelumnya). Semua argumen di-broadcast, misalnya satu garis (2,) terhadap
+    N langkah track (N, 2).
+    """
+    o1 = _orientation(p1, p2, p3)
+    o2 = _orientation(p1, p2, p4)
+    o3 = _orientation(p3, p4, p1)
+    o4 = _orientation(p3, p4, p2)
+    return (((o1 != o2) & (o3 != o4)) |
+            ((o1 == 0) & _on_segment(p1, p3, p2)) |
+            ((o2 == 0) & _on_segment(p1, p4, p2)) |
+            ((o3 == 0) & _on_segment(p3, p1, p4)) |
+            ((o4 == 0) & _on_segment(p3, p2, p4)))
+
+
+class LineCounter:
+    """
+    Mesin penghitung untuk semua track sekaligus, terhadap semua garis dan
+    zona kamera. ID track, titik tengah frame sebelumnya, status 'sudah
+    dihitung' per garis, dan keanggotaan per zona disimpan dalam array;
+    setiap frame, perpotongan segmen, arah IN/OUT, jarak reset, dan
+    point-in-polygon dihitung untuk semua track x semua bentuk dalam satu
+    langkah NumPy. Geometri di-parse hanya saat kolomnya berubah (diedit lewat
+    save_counting_line) dan diubah ke piksel sekali per resolusi.
+    """
+    def __init__(self, reset_distance=DEFAULT_RESET_DISTANCE):
+        self.reset_distance = reset_distance
+        self.lines = []
+        self.zones = []
+
+        self._config_key = None
+        self._cache_key = None
+        self._compiled = None
+        self.reset()
+
+        self.crossings = 0
+        self.zone_entries = {}
+        self.zone_exits = {}
+        self.zone_occupancy = {}
+
+    @classmethod
+    def from_camera(cls, camera_data):
+        counter = cls()
+        counter.configure(camera_data)
+        return counter
+
+    def configure(self, camera_data):
+        """
+        Mengambil geometri kamera jika kolomnya berubah (snapshot config_cache
+        yang sama dipakai ulang selama tidak diedit, sehingga perbandingan ini
+        murah); tanpa garis/zona yang valid, penghitungan nonaktif.
+        """
+        config_key = (camera_data.id, camera_data.counting_line, camera_data.counting_geometry)
+        if config_key == self._config_key:
+            return
+        self._config_key = config_key
+        self._cache_key = None
+
+        try:
+            self.lines, self.zones = parse_geometry(camera_data.counting_geometry, camera_data.counting_line)
+        except (json.JSONDecodeError, TypeError, AttributeError) as e:
+            logger.error(f"❌ Gagal memuat geometri penghitungan untuk kamera {camera_data.id}: {e}")
+            self.lines, self.zones = [], []
+        self.reset()
+
+        names = [name for name, _ in self.zones]
+        self.zone_entries = {name: self.zone_entries.get(name, 0) for name in names}
+        self.zone_exits = {name: self.zone_exits.get(name, 0) for name in names}
+        self.zone_occupancy = {name: 0 for name in names}
+
+    def reset(self):
+        self._ids = np.empty(0, dtype=np.int64)
+        self._centers = np.empty((0, 2), dtype=np.float64)
+        self._counted = np.empty((0, len(self.lines)), dtype=bool)
+        self._inside = np.empty((0, len(self.zones)), dtype=bool)
+
+    @property
+    def active(self):
+        return bool(self.lines or self.zones)
+
+    def compile(self, frame_shape):
+        """
+        Geometri dalam piksel untuk resolusi ini: ujung garis (L, 2) dibulatkan
+        ke bawah seperti sebelumnya, dan sisi semua zona digabung (E, 2).
+        """
+        h, w = frame_shape[:2]
+        cache_key = (h, w, self._config_key)
+        if cache_key == self._cache_key:
+            return self._compiled
+        self._cache_key = cache_key
+
+        scale = np.array([w, h], dtype=np.float64)
+        starts = np.array([points[0] for _, points in self.lines]).reshape(-1, 2)
+        ends = np.array([points[1] for _, points in self.lines]).reshape(-1, 2)
+        starts = (starts * scale).astype(np.int64).astype(np.float64)
+        ends = (ends * scale).astype(np.int64).astype(np.float64)
+
+        polygons = [points * scale for _, points in self.zones]
+        edge_a = np.concatenate(polygons) if polygons else np.empty((0, 2))
+        edge_b = np.concatenate([np.roll(points, -1, axis=0) for points in polygons]) if polygons else np.empty((0, 2))
+        edge_starts = np.cumsum([0] + [len(points) for points in polygons[:-1]]).astype(np.intp)
+
+        self._compiled = {
+            'starts': starts, 'ends': ends,
+            'edge_a': edge_a, 'edge_b': edge_b, 'edge_starts': edge_starts,
+            'polygons': [points.astype(np.int32).reshape(-1, 1, 2) for points in polygons],
+        }
+        return self._compiled
+
+    def update(self, frame_shape, ids, centers):
+        """
+        Memproses track frame ini (ID dan titik tengah). Mengembalikan daftar
+        event (obj_id, direction, line_name) untuk track yang baru melintasi
+        garis; masuk/keluar zona dan okupansinya diperbarui di zone_*. Track
+        yang tidak muncul di frame ini dilupakan.
+        """
+        ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+        centers = np.asarray(centers, dtype=np.float64).reshape(-1, 2)
+        if not self.active:
+            self.reset()
+            return []
+        geometry = self.compile(frame_shape)
+
+        # Titik tengah dan status frame sebelumnya untuk setiap ID (array terurut berdasarkan ID)
+        if len(self._ids):
+            index = np.minimum(np.searchsorted(self._ids, ids), len(self._ids) - 1)
+            known = self._ids[index] == ids
+            previous = self._centers[index]
+            counted = self._counted[index] & known[:, None]
+            was_inside = self._inside[index] & known[:, None]
+        else:
+            known = np.zeros(len(ids), dtype=bool)
+            previous = centers
+            counted = np.zeros((len(ids), len(self.lines)), dtype=bool)
+            was_inside = np.zeros((len(ids), len(self.zones)), dtype=bool)
+
+        events = []
+        if self.lines:
+            # Semua track (N) x semua garis (L)
+            start, end = geometry['starts'][None], geometry['ends'][None]
+            direction = end - start
+            crossed = known[:, None] & ~counted & segments_intersect(start, end, previous[:, None], centers[:, None])
+            # Sisi titik sebelumnya terhadap garis menentukan arah
+            side = direction[..., 0] * (previous[:, None, 1] - start[..., 1]) - direction[..., 1] * (previous[:, None, 0] - start[..., 0])
+            for track, line in zip(*np.nonzero(crossed)):
+                events.append((int(ids[track]), 'out' if side[track, line] > 0 else 'in', self.lines[line][0]))
+            counted |= crossed
+
+            # Reset status hitung setelah track cukup jauh dari garis
+            length = np.hypot(direction[..., 0], direction[..., 1])
+            with np.errstate(divide='ignore', invalid='ignore'):
+                distance = np.abs(direction[..., 1] * centers[:, None, 0] - direction[..., 0] * centers[:, None, 1] +
+                                  end[..., 0] * start[..., 1] - end[..., 1] * start[..., 0]) / length
+            distance = np.where(length > 0, distance, np.inf)  # Hindari pembagian dengan nol
+            reset = counted & (distance > self.reset_distance)
+            if reset.any():
+                logger.info(f"🔄 Reset status hitung untuk objek ID {', '.join(map(str, ids[reset.any(axis=1)].tolist()))}.")
+            counted &= ~reset
+
+        inside = np.zeros((len(ids), len(self.zones)), dtype=bool)
+        if self.zones and len(ids):
+            # Semua track (N) x semua zona (Z)
+            inside = points_in_polygons(centers, geometry['edge_a'], geometry['edge_b'], geometry['edge_starts'])
+            entered = (inside & ~was_inside & known[:, None]).sum(axis=0)
+            exited = (~inside & was_inside).sum(axis=0)
+            for (name, _), n_in, n_out, occupancy in zip(self.zones, entered.tolist(), exited.tolist(), inside.sum(axis=0).tolist()):
+                self.zone_entries[name] += n_in
+                self.zone_exits[name] += n_out
+                self.zone_occupancy[name] = occupancy
+        else:
+            self.zone_occupancy = {name: 0 for name, _ in self.zones}
+
+        order = np.argsort(ids, kind='stable')
+        self._ids, self._centers = ids[order], centers[order]
+        self._counted, self._inside = counted[order], inside[order]
+        self.crossings += len(events)
+        return events
+
+    def draw(self, frame):
+        """Menggambar semua garis (dengan label IN/OUT) dan zona beserta okupansinya."""
+        if not self.active:
+            return
+        geometry = self.compile(frame.shape)
+        for (name, _), start, end in zip(self.lines, geometry['starts'].astype(int).tolist(), geometry['ends'].astype(int).tolist()):
+            _draw_line(frame, tuple(start), tuple(end), name if len(self.lines) > 1 else None)
+        for (name, _), polygon in zip(self.zones, geometry['polygons']):
+            cv2.polylines(frame, [polygon], True, ZONE_COLOR, 2)
+            x, y = polygon[0, 0]
+            label = f"{name}: {self.zone_occupancy.get(name, 0)}"
+            cv2.putText(frame, label, (int(x), max(int(y) - 8, 0)), cv2.FONT_HERSHEY_SIMPLEX, 0.5, ZONE_COLOR, 1, cv2.LINE_AA)
+
+    def stats(self):
+        stats = {'crossings': self.crossings}
+        if self.zones:
+            stats['zones'] = {
+                name: {'occupancy': self.zone_occupancy[name], 'entries': self.zone_entries[name], 'exits': self.zone_exits[name]}
+                for name, _ in self.zones
+            }
+        return stats
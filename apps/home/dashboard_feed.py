@@ -0,0 +1,190 @@
+# apps/home/dashboard_feed.py
+# -*- encoding: utf-8 -*-
+import logging
+import datetime
+from collections import deque
+from . import native
+from .models import Count, AlarmLog
+from .event_writer import event_writer
+
+logger = logging.getLogger(__name__)
+
+LOG_LINES = 7
+
+
+def display_name(camera_id, camera_name):
+    """Nama kamera untuk log; kamera yang sudah dihapus diberi penanda."""
+    return f"{camera_name} (Dihapus)" if camera_id is None else camera_name
+
+
+def count_log_line(timestamp, camera_name, direction):
+    return f"[{timestamp.strftime('%H:%M:%S')}] Kamera {camera_name}: Orang '{direction}' terdeteksi."
+
+
+def alarm_log_line(timestamp, camera_name, message):
+    return f"[{timestamp.strftime('%H:%M:%S')}] {message} di Kamera {camera_name}."
+
+
+class DashboardFeed:
+    """
+    Snapshot dasbor di memori: hitungan hari ini per kamera dan log hitungan
+    serta alarm terbaru. Event writer memanggil record_counts/record_alarms
+    setelah batch Count/AlarmLog di-commit, sehingga snapshot hanya memuat
+    event yang tersimpan dan pengirim dasbor tidak perlu query setiap detik.
+    Setiap perubahan menaikkan versi global; kamera menyimpan versi perubahan
+    terakhirnya dan setiap baris log punya nomor urut, sehingga changes()
+    hanya mengembalikan kamera dan baris log yang baru sejak kiriman terakhir.
+    Database dibaca sekali saat seed (awal proses atau setelah log dihapus);
+    pergantian hari mereset hitungan tanpa query.
+    """
+    def __init__(self, log_lines=LOG_LINES):
+        # Lock native: record_* dipanggil dari thread native event writer
+        self._lock = native.threading.Lock()
+        self._seeded = False
+        self._day = None
+        self._counts = {}
+        self._versions = {}
+        self._version = 0
+        self._reseeded_at = 0
+        self._seq = 0
+        self._counting_logs = deque(maxlen=log_lines)
+        self._alarm_logs = deque(maxlen=log_lines)
+        self.log_lines = log_lines
+
+    def seed(self, app):
+        """
+        Memuat total hari ini dari rollup dan log terbaru dari database. Flush
+        event writer ditahan selama seed, jadi setiap batch tercatat tepat
+        sekali: sudah ada di database saat dibaca, atau masuk lewat on_commit.
+        """
+        with event_writer.paused():
+            self._seed(app)
+
+    def _seed(self, app):
+        from .rollup import daily_totals
+
+        today = datetime.date.today()
+        with app.app_context():
+            counts = daily_totals(today)
+            counting = Count.query.order_by(Count.timestamp.desc()).limit(self.log_lines).all()
+            alarms = AlarmLog.query.order_by(AlarmLog.timestamp.desc()).limit(self.log_lines).all()
+            counting_lines = [count_log_line(log.timestamp, display_name(log.camera_id, log.camera_name), log.direction)
+                              for log in reversed(counting)]
+            alarm_lines = [alarm_log_line(log.timestamp, display_name(log.camera_id, log.camera_name), log.message)
+                           for log in reversed(alarms)]
+
+        with self._lock:
+            self._day = today
+            for cam_id in set(self._counts) | set(counts):
+                self._counts[cam_id] = counts.get(cam_id, {'in': 0, 'out': 0})
+                self._touch(cam_id)
+            self._counting_logs.clear()
+            self._alarm_logs.clear()
+            for text in counting_lines:
+                self._append(self._counting_logs, text)
+            for text in alarm_lines:
+                self._append(self._alarm_logs, text)
+            # Klien dengan kursor sebelum titik ini menerima snapshot penuh (log lama sudah tidak berlaku)
+            self._version += 1
+            self._reseeded_at = self._version
+            self._seeded = True
+        logger.info(f"✅ Snapshot dasbor dimuat: {len(counts)} kamera.")
+
+    def ensure_seeded(self, app):
+        if not self._seeded:
+            self.seed(app)
+
+    def invalidate(self):
+        """Dipanggil setelah data hitungan/log dihapus; seed ulang saat diakses berikutnya."""
+        self._seeded = False
+
+    def _touch(self, cam_id):
+        self._version += 1
+        self._versions[cam_id] = self._version
+
+    def _append(self, logs, text):
+        self._seq += 1
+        logs.append({'seq': self._seq, 'text': text})
+
+    def _roll_day(self, day):
+        # Hanya maju: event terlambat dari hari sebelumnya tidak mereset hitungan
+        if self._day is not None and day <= self._day:
+            return
+        self._day = day
+        for cam_id in self._counts:
+            self._counts[cam_id] = {'in': 0, 'out': 0}
+            self._touch(cam_id)
+
+    def record_counts(self, rows):
+        """Hook on_commit event writer untuk baris Count yang baru tersimpan."""
+        now = datetime.datetime.now()
+        with self._lock:
+            for row in rows:
+                timestamp = row.get('timestamp') or now
+                cam_id = row.get('camera_id')
+                self._roll_day(timestamp.date())
+                if timestamp.date() == self._day:
+                    counts = self._counts.setdefault(cam_id, {'in': 0, 'out': 0})
+                    counts[row['direction']] = counts.get(row['direction'], 0) + 1
+                    self._touch(cam_id)
+                self._append(self._counting_logs, count_log_line(timestamp, display_name(cam_id, row.get('camera_name')), row['direction']))
+
+    def record_alarms(self, rows):
+        """Hook on_commit event writer untuk baris AlarmLog yang baru tersimpan."""
+        now = datetime.datetime.now()
+        with self._lock:
+            for row in rows:
+                timestamp = row.get('timestamp') or now
+                self._append(self._alarm_logs, alarm_log_line(timestamp, display_name(row.get('camera_id'), row.get('camera_name')), row['message']))
+
+    def totals(self):
+        """Salinan hitungan hari ini per kamera."""
+        with self._lock:
+            self._roll_day(datetime.date.today())
+            return {cam_id: dict(counts) for cam_id, counts in self._counts.items()}
+
+    def _snapshot(self):
+        return {
+            'chart_data': {cam_id: dict(counts) for cam_id, counts in self._counts.items()},
+            'counting_logs': list(self._counting_logs),
+            'alarm_logs': list(self._alarm_logs),
+        }
+
+    def snapshot(self):
+        """Data lengkap untuk klien yang baru terhubung."""
+        with self._lock:
+            self._roll_day(datetime.date.today())
+            return self._snapshot()
+
+    def cursor(self):
+        """Posisi (versi, nomor urut log) saat ini, sebagai titik awal changes()."""
+        with self._lock:
+            return self._version, self._seq
+
+    def changes(self, since_version, since_seq):
+        """
+        Kamera dan baris log yang berubah sejak (since_version, since_seq).
+        Mengembalikan (payload atau None jika tidak ada perubahan, versi, nomor urut).
+        """
+        with self._lock:
+            self._roll_day(datetime.date.today())
+            cursor = (self._version, self._seq)
+            if since_version < self._reseeded_at:
+                return dict(self._snapshot(), reset=True), cursor[0], cursor[1]
+            chart_data = {cam_id: dict(self._counts[cam_id])
+                          for cam_id, version in self._versions.items() if version > since_version}
+            counting_logs = [log for log in self._counting_logs if log['seq'] > since_seq]
+            alarm_logs = [log for log in self._alarm_logs if log['seq'] > since_seq]
+
+        if not (chart_data or counting_logs or alarm_logs):
+            return None, cursor[0], cursor[1]
+        payload = {'chart_data': chart_data, 'counting_logs': counting_logs, 'alarm_logs': alarm_logs}
+        return payload, cursor[0], cursor[1]
+
+
+dashboard_feed = DashboardFeed()
+
+
+# Snapshot hanya mengikuti event yang sudah di-commit oleh event writer
+event_writer.on_commit(Count, dashboard_feed.record_counts)
+event_writer.on_commit(AlarmLog, dashboard_feed.record_alarms)
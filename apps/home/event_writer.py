@@ -0,0 +1,236 @@
+# apps/home/event_writer.py
+# -*- encoding: utf-8 -*-
+import time
+import logging
+from collections import deque
+from contextlib import contextmanager
+from sqlalchemy import insert
+from sqlalchemy.exc import OperationalError
+from . import native
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_FLUSH_INTERVAL = 1.0
+DEFAULT_MAX_QUEUE = 10000
+DEFAULT_RETRIES = 5
+RETRY_BACKOFF = 0.05
+
+
+class EventWriter:
+    """
+    Penulis event database (Count, AlarmLog, FileRecord) di luar jalur video.
+    Pipeline hanya memasukkan baris ke antrean memori berukuran terbatas;
+    thread writer (thread native dengan app context sendiri, sehingga commit
+    dan fsync SQLite tidak menahan hub eventlet) menulisnya dalam satu
+    transaksi per batch saat antrean mencapai batch_size atau flush_interval
+    lewat. Kontensi lock SQLite
+    ('database is locked') dicoba ulang dengan backoff, lalu batch ditunda ke
+    flush berikutnya. Jika antrean penuh, event terlama dibuang dan dicatat di
+    statistik.
+    """
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE, flush_interval=DEFAULT_FLUSH_INTERVAL,
+                 max_queue=DEFAULT_MAX_QUEUE, retries=DEFAULT_RETRIES):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.retries = retries
+
+        self._queue = deque()
+        self._lock = native.threading.Lock()
+        self._flush_lock = native.threading.Lock()
+        self._wakeup = native.threading.Event()
+        self._stop_event = native.threading.Event()
+        self._thread = None
+        self._app = None
+        self._hooks = {}
+        self._commit_hooks = {}
+
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.retried = 0
+        self.flushes = 0
+        self.last_flush_ms = 0.0
+        self.total_flush_ms = 0.0
+
+    def configure(self, config):
+        """Mengambil ukuran batch, interval flush, dan batas antrean dari app.config."""
+        self.batch_size = max(int(config.get('AI_DB_BATCH_SIZE', self.batch_size)), 1)
+        self.flush_interval = max(float(config.get('AI_DB_FLUSH_INTERVAL_MS', self.flush_interval * 1000)) / 1000.0, 0.01)
+        self.max_queue = max(int(config.get('AI_DB_MAX_QUEUE', self.max_queue)), self.batch_size)
+        self.retries = max(int(config.get('AI_DB_RETRIES', self.retries)), 0)
+
+    def on_flush(self, model, callback):
+        """
+        Mendaftarkan callback(db, rows) yang dijalankan di dalam transaksi batch
+        setelah baris model ditulis, misalnya untuk memperbarui tabel rollup.
+        """
+        self._hooks.setdefault(model, []).append(callback)
+
+    def on_commit(self, model, callback):
+        """
+        Mendaftarkan callback(rows) yang dijalankan sekali setelah batch berisi
+        baris model berhasil di-commit, misalnya untuk snapshot di memori.
+        Berbeda dengan on_flush, callback ini tidak ikut terulang saat
+        transaksi dicoba ulang dan tidak dipanggil untuk event yang dibuang.
+        """
+        self._commit_hooks.setdefault(model, []).append(callback)
+
+    @contextmanager
+    def paused(self):
+        """
+        Menahan flush selama blok berjalan, agar pembaca yang memuat data dari
+        database lalu mengikuti on_commit tidak melewatkan atau menghitung
+        ganda batch yang di-commit di antaranya.
+        """
+        # Lock dipegang thread native selama commit; menunggunya lewat tpool
+        native.call(self._flush_lock.acquire)
+        try:
+            yield
+        finally:
+            self._flush_lock.release()
+
+    def start(self, app):
+        """Menjalankan thread writer sekali per proses; aman dipanggil berulang kali."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._app = app
+            self.configure(app.config)
+            self._stop_event.clear()
+            self._thread = native.threading.Thread(target=self._run, name='event-writer', daemon=True)
+            self._thread.start()
+        logger.info(f"✅ Event writer dimulai (batch {self.batch_size}, interval {self.flush_interval * 1000:.0f} ms).")
+
+    def stop(self):
+        """Menghentikan thread writer setelah antrean terakhir ditulis."""
+        self._stop_event.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            native.call(self._thread.join, self.flush_interval * 5)
+
+    def submit(self, model, **fields):
+        """
+        Memasukkan satu baris model ke antrean tanpa menyentuh database.
+        Kolom waktu sebaiknya diisi pemanggil agar mencerminkan waktu event.
+        """
+        with self._lock:
+            if len(self._queue) >= self.max_queue:
+                self._queue.popleft()
+                self.dropped += 1
+                if self.dropped % 100 == 1:
+                    logger.warning(f"⚠️ Antrean event writer penuh ({self.max_queue}). Event terlama dibuang.")
+            self._queue.append((model, fields))
+            depth = len(self._queue)
+        if depth >= self.batch_size:
+            self._wakeup.set()
+
+    @property
+    def queue_depth(self):
+        return len(self._queue)
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+        self.flush()
+
+    def _take_batch(self):
+        with self._lock:
+            count = min(len(self._queue), self.batch_size)
+            return [self._queue.popleft() for _ in range(count)]
+
+    def _requeue(self, batch):
+        with self._lock:
+            self._queue.extendleft(reversed(batch))
+            # Antrean tetap terbatas selama database terkunci lama: event terlama dibuang
+            overflow = len(self._queue) - self.max_queue
+            for _ in range(max(overflow, 0)):
+                self._queue.popleft()
+            if overflow > 0:
+                self.dropped += overflow
+                logger.warning(f"⚠️ Antrean event writer penuh ({self.max_queue}). {overflow} event terlama dibuang.")
+
+    def flush(self):
+        """Menulis semua isi antrean, satu transaksi per batch."""
+        from apps import db
+
+        while self._queue:
+            batch = self._take_batch()
+            grouped = {}
+            for model, fields in batch:
+                grouped.setdefault(model, []).append(fields)
+
+            started = time.perf_counter()
+            with self._flush_lock:
+                with self._app.app_context():
+                    try:
+                        written = self._write(db, grouped)
+                    finally:
+                        db.session.remove()
+                if written:
+                    self._committed(grouped)
+            if written is False:
+                # Database masih terkunci: batch dikembalikan dan dicoba pada flush berikutnya
+                self._requeue(batch)
+                return
+            if written:
+                elapsed = (time.perf_counter() - started) * 1000
+                self.written += len(batch)
+                self.flushes += 1
+                self.last_flush_ms = elapsed
+                self.total_flush_ms += elapsed
+            else:
+                self.failed += len(batch)
+
+    def _committed(self, grouped):
+        for model, rows in grouped.items():
+            for callback in self._commit_hooks.get(model, ()):
+                try:
+                    callback(rows)
+                except Exception as e:
+                    logger.error(f"❌ Callback setelah commit untuk {model.__name__} gagal: {e}")
+
+    def _write(self, db, grouped):
+        """
+        Satu transaksi untuk satu batch. True jika berhasil, False jika database
+        tetap terkunci setelah semua percobaan, None jika batch ditolak (dibuang).
+        """
+        for attempt in range(self.retries + 1):
+            try:
+                for model, rows in grouped.items():
+                    db.session.execute(insert(model), rows)
+                    for callback in self._hooks.get(model, ()):
+                        callback(db, rows)
+                db.session.commit()
+                return True
+            except OperationalError as e:
+                db.session.rollback()
+                if 'locked' not in str(e).lower():
+                    logger.error(f"❌ Gagal menulis event ke database, batch dibuang: {e}")
+                    return None
+                if attempt == self.retries:
+                    logger.warning(f"⚠️ Database terkunci, {sum(map(len, grouped.values()))} event ditunda: {e}")
+                    return False
+                self.retried += 1
+                native.sleep(RETRY_BACKOFF * (2 ** attempt))
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"❌ Gagal menulis event ke database, batch dibuang: {e}")
+                return None
+
+    def stats(self):
+        return {
+            'queue_depth': self.queue_depth,
+            'written': self.written,
+            'dropped': self.dropped,
+            'failed': self.failed,
+            'retried': self.retried,
+            'last_flush_ms': round(self.last_flush_ms, 2),
+            'avg_flush_ms': round(self.total_flush_ms / self.flushes, 2) if self.flushes else 0.0,
+        }
+
+
+event_writer = EventWriter()
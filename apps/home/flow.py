@@ -0,0 +1,195 @@
+# apps/home/flow.py
+# -*- encoding: utf-8 -*-
+import logging
+import numpy as np
+import cv2
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_INTERVAL = 10
+MIN_INTERVAL = 1
+# Ambang pergerakan (piksel frame kecil per frame) untuk menyesuaikan interval keyframe
+LOW_MOTION = 0.5
+HIGH_MOTION = 4.0
+# Titik dianggap hilang jika error forward-backward melewati ambang ini (piksel frame kecil)
+MAX_FB_ERROR = 1.0
+
+LK_PARAMS = dict(
+    winSize=(15, 15),
+    maxLevel=2,
+    criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03),
+)
+
+
+class FlowTracker:
+    """
+    Pelacakan antar keyframe dengan optical flow Lucas-Kanade. Detektor hanya
+    dijalankan pada keyframe; di antaranya, titik fitur di dalam setiap kotak
+    digerakkan dengan calcOpticalFlowPyrLK pada grayscale kecil dan kotak
+    digeser sebesar median pergerakannya. Interval keyframe membesar saat
+    pergerakan kecil dan track stabil, lalu mengecil saat pergerakan besar
+    atau titik banyak yang hilang.
+
+    Dengan bridge=True (diatur ai_stream saat stride scheduler > 1), track juga
+    dipropagasi di frame yang dilewati stride walaupun mode keyframe nonaktif;
+    jadwal deteksi tetap ditentukan scheduler.
+    """
+    def __init__(self, enabled=False, max_interval=DEFAULT_MAX_INTERVAL, width=320, points_per_box=12):
+        self.enabled = enabled
+        self.bridge = False
+        self.max_interval = max_interval
+        self.width = width
+        self.points_per_box = points_per_box
+
+        self.interval = 2
+        self._since_keyframe = 0
+        self._gray = None
+        self._scale = 1.0
+        self._points = None
+        self._owners = None
+        self._detections = []
+
+        self.last_motion = 0.0
+        self.last_confidence = 1.0
+        self.propagated = 0
+
+    @classmethod
+    def from_camera(cls, camera_data):
+        tracker = cls()
+        tracker.configure(camera_data)
+        return tracker
+
+    def configure(self, camera_data):
+        """Mengambil pengaturan per kamera; kolom kosong berarti mode keyframe nonaktif."""
+        enabled = bool(camera_data.flow_tracking)
+        if self.enabled and not enabled:
+            self.reset()
+        self.enabled = enabled
+        self.max_interval = max(camera_data.flow_max_interval or DEFAULT_MAX_INTERVAL, MIN_INTERVAL)
+        self.interval = min(self.interval, self.max_interval)
+
+    def reset(self):
+        self._gray = None
+        self._points = None
+        self._owners = None
+        self._detections = []
+
+    @property
+    def tracking(self):
+        return self.enabled or self.bridge
+
+    @property
+    def active(self):
+        """True jika ada track yang bisa dipropagasi sampai keyframe berikutnya."""
+        return self.tracking and bool(self._detections) and self._points is not None
+
+    def keyframe_due(self):
+        # Tanpa mode keyframe, kapan detektor berjalan sepenuhnya ditentukan scheduler
+        return not self.enabled or not self.active or self._since_keyframe >= self.interval
+
+    def _prepare(self, frame):
+        h, w = frame.shape[:2]
+        self._scale = self.width / float(w)
+        small = cv2.resize(frame, (self.width, max(int(h * self._scale), 1)), interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+    def _sample_points(self, gray, box):
+        """Titik fitur di dalam kotak (sudah diperkecil); grid sebagai cadangan di area polos."""
+        h, w = gray.shape
+        x1, y1, x2, y2 = (np.asarray(box, dtype=np.float32) * self._scale)
+        x1, y1 = int(max(x1, 0)), int(max(y1, 0))
+        x2, y2 = int(min(x2, w)), int(min(y2, h))
+        if x2 - x1 < 2 or y2 - y1 < 2:
+            return np.empty((0, 2), dtype=np.float32)
+
+        corners = cv2.goodFeaturesToTrack(gray[y1:y2, x1:x2], maxCorners=self.points_per_box, qualityLevel=0.01, minDistance=2)
+        if corners is not None and len(corners) >= 3:
+            return corners.reshape(-1, 2) + (x1, y1)
+
+        # Grid 3x3 di bagian tengah kotak
+        xs = np.linspace(x1 + (x2 - x1) * 0.25, x2 - (x2 - x1) * 0.25, 3)
+        ys = np.linspace(y1 + (y2 - y1) * 0.25, y2 - (y2 - y1) * 0.25, 3)
+        return np.stack(np.meshgrid(xs, ys), axis=-1).reshape(-1, 2).astype(np.float32)
+
+    def start(self, frame, detections):
+        """Dipanggil pada setiap keyframe dengan hasil detektor (format dict, sudah ber-ID)."""
+        self._since_keyframe = 0
+        if not self.tracking:
+            self.reset()
+            return
+        self._gray = self._prepare(frame)
+        self._detections = [dict(d, box=[int(v) for v in d['box']]) for d in detections]
+
+        points, owners = [], []
+        for index, det in enumerate(self._detections):
+            sampled = self._sample_points(self._gray, det['box'])
+            points.append(sampled)
+            owners.append(np.full(len(sampled), index))
+        if not points or not sum(len(p) for p in points):
+            self._points = None
+            return
+        self._points = np.concatenate(points).reshape(-1, 1, 2).astype(np.float32)
+        self._owners = np.concatenate(owners)
+
+    def propagate(self, frame):
+        """
+        Menggeser kotak keyframe ke frame sekarang. Mengembalikan daftar deteksi
+        baru (salinan) dengan 'box', 'center', dan 'flow_confidence' terbaru.
+        """
+        gray = self._prepare(frame)
+        self._since_keyframe += 1
+        self.propagated += 1
+
+        next_points, status, _ = cv2.calcOpticalFlowPyrLK(self._gray, gray, self._points, None, **LK_PARAMS)
+        back_points, back_status, _ = cv2.calcOpticalFlowPyrLK(gray, self._gray, next_points, None, **LK_PARAMS)
+        fb_error = np.linalg.norm((back_points - self._points).reshape(-1, 2), axis=1)
+        valid = (status.ravel() == 1) & (back_status.ravel() == 1) & (fb_error < MAX_FB_ERROR)
+
+        displacement = (next_points - self._points).reshape(-1, 2)
+        detections = []
+        confidences = []
+        motions = []
+        for index, det in enumerate(self._detections):
+            owned = self._owners == index
+            owned_valid = owned & valid
+            total = int(owned.sum())
+            confidence = owned_valid.sum() / total if total else 0.0
+            confidences.append(confidence)
+
+            det = dict(det)
+            if owned_valid.sum() >= 2:
+                dx, dy = np.median(displacement[owned_valid], axis=0)
+                motions.append(float(np.hypot(dx, dy)))
+                dx, dy = dx / self._scale, dy / self._scale
+                x1, y1, x2, y2 = det['box']
+                det['box'] = [int(round(x1 + dx)), int(round(y1 + dy)), int(round(x2 + dx)), int(round(y2 + dy))]
+                det['center'] = (int((det['box'][0] + det['box'][2]) / 2), int((det['box'][1] + det['box'][3]) / 2))
+            det['flow_confidence'] = round(float(confidence), 2)
+            detections.append(det)
+
+        # Hanya titik yang valid yang dibawa ke frame berikutnya
+        self._points = next_points[valid].reshape(-1, 1, 2)
+        self._owners = self._owners[valid]
+        self._gray = gray
+        self._detections = detections
+        if not len(self._points):
+            self._points = None
+
+        self.last_motion = float(np.mean(motions)) if motions else 0.0
+        self.last_confidence = float(min(confidences)) if confidences else 0.0
+        self._adapt_interval()
+        return detections
+
+    def _adapt_interval(self):
+        if self.last_confidence < 0.5 or self.last_motion > HIGH_MOTION:
+            self.interval = max(MIN_INTERVAL, self.interval // 2)
+        elif self.last_confidence > 0.8 and self.last_motion < LOW_MOTION:
+            self.interval = min(self.max_interval, self.interval + 1)
+
+    def stats(self):
+        return {
+            'keyframe_interval': self.interval if self.enabled else 1,
+            'flow_motion': round(self.last_motion, 2),
+            'flow_confidence': round(self.last_confidence, 2),
+            'flow_propagated': self.propagated,
+        }
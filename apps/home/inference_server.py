@@ -0,0 +1,293 @@
+# apps/home/inference_server.py
+# -*- encoding: utf-8 -*-
+import logging
+from collections import defaultdict
+from . import native
+from .model_registry import model_registry, model_key
+from .onnx_backend import load_yolo
+from .tiling import merge_detections
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceRequest:
+    """Satu frame yang menunggu diproses dalam micro-batch."""
+    __slots__ = ('frame', 'kwargs', 'key', 'submitted_at', 'result', 'error', '_done')
+
+    def __init__(self, frame, kwargs):
+        self.frame = frame
+        self.kwargs = kwargs
+        self.key = tuple(sorted((k, tuple(v) if isinstance(v, list) else v) for k, v in kwargs.items()))
+        self.submitted_at = native.monotonic()
+        self.result = None
+        self.error = None
+        self._done = native.threading.Event()
+
+    def set_result(self, result=None, error=None):
+        self.result = result
+        self.error = error
+        self._done.set()
+
+    def wait(self, timeout=30.0):
+        """Menunggu sampai worker mengisi hasil atau error untuk frame ini."""
+        if not native.wait(self._done, timeout):
+            raise TimeoutError("Inferensi batch melewati batas waktu.")
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class InferenceServer:
+    """
+    Layanan inferensi terpusat untuk satu model. Frame dari semua kamera yang
+    memakai model yang sama dikumpulkan menjadi micro-batch (maksimal
+    max_batch_size frame atau max_wait detik), lalu diproses dalam satu
+    forward pass di thread native.
+    """
+    def __init__(self, model, name, max_batch_size=8, max_wait=0.01):
+        self.model = model
+        self.name = name
+        self.names = model.names
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+
+        self._queue = native.queue.Queue()
+        self._stop_event = native.threading.Event()
+        self._thread = native.threading.Thread(target=self._run, name=f"inference-{name}", daemon=True)
+
+        self._stats_lock = native.threading.Lock()
+        self.frames = 0
+        self.batches = 0
+        self.max_queue_depth = 0
+        self.total_wait = 0.0
+        self.total_forward = 0.0
+        self._window_start = native.monotonic()
+        self._window_frames = 0
+        self.throughput = 0.0
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+
+    def infer(self, frame, **kwargs):
+        return self.infer_many([frame], **kwargs)[0]
+
+    def infer_many(self, frames, **kwargs):
+        """
+        Mengirim beberapa frame sekaligus (misalnya tile dari satu frame);
+        karena parameternya sama, frame-frame ini masuk ke batch yang sama.
+        """
+        requests = [InferenceRequest(frame, kwargs) for frame in frames]
+        for request in requests:
+            self._queue.put(request)
+        depth = self._queue.qsize()
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+        return [request.wait() for request in requests]
+
+    def _collect(self):
+        try:
+            first = self._queue.get(timeout=0.5)
+        except native.queue.Empty:
+            return []
+        batch = [first]
+        deadline = native.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - native.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except native.queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        logger.info(f"✅ Inference server {self.name} dimulai (batch maks {self.max_batch_size}, tunggu maks {self.max_wait * 1000:.0f} ms).")
+        while not self._stop_event.is_set():
+            batch = self._collect()
+            if not batch:
+                continue
+
+            # Frame dengan parameter berbeda (conf/iou/classes) tidak bisa digabung
+            groups = defaultdict(list)
+            for request in batch:
+                groups[request.key].append(request)
+
+            for requests in groups.values():
+                started = native.monotonic()
+                try:
+                    results = self.model.predict([r.frame for r in requests], verbose=False, **requests[0].kwargs)
+                except Exception as e:
+                    logger.error(f"❌ Inferensi batch {self.name} gagal: {e}")
+                    for request in requests:
+                        request.set_result(error=e)
+                    continue
+                finished = native.monotonic()
+                for request, result in zip(requests, results):
+                    request.set_result(result)
+                self._record(requests, started, finished)
+        logger.info(f"🛑 Inference server {self.name} dihentikan.")
+
+    def _record(self, requests, started, finished):
+        with self._stats_lock:
+            self.frames += len(requests)
+            self.batches += 1
+            self.total_forward += finished - started
+            self.total_wait += sum(started - r.submitted_at for r in requests)
+            self._window_frames += len(requests)
+            elapsed = finished - self._window_start
+            if elapsed >= 1.0:
+                self.throughput = self._window_frames / elapsed
+                self._window_start = finished
+                self._window_frames = 0
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                'model': self.name,
+                'queue_depth': self._queue.qsize(),
+                'max_queue_depth': self.max_queue_depth,
+                'frames': self.frames,
+                'batches': self.batches,
+                'avg_batch_size': round(self.frames / self.batches, 2) if self.batches else 0,
+                'throughput_fps': round(self.throughput, 1),
+                'avg_queue_wait_ms': round(self.total_wait / self.frames * 1000, 1) if self.frames else 0,
+                'avg_forward_ms': round(self.total_forward / self.batches * 1000, 1) if self.batches else 0,
+            }
+
+
+def _load_tracker_config(tracker_cfg):
+    from ultralytics.utils import IterableSimpleNamespace
+    from ultralytics.utils.checks import check_yaml
+    try:
+        from ultralytics.utils import YAML
+        cfg = YAML.load(check_yaml(tracker_cfg))
+    except ImportError:
+        from ultralytics.utils import yaml_load
+        cfg = yaml_load(check_yaml(tracker_cfg))
+    return IterableSimpleNamespace(**cfg)
+
+
+def _shift_result(result, frame, dx, dy):
+    """Memindahkan Results Ultralytics dari koordinat crop ke frame penuh."""
+    result.orig_img = frame
+    result.orig_shape = frame.shape[:2]
+    if result.boxes is not None:
+        boxes = result.boxes.data.clone()
+        boxes[:, [0, 2]] += dx
+        boxes[:, [1, 3]] += dy
+        result.update(boxes=boxes)
+    if result.keypoints is not None:
+        keypoints = result.keypoints.data.clone()
+        keypoints[..., 0] += dx
+        keypoints[..., 1] += dy
+        result.update(keypoints=keypoints)
+
+
+class TrackingClient:
+    """
+    Handle per kamera atas InferenceServer bersama. Antarmukanya meniru
+    YOLO.track(): deteksi berasal dari batch lintas kamera, sedangkan state
+    ByteTrack disimpan per kamera sehingga ID objek tidak tercampur.
+    """
+    def __init__(self, server, frame_rate=30, tracker_cfg='bytetrack.yaml'):
+        from ultralytics.trackers.byte_tracker import BYTETracker
+
+        self.server = server
+        self.names = server.names
+        self.tracker = BYTETracker(args=_load_tracker_config(tracker_cfg), frame_rate=frame_rate)
+
+    def track(self, frame, persist=True, classes=None, verbose=False, conf=None, iou=None, roi=None, tiles=None, **kwargs):
+        """
+        roi: kotak (x1, y1, x2, y2) opsional. Hanya crop ini yang dikirim ke
+        detektor; kotak hasilnya digeser kembali ke koordinat frame penuh
+        sebelum masuk tracker.
+        tiles: daftar kotak tile opsional. Semua tile dikirim dalam satu batch,
+        lalu digabung dengan NMS lintas tile sebelum masuk tracker.
+        """
+        import torch
+
+        predict_kwargs = dict(kwargs)
+        if conf is not None:
+            predict_kwargs['conf'] = conf
+        if iou is not None:
+            predict_kwargs['iou'] = iou
+        if classes is not None:
+            predict_kwargs['classes'] = list(classes)
+
+        if tiles:
+            result = self._infer_tiles(frame, tiles, predict_kwargs)
+        elif roi is None:
+            result = self.server.infer(frame, **predict_kwargs)
+        else:
+            x1, y1, x2, y2 = roi
+            result = self.server.infer(frame[y1:y2, x1:x2], **predict_kwargs)
+            _shift_result(result, frame, x1, y1)
+
+        # Sama seperti callback tracker Ultralytics: update tracker lalu tulis ID ke boxes
+        det = result.boxes.cpu().numpy()
+        tracks = self.tracker.update(det, result.orig_img)
+        if len(tracks) == 0:
+            return [result]
+        idx = tracks[:, -1].astype(int)
+        tracked = result[idx]
+        tracked.update(boxes=torch.as_tensor(tracks[:, :-1]))
+        return [tracked]
+
+    def _infer_tiles(self, frame, tiles, predict_kwargs):
+        import torch
+        from ultralytics.engine.results import Results
+
+        results = self.server.infer_many([frame[y1:y2, x1:x2] for x1, y1, x2, y2 in tiles], **predict_kwargs)
+        merged = merge_detections(
+            [r.boxes.data.cpu().numpy()[:, [0, 1, 2, 3, -2, -1]] for r in results],
+            [(x1, y1) for x1, y1, _, _ in tiles]
+        )
+        # Keypoint/mask per tile tidak digabung; mode tile hanya menghasilkan kotak
+        return Results(frame, path=results[0].path, names=self.names, boxes=torch.as_tensor(merged))
+
+    def close(self):
+        release_inference_server(self.server)
+
+
+def _start_server(model_path, threads, max_batch_size, max_wait):
+    """
+    Memuat model, memanaskannya, lalu memulai worker. Warm-up dilakukan
+    sebelum start() karena setelah itu model hanya boleh dipakai worker.
+    """
+    import numpy as np
+    server = InferenceServer(load_yolo(model_path, threads), name=model_path, max_batch_size=max_batch_size, max_wait=max_wait)
+    try:
+        server.model.predict(np.zeros((640, 640, 3), dtype=np.uint8), verbose=False)
+    except Exception as e:
+        logger.warning(f"⚠️ Warm-up inference server {model_path} gagal: {e}")
+    return server.start()
+
+
+def acquire_inference_server(model_path, max_batch_size=8, max_wait=0.01, threads=None):
+    """
+    Mengambil InferenceServer bersama untuk file model yang sama dari
+    model registry (dimuat, dipanaskan, dan dihitung referensinya di sana).
+    model_path boleh berupa .pt atau artefak .onnx; threads hanya berlaku
+    untuk ONNX Runtime.
+    """
+    key = model_key('yolo-server', model_path, max_batch_size, max_wait)
+    server = model_registry.acquire(
+        key,
+        loader=lambda: _start_server(model_path, threads, max_batch_size, max_wait),
+        closer=lambda server: server.stop()
+    )
+    server.registry_key = key
+    return server
+
+
+def release_inference_server(server):
+    model_registry.release(server.registry_key)
+
+
+def inference_stats():
+    return [model.stats() for model in model_registry.models() if isinstance(model, InferenceServer)]
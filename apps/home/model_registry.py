@@ -0,0 +1,155 @@
+# apps/home/model_registry.py
+# -*- encoding: utf-8 -*-
+import time
+import logging
+import threading
+from collections import OrderedDict
+from . import native
+
+logger = logging.getLogger(__name__)
+
+
+def model_key(model_type, file_path, *params):
+    """
+    Kunci registry. params berisi setiap nilai yang ditanamkan saat model
+    dibuat (misalnya ambang YOLOv3 atau ukuran batch inference server), agar
+    pemanggil dengan nilai berbeda mendapat instance sendiri.
+    """
+    return (model_type, file_path) + params
+
+
+class _Entry:
+    __slots__ = ('model', 'refs', 'closer', 'loaded_at', 'last_used')
+
+    def __init__(self, model, closer):
+        self.model = model
+        self.refs = 0
+        self.closer = closer
+        self.loaded_at = time.time()
+        self.last_used = self.loaded_at
+
+
+class _Loading:
+    """Penanda model yang sedang dimuat; pemanggil lain menunggu done."""
+    __slots__ = ('done', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.error = None
+
+
+class ModelRegistry:
+    """
+    Registry model untuk seluruh proses. Setiap kombinasi kunci dimuat sekali,
+    dipanaskan dengan satu inferensi dummy, lalu dibagikan dengan reference
+    counting. Model yang tidak dipakai kamera mana pun tetap disimpan (idle)
+    sampai jumlahnya melebihi max_idle, lalu dibuang berdasarkan LRU.
+    """
+    def __init__(self, max_idle=2):
+        self.max_idle = max_idle
+        self._lock = threading.RLock()
+        self._entries = {}
+        self._loading = {}
+        self._idle = OrderedDict()
+
+    def acquire(self, key, loader, warmup=None, closer=None):
+        """
+        Mengambil model dengan kunci key, memuatnya jika belum ada. Pemuatan
+        dan warm-up berjalan di luar lock pada thread OS (native.call), jadi
+        kamera lain dengan model berbeda tidak ikut menunggu. Pemanggil lain
+        dengan kunci yang sama menunggu pemuatan yang sedang berjalan.
+        """
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    logger.info(f"♻️ Memakai ulang model {key[0]} ({key[1]}) yang sudah dimuat.")
+                    return self._take(key, entry)
+                loading = self._loading.get(key)
+                if loading is None:
+                    loading = self._loading[key] = _Loading()
+                    break
+
+            # Model ini sedang dimuat pemanggil lain; setelah selesai, ambil dari entri
+            loading.done.wait()
+            if loading.error is not None:
+                raise loading.error
+
+        try:
+            started = time.time()
+            logger.info(f"⏳ Memuat model {key[0]} dari {key[1]}...")
+            model = native.call(self._load, key, loader, warmup)
+        except Exception as e:
+            with self._lock:
+                del self._loading[key]
+            loading.error = e
+            loading.done.set()
+            raise
+
+        with self._lock:
+            entry = self._entries[key] = _Entry(model, closer)
+            del self._loading[key]
+            model = self._take(key, entry)
+        loading.done.set()
+        logger.info(f"✅ Model {key[0]} ({key[1]}) dimuat dalam {time.time() - started:.1f} detik.")
+        return model
+
+    @staticmethod
+    def _load(key, loader, warmup):
+        model = loader()
+        if warmup:
+            try:
+                warmup(model)
+            except Exception as e:
+                logger.warning(f"⚠️ Warm-up model {key[0]} gagal: {e}")
+        return model
+
+    def _take(self, key, entry):
+        self._idle.pop(key, None)
+        entry.refs += 1
+        entry.last_used = time.time()
+        return entry.model
+
+    def release(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry.refs = max(entry.refs - 1, 0)
+            entry.last_used = time.time()
+            if entry.refs == 0:
+                self._idle[key] = entry
+                self._idle.move_to_end(key)
+                self._evict()
+
+    def _evict(self):
+        while len(self._idle) > self.max_idle:
+            key, entry = self._idle.popitem(last=False)
+            del self._entries[key]
+            if entry.closer:
+                try:
+                    entry.closer(entry.model)
+                except Exception as e:
+                    logger.warning(f"⚠️ Gagal menutup model {key[0]}: {e}")
+            logger.info(f"🗑️ Model idle {key[0]} ({key[1]}) dikeluarkan dari registry.")
+
+    def models(self):
+        with self._lock:
+            return [entry.model for entry in self._entries.values()]
+
+    def stats(self):
+        with self._lock:
+            return [
+                {
+                    'model_type': key[0],
+                    'file_path': key[1],
+                    'refs': entry.refs,
+                    'idle': key in self._idle,
+                    'loaded_at': entry.loaded_at,
+                    'last_used': entry.last_used,
+                }
+                for key, entry in self._entries.items()
+            ]
+
+
+model_registry = ModelRegistry()
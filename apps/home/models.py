@@ -15,6 +15,8 @@ class Camera(db.Model):
     rtsp_url = db.Column(db.String(256), unique=False, nullable=True)
     is_ai_enabled = db.Column(db.Boolean, default=False)
     counting_line = db.Column(db.Text, nullable=True)
+    # Beberapa garis dan zona polygon: {"lines": [...], "zones": [...]} (lihat counting.parse_geometry)
+    counting_geometry = db.Column(db.Text, nullable=True)
     
     # Tambahan untuk nama & lokasi
     name = db.Column(db.String(100), nullable=True)
@@ -22,7 +24,27 @@ class Camera(db.Model):
 
     alarm_trigger = db.Column(db.String(50), nullable=True)
     alarm_action = db.Column(db.Text, nullable=True)
-    
+
+    # Motion gate: lewati detektor jika adegan statis
+    motion_gate = db.Column(db.Boolean, default=True)
+    motion_pixel_threshold = db.Column(db.Integer, default=25)
+    motion_area_threshold = db.Column(db.Float, default=0.002)
+    motion_keyframe_interval = db.Column(db.Integer, default=30)
+
+    # Region of interest: deteksi hanya di sekitar garis hitung atau polygon
+    roi_mode = db.Column(db.String(20), default='off') # 'off', 'line', atau 'polygon'
+    roi_padding = db.Column(db.Float, default=0.2)
+    roi_polygon = db.Column(db.Text, nullable=True)
+
+    # Inferensi tile untuk kamera resolusi tinggi (1x1 = nonaktif)
+    tile_rows = db.Column(db.Integer, default=1)
+    tile_cols = db.Column(db.Integer, default=1)
+    tile_overlap = db.Column(db.Float, default=0.2)
+
+    # Deteksi keyframe + optical flow di antaranya
+    flow_tracking = db.Column(db.Boolean, default=False)
+    flow_max_interval = db.Column(db.Integer, default=10)
+
     ai_models = db.relationship('AIModel', backref='camera', lazy=True)
 
     def __repr__(self):
@@ -43,18 +65,57 @@ class AIModel(db.Model):
     def __repr__(self):
         return f'<AIModel {self.filename}>'
 
+def day_range(day):
+    """
+    Rentang setengah terbuka [00:00 hari itu, 00:00 hari berikutnya). Filter
+    timestamp dengan rentang (bukan func.date(timestamp)) bisa memakai index.
+    """
+    start = datetime.datetime.combine(day, datetime.time.min)
+    return start, start + datetime.timedelta(days=1)
+
+
 class Count(db.Model):
     __tablename__ = 'count'
+    __table_args__ = (
+        # Hitungan harian per kamera dan arah: camera_id sama, rentang timestamp
+        db.Index('ix_count_camera_timestamp_direction', 'camera_id', 'timestamp', 'direction'),
+        # Hitungan harian semua kamera dan log terbaru (ORDER BY timestamp DESC)
+        db.Index('ix_count_timestamp', 'timestamp'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     camera_id = db.Column(db.Integer, db.ForeignKey('camera.id', ondelete='SET NULL'), nullable=True)
     camera_name = db.Column(db.String(100), nullable=True)
     direction = db.Column(db.String(10), nullable=False) # 'in' or 'out'
+    line_name = db.Column(db.String(100), nullable=True) # Nama garis hitung yang dilintasi
     timestamp = db.Column(db.DateTime, default=datetime.datetime.now)
 
+    @classmethod
+    def on_day(cls, day):
+        """Kondisi filter untuk semua hitungan pada tanggal tertentu."""
+        start, end = day_range(day)
+        return db.and_(cls.timestamp >= start, cls.timestamp < end)
+
     def __repr__(self):
         return f'<Count {self.camera_id} - {self.direction} at {self.timestamp}>'
 
+# --- ROLLUP HITUNGAN (lihat apps/home/rollup.py) ---
+class CountRollup(db.Model):
+    __tablename__ = 'count_rollup'
+    __table_args__ = (
+        db.Index('ix_count_rollup_bucket', 'granularity', 'bucket', 'camera_id', 'direction', unique=True),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    granularity = db.Column(db.String(10), nullable=False) # 'minute', 'hour', atau 'day'
+    bucket = db.Column(db.DateTime, nullable=False) # Awal menit/jam/hari
+    camera_id = db.Column(db.Integer, db.ForeignKey('camera.id', ondelete='SET NULL'), nullable=True)
+    direction = db.Column(db.String(10), nullable=False)
+    total = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<CountRollup {self.granularity} {self.bucket} {self.camera_id} {self.direction}={self.total}>'
+
 # --- MODEL BARU UNTUK PENGATURAN GLOBAL ---
 
 class GlobalSettings(db.Model):
@@ -97,4 +158,3 @@ class AlarmLog(db.Model):
 
     def __repr__(self):
         return f'<AlarmLog {self.id} - {self.message} at {self.timestamp}>'
-
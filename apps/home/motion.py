@@ -0,0 +1,88 @@
+# apps/home/motion.py
+# -*- encoding: utf-8 -*-
+import cv2
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PIXEL_THRESHOLD = 25
+DEFAULT_AREA_THRESHOLD = 0.002
+DEFAULT_KEYFRAME_INTERVAL = 30
+
+
+class MotionGate:
+    """
+    Pra-filter gerakan murah sebelum detektor. Frame diperkecil menjadi
+    grayscale kecil lalu dibandingkan dengan frame terakhir yang dianalisis
+    detektor. Jika bagian yang berubah di bawah ambang, inferensi dilewati
+    dan state pelacakan dari deteksi terakhir tetap dipakai.
+    """
+    def __init__(self, enabled=True, pixel_threshold=DEFAULT_PIXEL_THRESHOLD,
+                 area_threshold=DEFAULT_AREA_THRESHOLD, keyframe_interval=DEFAULT_KEYFRAME_INTERVAL, width=160):
+        self.enabled = enabled
+        self.pixel_threshold = pixel_threshold
+        self.area_threshold = area_threshold
+        self.keyframe_interval = keyframe_interval
+        self.width = width
+
+        self._reference = None
+        self._since_keyframe = 0
+        self.last_motion_ratio = 0.0
+        self.checked = 0
+        self.skipped = 0
+
+    @classmethod
+    def from_camera(cls, camera_data):
+        gate = cls()
+        gate.configure(camera_data)
+        return gate
+
+    def configure(self, camera_data):
+        """Mengambil pengaturan per kamera; kolom kosong memakai nilai bawaan."""
+        self.enabled = camera_data.motion_gate if camera_data.motion_gate is not None else True
+        self.pixel_threshold = camera_data.motion_pixel_threshold or DEFAULT_PIXEL_THRESHOLD
+        self.area_threshold = camera_data.motion_area_threshold if camera_data.motion_area_threshold is not None else DEFAULT_AREA_THRESHOLD
+        self.keyframe_interval = camera_data.motion_keyframe_interval or DEFAULT_KEYFRAME_INTERVAL
+
+    def _prepare(self, frame):
+        h, w = frame.shape[:2]
+        height = max(int(h * self.width / w), 1)
+        small = cv2.resize(frame, (self.width, height), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def should_detect(self, frame):
+        """
+        True jika detektor perlu dijalankan: ada gerakan sejak deteksi
+        terakhir, atau sudah waktunya keyframe paksa.
+        """
+        if not self.enabled:
+            return True
+
+        self.checked += 1
+        gray = self._prepare(frame)
+        if self._reference is None or self._reference.shape != gray.shape:
+            self._reference = gray
+            self._since_keyframe = 0
+            return True
+
+        diff = cv2.absdiff(gray, self._reference)
+        _, mask = cv2.threshold(diff, self.pixel_threshold, 255, cv2.THRESH_BINARY)
+        self.last_motion_ratio = cv2.countNonZero(mask) / mask.size
+
+        self._since_keyframe += 1
+        if self.last_motion_ratio >= self.area_threshold or self._since_keyframe >= self.keyframe_interval:
+            # Referensi = frame terakhir yang dilihat detektor, jadi perubahan lambat tetap terakumulasi
+            self._reference = gray
+            self._since_keyframe = 0
+            return True
+
+        self.skipped += 1
+        return False
+
+    def stats(self):
+        return {
+            'motion_ratio': round(self.last_motion_ratio, 4),
+            'motion_skipped': self.skipped,
+            'motion_checked': self.checked,
+        }
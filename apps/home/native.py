@@ -0,0 +1,50 @@
+# apps/home/native.py
+# -*- encoding: utf-8 -*-
+"""
+Akses ke modul threading/time/queue asli (tidak di-patch oleh eventlet).
+
+run.py memanggil eventlet.monkey_patch(), sehingga threading.Thread menjadi
+green thread yang berbagi satu thread OS. Pekerjaan yang memblokir di kode C
+(cv2.VideoCapture.read, inferensi model) harus berjalan di thread OS asli
+agar tidak menahan hub eventlet.
+"""
+
+__all__ = ['threading', 'time', 'queue', 'sleep', 'monotonic', 'wait', 'call']
+
+try:
+    from eventlet import patcher as _patcher
+    from eventlet import tpool as _tpool
+    threading = _patcher.original('threading')
+    time = _patcher.original('time')
+    queue = _patcher.original('queue')
+except ImportError:
+    _patcher = None
+    _tpool = None
+    import threading
+    import time
+    import queue
+
+sleep = time.sleep
+monotonic = time.monotonic
+
+
+def wait(event, timeout=None):
+    """
+    Menunggu native threading.Event dari thread pemanggil. Pada green thread,
+    wait yang memblokir dipindahkan ke tpool sehingga green thread lain tetap
+    dijadwalkan sampai event di-set oleh thread native.
+    """
+    if _tpool is None or not _patcher.is_monkey_patched('thread'):
+        return event.wait(timeout)
+    return _tpool.execute(event.wait, timeout)
+
+
+def call(func, *args, **kwargs):
+    """
+    Menjalankan func (misalnya memuat model) di thread OS lewat tpool jika
+    dipanggil dari green thread, lalu mengembalikan hasilnya atau meneruskan
+    exception-nya.
+    """
+    if _tpool is None or not _patcher.is_monkey_patched('thread'):
+        return func(*args, **kwargs)
+    return _tpool.execute(func, *args, **kwargs)
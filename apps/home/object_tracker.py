@@ -0,0 +1,65 @@
+# apps/home/object_tracker.py
+# -*- encoding: utf-8 -*-
+import logging
+import numpy as np
+from .sort import BatchSort
+
+logger = logging.getLogger(__name__)
+
+# Dihitung dalam jumlah pemanggilan detektor, bukan frame video
+DEFAULT_MAX_AGE = 5
+# 0: deteksi baru langsung mendapat ID dan ikut digambar/dicek alarm, seperti sebelumnya
+DEFAULT_MIN_HITS = 0
+DEFAULT_IOU_THRESHOLD = 0.2
+
+
+class ObjectTracker:
+    """
+    Pelacak untuk YOLOv5/YOLOv3/SSD (model tanpa .track() bawaan). Setiap
+    kelas punya BatchSort sendiri sehingga ID tidak berpindah antar kelas;
+    asosiasi memakai Hungarian atas matriks IoU kotak prediksi Kalman, semua
+    dalam NumPy. ID diambil dari penghitung global BatchSort sehingga selalu
+    naik dan tidak pernah dipakai ulang.
+    """
+    def __init__(self, max_age=DEFAULT_MAX_AGE, min_hits=DEFAULT_MIN_HITS, iou_threshold=DEFAULT_IOU_THRESHOLD):
+        self.max_age = max_age
+        self.min_hits = min_hits
+        self.iou_threshold = iou_threshold
+        self._trackers = {}
+
+    def reset(self):
+        self._trackers = {}
+
+    def update(self, detections):
+        """
+        Memberi 'id' pada deteksi format dict (name, box, confidence, center).
+        Mengembalikan deteksi yang termasuk track terkonfirmasi, urutan mengikuti
+        hasil tracker. Kelas tanpa deteksi di frame ini tetap di-update agar
+        track-nya menua dan akhirnya dihapus.
+        """
+        by_class = {}
+        for det in detections:
+            by_class.setdefault(det['name'], []).append(det)
+
+        tracked = []
+        for name in set(self._trackers) | set(by_class):
+            tracker = self._trackers.get(name)
+            if tracker is None:
+                tracker = self._trackers[name] = BatchSort(self.max_age, self.min_hits, self.iou_threshold)
+
+            class_dets = by_class.get(name, [])
+            dets = np.array([[*d['box'], d['confidence']] for d in class_dets], dtype=float).reshape(-1, 5)
+            tracks = tracker.update(dets)
+            for track_id, index in zip(tracks[:, 4].astype(int).tolist(), tracker.last_indices.tolist()):
+                det = class_dets[index]
+                det['id'] = track_id
+                tracked.append(det)
+        return tracked
+
+    def stats(self):
+        trackers = self._trackers.values()
+        return {
+            'tracks': int(sum(len(tracker.ids) for tracker in trackers)),
+            # Waktu asosiasi deteksi-track pada frame terakhir (gating spasial saat ramai)
+            'association_ms': round(sum(tracker.association_time for tracker in trackers) * 1000, 2),
+        }
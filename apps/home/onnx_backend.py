@@ -0,0 +1,190 @@
+# apps/home/onnx_backend.py
+# -*- encoding: utf-8 -*-
+import os
+import glob
+import time
+import hashlib
+import logging
+import argparse
+import importlib.util
+import numpy as np
+from ultralytics import YOLO
+from . import native
+
+logger = logging.getLogger(__name__)
+
+# Satu ekspor per artefak; kamera lain yang meminta file yang sama menunggu hasilnya
+_export_lock = native.threading.Lock()
+
+
+def onnx_available():
+    return importlib.util.find_spec('onnxruntime') is not None
+
+
+def file_hash(path, chunk_size=1024 * 1024):
+    """Hash isi file bobot; dipakai sebagai kunci cache artefak ONNX."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def onnx_artifact_path(model_path, quantize=False):
+    """
+    Lokasi artefak ONNX di sebelah file bobot, misalnya
+    apps/static/models/yolov8n.3f2a9c1b0d4e5f60.int8.onnx
+    """
+    stem = os.path.splitext(model_path)[0]
+    suffix = '.int8.onnx' if quantize else '.onnx'
+    return f"{stem}.{file_hash(model_path)}{suffix}"
+
+
+def export_onnx(model_path, quantize=False, imgsz=640):
+    """
+    Mengekspor model .pt ke ONNX (batch dinamis) sekali saja, opsional dengan
+    kuantisasi dinamis INT8. Artefak di-cache berdasarkan hash file bobot,
+    sehingga restart tidak mengekspor ulang. Mengembalikan path artefak.
+    """
+    target = onnx_artifact_path(model_path, quantize)
+    with _export_lock:
+        if os.path.exists(target):
+            return target
+
+        fp32_path = onnx_artifact_path(model_path, quantize=False)
+        if not os.path.exists(fp32_path):
+            started = time.time()
+            logger.info(f"⏳ Mengekspor {model_path} ke ONNX...")
+            exported = YOLO(model_path).export(format='onnx', dynamic=True, simplify=True, imgsz=imgsz, verbose=False)
+            os.replace(exported, fp32_path)
+            logger.info(f"✅ Ekspor ONNX selesai dalam {time.time() - started:.1f} detik: {fp32_path}")
+
+        if quantize:
+            from onnxruntime.quantization import quantize_dynamic, QuantType
+            logger.info(f"⏳ Kuantisasi INT8 {fp32_path}...")
+            # QUInt8: ConvInteger di CPU execution provider tidak mendukung bobot int8 bertanda
+            quantize_dynamic(fp32_path, target, weight_type=QuantType.QUInt8)
+            logger.info(f"✅ Model INT8 disimpan: {target}")
+        return target
+
+
+def resolve_runtime_model(model_path, enabled=True, quantize=False):
+    """
+    Mengembalikan path model yang akan dijalankan: artefak ONNX jika
+    onnxruntime tersedia dan ekspor berhasil, selain itu file .pt aslinya.
+    """
+    if not enabled or not model_path.endswith('.pt'):
+        return model_path
+    if not onnx_available():
+        logger.warning("⚠️ onnxruntime tidak terpasang. Memakai backend PyTorch.")
+        return model_path
+    try:
+        # Ekspor bisa memakan puluhan detik; dijalankan di thread OS agar hub tidak tertahan
+        return native.call(export_onnx, model_path, quantize=quantize)
+    except Exception as e:
+        logger.error(f"❌ Ekspor ONNX untuk {model_path} gagal, memakai backend PyTorch: {e}")
+        return model_path
+
+
+def remove_onnx_artifacts(model_path):
+    """Menghapus semua artefak ONNX hasil ekspor dari file bobot ini."""
+    stem = os.path.splitext(model_path)[0]
+    for artifact in glob.glob(f"{glob.escape(stem)}.{'[0-9a-f]' * 16}*.onnx"):
+        try:
+            os.remove(artifact)
+        except OSError as e:
+            logger.warning(f"⚠️ Gagal menghapus artefak ONNX {artifact}: {e}")
+
+
+def tune_onnx_session(model, model_path, threads):
+    """
+    Mengganti session ONNX Runtime bawaan Ultralytics dengan session yang
+    jumlah thread-nya diatur. Inferensi berjalan di satu worker, jadi
+    paralelisme cukup di dalam operator (intra-op).
+    """
+    import onnxruntime as ort
+
+    backend = getattr(model.predictor, 'model', None) if model.predictor else None
+    if getattr(backend, 'session', None) is None:
+        return False
+
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = threads
+    options.inter_op_num_threads = 1
+    options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    backend.session = ort.InferenceSession(model_path, sess_options=options, providers=['CPUExecutionProvider'])
+    logger.info(f"✅ Session ONNX Runtime untuk {os.path.basename(model_path)} memakai {threads} thread.")
+    return True
+
+
+def load_yolo(model_path, threads=None):
+    """Memuat YOLO dari .pt atau .onnx; untuk ONNX, session langsung disetel."""
+    model = YOLO(model_path)
+    if model_path.endswith('.onnx') and threads:
+        # Predictor (dan session-nya) baru dibuat pada panggilan pertama
+        model.predict(np.zeros((640, 640, 3), dtype=np.uint8), verbose=False)
+        tune_onnx_session(model, model_path, threads)
+    return model
+
+
+def _benchmark(model, frames, warmup=5):
+    for frame in frames[:warmup]:
+        model.predict(frame, verbose=False)
+    started = time.perf_counter()
+    for frame in frames:
+        model.predict(frame, verbose=False)
+    return len(frames) / (time.perf_counter() - started)
+
+
+def _load_frames(source, count):
+    import cv2
+
+    if not source:
+        rng = np.random.default_rng(0)
+        return [rng.integers(0, 255, (720, 1280, 3), dtype=np.uint8) for _ in range(count)]
+    cap = cv2.VideoCapture(source)
+    frames = []
+    while len(frames) < count:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    if not frames:
+        raise SystemExit(f"Tidak ada frame yang bisa dibaca dari {source}")
+    return frames
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Perbandingan FPS backend PyTorch dan ONNX Runtime')
+    parser.add_argument('model', help='Path file bobot .pt')
+    parser.add_argument('--source', help='Video/gambar uji (default: frame acak 1280x720)', default=None)
+    parser.add_argument('--frames', type=int, default=100)
+    parser.add_argument('--threads', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--int8', action='store_true', help='Ikut uji model ONNX INT8')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    # python -m apps.home.onnx_backend apps/static/models/yolov8n.pt --int8
+    import torch
+
+    args = parse_args()
+    torch.set_num_threads(args.threads)
+    frames = _load_frames(args.source, args.frames)
+
+    backends = [('torch', args.model)]
+    backends.append(('onnx-fp32', export_onnx(args.model)))
+    if args.int8:
+        backends.append(('onnx-int8', export_onnx(args.model, quantize=True)))
+
+    results = []
+    for name, path in backends:
+        model = load_yolo(path, threads=args.threads)
+        results.append((name, _benchmark(model, frames)))
+
+    baseline = results[0][1]
+    print(f"{'backend':<12}{'fps':>10}{'speedup':>10}")
+    for name, fps in results:
+        print(f"{name:<12}{fps:>10.1f}{fps / baseline:>9.2f}x")
@@ -0,0 +1,161 @@
+# apps/home/roi.py
+# -*- encoding: utf-8 -*-
+import json
+import logging
+import numpy as np
+import cv2
+
+logger = logging.getLogger(__name__)
+
+ROI_OFF = 'off'
+ROI_LINE = 'line'
+ROI_POLYGON = 'polygon'
+
+DEFAULT_PADDING = 0.2
+# Crop yang terlalu kecil justru merusak akurasi setelah di-letterbox ke ukuran input model
+MIN_CROP_SIZE = 320
+
+
+def parse_polygon(raw):
+    """
+    Membaca polygon ROI dari JSON berupa [{"x": 0.1, "y": 0.2}, ...] atau
+    [[0.1, 0.2], ...] dengan koordinat ternormalisasi. None jika tidak valid.
+    """
+    if not raw:
+        return None
+    try:
+        points = json.loads(raw) if isinstance(raw, str) else raw
+        points = [(float(p['x']), float(p['y'])) if isinstance(p, dict) else (float(p[0]), float(p[1])) for p in points]
+    except (ValueError, TypeError, KeyError, IndexError):
+        return None
+    return np.array(points, dtype=np.float32) if len(points) >= 3 else None
+
+
+class RegionOfInterest:
+    """
+    Area frame yang benar-benar dianalisis detektor. Pada mode 'line', area
+    diturunkan dari semua garis/zona hitung ditambah padding; pada mode 'polygon', dari
+    polygon yang digambar pengguna. Kotak crop dihitung sekali per resolusi
+    dan per perubahan pengaturan, lalu hasil deteksi dipetakan kembali ke
+    koordinat frame penuh.
+    """
+    def __init__(self, mode=ROI_OFF, padding=DEFAULT_PADDING, line=None, polygon=None):
+        self.mode = mode
+        self.padding = padding
+        self.line = line
+        self.polygon = polygon
+
+        self._config_key = None
+        self._cache_key = None
+        self._box = None
+        self._polygon_px = None
+        self.last_ratio = 1.0
+
+    @classmethod
+    def from_camera(cls, camera_data):
+        roi = cls()
+        roi.configure(camera_data)
+        return roi
+
+    def configure(self, camera_data):
+        """Mengambil pengaturan per kamera; kolom kosong berarti ROI nonaktif."""
+        config_key = (camera_data.roi_mode, camera_data.roi_padding, camera_data.roi_polygon,
+                      camera_data.counting_line, camera_data.counting_geometry)
+        if config_key == self._config_key:
+            return
+        self._config_key = config_key
+        self._cache_key = None
+
+        self.mode = camera_data.roi_mode or ROI_OFF
+        self.padding = camera_data.roi_padding if camera_data.roi_padding is not None else DEFAULT_PADDING
+        self.polygon = parse_polygon(camera_data.roi_polygon)
+        # Mode 'line' mencakup semua garis dan zona hitung kamera
+        from .counting import parse_geometry
+        self.line = None
+        try:
+            lines, zones = parse_geometry(camera_data.counting_geometry, camera_data.counting_line)
+            points = [p for _, p in lines] + [p for _, p in zones]
+            if points:
+                self.line = np.concatenate(points).astype(np.float32)
+        except (json.JSONDecodeError, TypeError, KeyError, AttributeError):
+            self.line = None
+
+        if self.mode == ROI_POLYGON and self.polygon is None:
+            logger.warning(f"⚠️ Polygon ROI kamera {camera_data.id} kosong atau tidak valid. Memakai frame penuh.")
+
+    def _points(self):
+        if self.mode == ROI_LINE:
+            return self.line
+        if self.mode == ROI_POLYGON:
+            return self.polygon
+        return None
+
+    def box(self, frame_shape):
+        """
+        Kotak crop (x1, y1, x2, y2) dalam piksel, atau None jika frame penuh
+        yang dianalisis.
+        """
+        h, w = frame_shape[:2]
+        cache_key = (h, w, self._config_key)
+        if cache_key == self._cache_key:
+            return self._box
+        self._cache_key = cache_key
+        self._box = None
+        self._polygon_px = None
+        self.last_ratio = 1.0
+
+        points = self._points()
+        if points is None:
+            return None
+
+        scale = np.array([w, h], dtype=np.float32)
+        points_px = points * scale
+        if self.mode == ROI_POLYGON:
+            self._polygon_px = points_px.reshape(-1, 1, 2)
+
+        pad_x, pad_y = self.padding * w, self.padding * h
+        x1, y1 = points_px.min(axis=0) - (pad_x, pad_y)
+        x2, y2 = points_px.max(axis=0) + (pad_x, pad_y)
+
+        box = [x1, y1, x2, y2]
+        for lo, hi, limit in ((0, 2, w), (1, 3, h)):
+            # Perbesar crop yang terlalu kecil secara simetris
+            size = box[hi] - box[lo]
+            target = min(MIN_CROP_SIZE, limit)
+            if size < target:
+                grow = (target - size) / 2
+                box[lo] -= grow
+                box[hi] += grow
+            # Geser ke dalam frame tanpa mengubah ukuran bila memungkinkan
+            if box[lo] < 0:
+                box[hi] -= box[lo]
+                box[lo] = 0
+            if box[hi] > limit:
+                box[lo] -= box[hi] - limit
+                box[hi] = limit
+            box[lo] = max(box[lo], 0)
+
+        x1, y1, x2, y2 = (int(round(v)) for v in box)
+        if (x2 - x1) * (y2 - y1) >= w * h:
+            return None
+        self._box = (x1, y1, x2, y2)
+        self.last_ratio = (x2 - x1) * (y2 - y1) / float(w * h)
+        return self._box
+
+    def contains(self, center):
+        """Pada mode polygon, hanya titik tengah di dalam polygon yang dipakai."""
+        if self._polygon_px is None:
+            return True
+        return cv2.pointPolygonTest(self._polygon_px, (float(center[0]), float(center[1])), False) >= 0
+
+    def draw(self, frame):
+        if self._box is None:
+            return
+        x1, y1, x2, y2 = self._box
+        cv2.rectangle(frame, (x1, y1), (x2 - 1, y2 - 1), (255, 128, 0), 1)
+        if self._polygon_px is not None:
+            cv2.polylines(frame, [self._polygon_px.astype(np.int32)], True, (255, 128, 0), 2)
+
+    def stats(self):
+        return {'roi_mode': self.mode, 'roi_ratio': round(self.last_ratio, 3)}
+
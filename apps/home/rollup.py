@@ -0,0 +1,215 @@
+# apps/home/rollup.py
+# -*- encoding: utf-8 -*-
+import logging
+import datetime
+from collections import Counter
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import insert
+from .models import Count, CountRollup, day_range
+from .event_writer import event_writer
+
+logger = logging.getLogger(__name__)
+
+MINUTE = 'minute'
+HOUR = 'hour'
+DAY = 'day'
+GRANULARITIES = (MINUTE, HOUR, DAY)
+
+REBUILD_BATCH_SIZE = 10000
+
+
+def bucket_start(timestamp, granularity):
+    """Awal menit/jam/hari yang memuat timestamp."""
+    if granularity == MINUTE:
+        return timestamp.replace(second=0, microsecond=0)
+    if granularity == HOUR:
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return datetime.datetime.combine(timestamp.date(), datetime.time.min)
+
+
+def aggregate(events):
+    """
+    Menjumlahkan event (camera_id, direction, timestamp) ke semua granularitas.
+    Mengembalikan Counter dengan kunci (granularity, bucket, camera_id, direction).
+    """
+    increments = Counter()
+    for camera_id, direction, timestamp in events:
+        for granularity in GRANULARITIES:
+            increments[(granularity, bucket_start(timestamp, granularity), camera_id, direction)] += 1
+    return increments
+
+
+def apply_count_rows(db, rows):
+    """
+    Hook event writer: menambahkan baris Count yang baru ditulis ke rollup di
+    transaksi yang sama, sehingga rollup dan tabel Count selalu konsisten.
+    Bucket yang sudah ada dinaikkan dengan UPDATE, sisanya di-INSERT sekaligus.
+    """
+    now = datetime.datetime.now()
+    increments = aggregate((row.get('camera_id'), row['direction'], row.get('timestamp') or now) for row in rows)
+
+    new_rows = []
+    for (granularity, bucket, camera_id, direction), total in increments.items():
+        updated = CountRollup.query.filter(
+            CountRollup.granularity == granularity,
+            CountRollup.bucket == bucket,
+            CountRollup.camera_id == camera_id,
+            CountRollup.direction == direction
+        ).update({CountRollup.total: CountRollup.total + total}, synchronize_session=False)
+        if not updated:
+            new_rows.append({'granularity': granularity, 'bucket': bucket, 'camera_id': camera_id,
+                             'direction': direction, 'total': total})
+    if new_rows:
+        db.session.execute(insert(CountRollup), new_rows)
+
+
+def totals(granularity, start, end, camera_id=None):
+    """
+    Jumlah hitungan per kamera dan arah untuk bucket dalam rentang [start, end).
+    Mengembalikan {camera_id: {'in': n, 'out': m}}; biaya sebanding jumlah bucket.
+    """
+    from apps import db
+
+    query = db.session.query(CountRollup.camera_id, CountRollup.direction, db.func.sum(CountRollup.total)).filter(
+        CountRollup.granularity == granularity,
+        CountRollup.bucket >= start,
+        CountRollup.bucket < end
+    )
+    if camera_id is not None:
+        query = query.filter(CountRollup.camera_id == camera_id)
+
+    result = {}
+    for cam_id, direction, total in query.group_by(CountRollup.camera_id, CountRollup.direction):
+        if cam_id not in result:
+            result[cam_id] = {'in': 0, 'out': 0}
+        result[cam_id][direction] = int(total or 0)
+    return result
+
+
+def daily_totals(day, camera_id=None):
+    """Hitungan harian per kamera dari rollup 'day'."""
+    start, end = day_range(day)
+    return totals(DAY, start, end, camera_id)
+
+
+def rebuild_rollups(batch_size=REBUILD_BATCH_SIZE):
+    """
+    Menghitung ulang seluruh rollup dari tabel Count (backfill data lama).
+    Jalankan saat thread AI tidak menulis hitungan. Mengembalikan
+    (jumlah baris Count, jumlah bucket).
+    """
+    from apps import db
+
+    try:
+        db.session.query(CountRollup).delete()
+
+        # Dikumpulkan per menit dulu; jam dan hari diturunkan dari bucket menit
+        minutes = Counter()
+        processed = 0
+        rows = db.session.query(Count.camera_id, Count.direction, Count.timestamp).yield_per(batch_size)
+        for camera_id, direction, timestamp in rows:
+            minutes[(bucket_start(timestamp, MINUTE), camera_id, direction)] += 1
+            processed += 1
+
+        increments = Counter()
+        for (minute, camera_id, direction), total in minutes.items():
+            for granularity in GRANULARITIES:
+                increments[(granularity, bucket_start(minute, granularity), camera_id, direction)] += total
+
+        new_rows = [{'granularity': granularity, 'bucket': bucket, 'camera_id': camera_id,
+                     'direction': direction, 'total': total}
+                    for (granularity, bucket, camera_id, direction), total in increments.items()]
+        for index in range(0, len(new_rows), batch_size):
+            db.session.execute(insert(CountRollup), new_rows[index:index + batch_size])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    logger.info(f"✅ Rollup hitungan dibangun ulang: {processed} baris Count, {len(new_rows)} bucket.")
+    return processed, len(new_rows)
+
+
+def backfill_rollups():
+    """Membangun rollup sekali jika tabel rollup masih kosong tetapi Count sudah berisi data."""
+    if CountRollup.query.first() is None and Count.query.first() is not None:
+        logger.info("ℹ️ Tabel rollup kosong. Membangun dari data Count yang ada...")
+        rebuild_rollups()
+
+
+def detach_camera_rollups(camera_id):
+    """
+    Dipanggil sebelum kamera dihapus: rollup kamera digabung ke bucket tanpa
+    kamera (camera_id NULL), sama seperti baris Count-nya. Index unik tidak
+    mencegah duplikat NULL, jadi bucket NULL yang sudah ada dijumlahkan,
+    bukan ditambah baris baru. Commit dilakukan oleh pemanggil.
+    """
+    from apps import db
+
+    detached = {(row.granularity, row.bucket, row.direction): row
+                for row in CountRollup.query.filter(CountRollup.camera_id.is_(None))}
+    for row in CountRollup.query.filter_by(camera_id=camera_id).all():
+        key = (row.granularity, row.bucket, row.direction)
+        target = detached.get(key)
+        if target is None:
+            row.camera_id = None
+            detached[key] = row
+        else:
+            target.total += row.total
+            db.session.delete(row)
+
+
+def check_rollups():
+    """
+    Membandingkan rollup dengan tabel Count: untuk setiap granularitas, jumlah
+    total per kamera dan arah harus sama dengan COUNT(*) baris Count, dan
+    setiap bucket hanya boleh punya satu baris. Mengembalikan daftar selisih
+    (kosong jika konsisten).
+    """
+    from apps import db
+
+    expected = {(camera_id, direction): total for camera_id, direction, total in
+                db.session.query(Count.camera_id, Count.direction, db.func.count(Count.id))
+                .group_by(Count.camera_id, Count.direction)}
+
+    problems = []
+    for granularity in GRANULARITIES:
+        actual = {(camera_id, direction): int(total) for camera_id, direction, total in
+                  db.session.query(CountRollup.camera_id, CountRollup.direction, db.func.sum(CountRollup.total))
+                  .filter(CountRollup.granularity == granularity)
+                  .group_by(CountRollup.camera_id, CountRollup.direction)}
+        for key in sorted(set(expected) | set(actual), key=str):
+            if expected.get(key, 0) != actual.get(key, 0):
+                problems.append(f"{granularity} kamera {key[0]} '{key[1]}': rollup {actual.get(key, 0)}, Count {expected.get(key, 0)}")
+
+    duplicates = db.session.query(CountRollup.granularity, CountRollup.bucket, CountRollup.camera_id, CountRollup.direction).group_by(
+        CountRollup.granularity, CountRollup.bucket, CountRollup.camera_id, CountRollup.direction
+    ).having(db.func.count(CountRollup.id) > 1).all()
+    for granularity, bucket, camera_id, direction in duplicates:
+        problems.append(f"{granularity} {bucket} kamera {camera_id} '{direction}': bucket duplikat")
+    return problems
+
+
+@click.command('rebuild-rollups')
+@with_appcontext
+def rebuild_rollups_command():
+    """Menghitung ulang tabel rollup hitungan (menit/jam/hari) dari tabel Count."""
+    processed, buckets = rebuild_rollups()
+    click.echo(f"✅ {processed} baris Count diproses menjadi {buckets} bucket rollup.")
+
+
+@click.command('check-rollups')
+@with_appcontext
+def check_rollups_command():
+    """Memeriksa bahwa total rollup sama dengan jumlah baris Count."""
+    problems = check_rollups()
+    for problem in problems:
+        click.echo(f"❌ {problem}")
+    if problems:
+        raise SystemExit(1)
+    click.echo("✅ Rollup konsisten dengan tabel Count.")
+
+
+# Setiap batch Count dari event writer langsung memperbarui rollup
+event_writer.on_flush(Count, apply_count_rows)
@@ -4,7 +4,7 @@ from apps import db, socketio
 from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, send_from_directory
 from flask_login import login_required, current_user, UserMixin
 from jinja2 import TemplateNotFound
-from apps.home.models import Camera, AIModel, GlobalSettings, Count, AlarmLog
+from apps.home.models import Camera, AIModel, GlobalSettings, Count, CountRollup, AlarmLog
 from werkzeug.utils import secure_filename
 import os
 import base64
@@ -20,7 +20,17 @@ from ultralytics import YOLO
 from flask_socketio import emit
 import json
 import logging
-from .ai_processor import ai_stream, download_yolov8n_if_not_exists
+from .ai_processor import ai_stream, download_yolov8n_if_not_exists, preload_camera_model
+from .inference_server import inference_stats
+from .model_registry import model_registry
+from .event_writer import event_writer
+from .onnx_backend import remove_onnx_artifacts
+from .roi import parse_polygon
+from .counting import parse_geometry, serialize_geometry
+from .config_cache import config_cache
+from .rollup import daily_totals, detach_camera_rollups
+from .dashboard_feed import dashboard_feed
+from .capture import capture_hub, STREAMING as CAPTURE_STREAMING, BACKOFF as CAPTURE_BACKOFF, FAILED as CAPTURE_FAILED
 from apps.authentication.models import Users, Role
 
 logger = logging.getLogger('ai-app')
@@ -44,6 +54,9 @@ client_sids = {}
 camera_thread_lock = threading.Lock()
 dashboard_thread = None
 dashboard_stop_event = threading.Event()
+# SID klien /dashboard; pengirim data dasbor hanya berjalan selama ada klien
+dashboard_clients = set()
+dashboard_wakeup = threading.Event()
 thread_lock = threading.Lock()
 
 # Definisikan folder tempat menyimpan file yang diunggah
@@ -62,26 +75,26 @@ def simple_stream(app, cam_id, rtsp_url, stop_event):
     Thread untuk streaming video sederhana tanpa deteksi AI.
     """
     with app.app_context():
-        cap = cv2.VideoCapture(rtsp_url)
-        if not cap.isOpened():
-            logger.error(f"❌ Gagal membuka stream sederhana untuk kamera {cam_id} dari {rtsp_url}")
-            socketio.emit('error_message', {'message': "❌ Gagal membuka stream kamera. Periksa URL."})
-            return
+        # Berbagi decoder dengan pipeline AI jika kamera yang sama sedang dianalisis.
+        # Reconnect dengan backoff ditangani grabber, thread ini hanya menunggu frame.
+        cap = capture_hub.subscribe(rtsp_url, name=f"live-{cam_id}")
 
         logger.info(f"✅ Stream sederhana untuk kamera {cam_id} dimulai.")
         socketio.emit('log', {'message': "✅ Live View dimulai."})
 
+        last_state = None
         while not stop_event.is_set():
+            state = cap.state
+            if state != last_state:
+                if state == CAPTURE_FAILED:
+                    socketio.emit('error_message', {'message': "❌ Kamera tidak merespons. Tetap mencoba reconnect..."})
+                elif state == CAPTURE_BACKOFF:
+                    socketio.emit('log', {'message': "⏳ Kamera terputus, mencoba reconnect..."})
+                last_state = state
+
             ret, frame = cap.read()
             if not ret:
-                logger.warning(f"⚠️ Frame kosong dari kamera {cam_id}. Mencoba reconnect...")
-                cap.release()
-                time.sleep(1)
-                cap = cv2.VideoCapture(rtsp_url)
-                if not cap.isOpened():
-                    logger.error("❌ Gagal reconnect ke kamera.")
-                    socketio.emit('error_message', {'message': "❌ Gagal reconnect ke kamera."})
-                    break
+                time.sleep(0.01 if state == CAPTURE_STREAMING else 0.2)
                 continue
 
             # Mengubah frame menjadi format JPEG
@@ -92,7 +105,7 @@ def simple_stream(app, cam_id, rtsp_url, stop_event):
             # Kontrol frame rate
             time.sleep(0.05)
 
-        cap.release()
+        cap.close()
         logger.info(f"🛑 Thread stream sederhana untuk kamera {cam_id} dihentikan.")
         socketio.emit('log', {'message': "🛑 Live View dihentikan."})
 
@@ -173,6 +186,7 @@ def handle_update_ai_status(data):
 
     camera.is_ai_enabled = is_enabled
     db.session.commit()
+    config_cache.invalidate_camera(cam_id)
     logger.info(f"AI status for camera {cam_id} updated to {is_enabled} in database.")
     
     if is_enabled:
@@ -196,20 +210,19 @@ def handle_update_ai_status(data):
 
 @socketio.on('connect', namespace='/dashboard')
 def handle_dashboard_connect():
-    today_date = date.today().strftime('%Y-%m-%d')
-    counts = Count.query.filter(db.func.date(Count.timestamp) == today_date).all()
-    chart_data = {}
-    for count in counts:
-        cam_id = count.camera_id
-        if cam_id not in chart_data:
-            chart_data[cam_id] = {'in': 0, 'out': 0}
-        chart_data[cam_id][count.direction] += 1
-    
-    emit('new_count_data', chart_data)
+    app = current_app._get_current_object()
+    dashboard_feed.ensure_seeded(app)
+    # Klien baru menerima snapshot penuh; setelah itu hanya perubahan
+    emit('initial_dashboard_data', dashboard_feed.snapshot())
+
+    dashboard_clients.add(request.sid)
+    start_dashboard_sender(app)
+    dashboard_wakeup.set()
 
 @socketio.on('disconnect', namespace='/dashboard')
 def handle_dashboard_disconnect():
-    print('Client dasbor terputus dari Socket.IO')
+    dashboard_clients.discard(request.sid)
+    logger.info(f"Client dasbor terputus dari Socket.IO. Sisa klien: {len(dashboard_clients)}")
 
 
 
@@ -254,6 +267,8 @@ def edit_alarm(cam_id):
         camera.alarm_trigger = alarm_trigger if alarm_trigger else None
         camera.alarm_action = alarm_action if alarm_action else None
         db.session.commit()
+        # Pipeline AI memakai alarm baru pada frame berikutnya
+        config_cache.invalidate_camera(cam_id)
         
         #if ai_processor:
          #   ai_processor.restart_ai_stream_for_camera(cam_id)
@@ -278,6 +293,7 @@ def delete_alarm(cam_id):
         camera.alarm_action = None
         
         db.session.commit()
+        config_cache.invalidate_camera(cam_id)
 
         flash("alarm berhasil dihapus!", "success")
         return redirect(url_for('home_blueprint.alarm_settings'))
@@ -297,10 +313,6 @@ def dashboard():
     """
     Menampilkan halaman dashboard utama dengan data kamera dan grafik.
     """
-    global dashboard_thread
-    global dashboard_stop_event
-    global thread_lock
-
     try:
         cameras = Camera.query.all()
         if not cameras:
@@ -308,31 +320,12 @@ def dashboard():
             return render_template('home/dashboard.html', cameras=[], error="Tidak ada kamera yang terdaftar.")
         
         # Mulai thread pengirim data jika belum berjalan
-        with thread_lock:
-            if dashboard_thread is None or not dashboard_thread.is_alive():
-                print("✅ Memulai thread pengirim data dasbor...")
-                dashboard_stop_event.clear()
-                dashboard_thread = Thread(target=background_data_sender, args=(current_app._get_current_object(), dashboard_stop_event,))
-                dashboard_thread.daemon = True
-                dashboard_thread.start()
+        start_dashboard_sender(current_app._get_current_object())
         
-        # Ambil data hitungan untuk hari ini untuk rendering awal
-        today = date.today()
-        daily_counts = {}
-        for cam in cameras:
-            in_count = Count.query.filter(
-                Count.camera_id == cam.id,
-                Count.direction == 'in',
-                db.func.date(Count.timestamp) == today
-            ).count()
-            
-            out_count = Count.query.filter(
-                Count.camera_id == cam.id,
-                Count.direction == 'out',
-                db.func.date(Count.timestamp) == today
-            ).count()
-            
-            daily_counts[cam.id] = {'in': in_count, 'out': out_count}
+        # Hitungan hari ini untuk rendering awal dari snapshot di memori (tanpa query per kamera)
+        dashboard_feed.ensure_seeded(current_app._get_current_object())
+        today_totals = dashboard_feed.totals()
+        daily_counts = {cam.id: today_totals.get(cam.id, {'in': 0, 'out': 0}) for cam in cameras}
 
         return render_template('home/dashboard.html', cameras=cameras, daily_counts=daily_counts)
 
@@ -343,74 +336,43 @@ def dashboard():
 # Fungsi yang berjalan di latar belakang untuk mengirim data dasbor
 def background_data_sender(app: Flask, stop_event: threading.Event):
     """
-    Mengambil data hitungan dan log secara real-time dan mengirimkannya ke klien Socket.IO.
+    Mengirim perubahan hitungan dan log ke klien /dashboard. Data diambil dari
+    snapshot di memori (dashboard_feed) yang diisi event writer setelah commit, jadi tidak ada
+    query per detik; hanya kamera dan baris log yang berubah sejak kiriman
+    terakhir yang dikirim. Tanpa klien dasbor, thread menunggu tanpa polling
+    sampai ada klien yang terhubung.
     """
-    with app.app_context():
-        while not stop_event.is_set():
-            live_counts = {}
-            latest_counting_logs = []
-            latest_alarm_logs = []
+    dashboard_feed.ensure_seeded(app)
+    version, seq = dashboard_feed.cursor()
+    while not stop_event.is_set():
+        if not dashboard_clients:
+            dashboard_wakeup.wait()
+            dashboard_wakeup.clear()
+            continue
 
-            try:
-                db_session = db.session()
-                today = date.today()
-
-                cameras = db_session.query(Camera).all()
-                for cam in cameras:
-                    # Kode hitungan per kamera
-                    in_count = db_session.query(Count).filter(
-                        Count.camera_id == cam.id,
-                        Count.direction == 'in',
-                        db.func.date(Count.timestamp) == today
-                    ).count()
-                    
-                    out_count = db_session.query(Count).filter(
-                        Count.camera_id == cam.id,
-                        Count.direction == 'out',
-                        db.func.date(Count.timestamp) == today
-                    ).count()
-                    
-                    live_counts[cam.id] = {'in': in_count, 'out': out_count}
+        try:
+            # Seed ulang hanya setelah log dihapus (clear log / factory default)
+            dashboard_feed.ensure_seeded(app)
+            dashboard_data, version, seq = dashboard_feed.changes(version, seq)
+            if dashboard_data:
+                socketio.emit('dashboard_data_update', dashboard_data, namespace='/dashboard')
+        except Exception as e:
+            logger.error(f"❌ Kesalahan di thread dasbor: {e}")
 
-                # Mengambil log hitungan
-                counting_logs_query = db_session.query(Count).order_by(Count.timestamp.desc()).limit(7).all()
-                
-                for log in reversed(counting_logs_query):
-                    # Cek apakah camera_id bernilai NULL dan tambahkan penanda
-                    if log.camera_id is None:
-                        display_name = f"{log.camera_name} (Dihapus)"
-                    else:
-                        display_name = log.camera_name
-                    latest_counting_logs.append(f"[{log.timestamp.strftime('%H:%M:%S')}] Kamera {display_name}: Orang '{log.direction}' terdeteksi.")
-
-                # Mengambil log alarm
-                alarm_logs_query = db_session.query(AlarmLog).order_by(AlarmLog.timestamp.desc()).limit(7).all()
-                
-                for log in reversed(alarm_logs_query):
-                    # Cek apakah camera_id bernilai NULL dan tambahkan penanda
-                    if log.camera_id is None:
-                        display_name = f"{log.camera_name} (Dihapus)"
-                    else:
-                        display_name = log.camera_name
-                    latest_alarm_logs.append(f"[{log.timestamp.strftime('%H:%M:%S')}] {log.message} di Kamera {display_name}.")
-            
-            except Exception as e:
-                # Menangani error database
-                print(f"❌ Kesalahan database di thread dasbor: {e}")
-                db_session.rollback()
-            finally:
-                db_session.close()
-
-            # Kirim data ke frontend
-            dashboard_data = {
-                'chart_data': live_counts,
-                'counting_logs': latest_counting_logs,
-                'alarm_logs': latest_alarm_logs,
-            }
-            
-            socketio.emit('dashboard_data_update', dashboard_data, namespace='/dashboard')
-            
-            time.sleep(1)
+        time.sleep(1)
+
+
+def start_dashboard_sender(app):
+    """Memulai thread pengirim data dasbor jika belum berjalan."""
+    global dashboard_thread
+
+    with thread_lock:
+        if dashboard_thread is None or not dashboard_thread.is_alive():
+            logger.info("✅ Memulai thread pengirim data dasbor...")
+            dashboard_stop_event.clear()
+            dashboard_thread = Thread(target=background_data_sender, args=(app, dashboard_stop_event,))
+            dashboard_thread.daemon = True
+            dashboard_thread.start()
 
 
 
@@ -423,25 +385,42 @@ def get_count_data():
     date_str = request.args.get('date', date.today().strftime('%Y-%m-%d'))
     camera_id = request.args.get('camera_id', 'all')
     
-    query = Count.query.filter(db.func.date(Count.timestamp) == date_str)
-    
+    try:
+        day = datetime.datetime.strptime(date_str, '%Y-%m-%d').date()
+    except ValueError:
+        return jsonify({'error': 'Invalid date'}), 400
+
     if camera_id != 'all':
         try:
-            query = query.filter(Count.camera_id == int(camera_id))
+            camera_id = int(camera_id)
         except ValueError:
             return jsonify({'error': 'Invalid camera_id'}), 400
+    else:
+        camera_id = None
     
-    counts = query.all()
-    
-    chart_data = {}
-    for count in counts:
-        cam_id = count.camera_id
-        if cam_id not in chart_data:
-            chart_data[cam_id] = {'in': 0, 'out': 0}
-        chart_data[cam_id][count.direction] += 1
+    # Dibaca dari rollup harian, bukan menghitung ulang baris Count
+    chart_data = daily_totals(day, camera_id)
     
     return jsonify(chart_data)
 
+@blueprint.route('/api/inference_stats')
+@login_required
+def get_inference_stats():
+    """Statistik inference server (throughput, kedalaman antrean, ukuran batch) untuk tuning."""
+    return jsonify(inference_stats())
+
+@blueprint.route('/api/model_registry')
+@login_required
+def get_model_registry():
+    """Daftar model yang sedang dimuat beserta jumlah referensi dan status idle."""
+    return jsonify(model_registry.stats())
+
+@blueprint.route('/api/event_writer')
+@login_required
+def get_event_writer():
+    """Kedalaman antrean dan latensi flush penulis event database."""
+    return jsonify(event_writer.stats())
+
 # -------------------------------
 # CAMERA SETTINGS
 # -------------------------------
@@ -465,6 +444,8 @@ def cam_settings():
         cam = Camera(rtsp_url=rtsp_url, name=name, location=location, is_ai_enabled=False)
         db.session.add(cam)
         db.session.commit()
+        # ID kamera yang dihapus bisa dipakai ulang oleh SQLite
+        config_cache.invalidate_camera(cam.id)
         flash("Kamera berhasil ditambahkan!", "success")
         return redirect(url_for('home_blueprint.cam_settings'))
 
@@ -482,6 +463,7 @@ def delete_camera(cam_id):
 
         # Hapus semua entri di tabel 'count' yang terkait dengan kamera ini
         Count.query.filter_by(camera_id=cam_id).update({'camera_id': None})
+        detach_camera_rollups(cam_id)
         
         # Hapus semua entri di tabel 'alarm_log' yang terkait dengan kamera ini
         AlarmLog.query.filter_by(camera_id=cam_id).update({'camera_id': None})
@@ -490,6 +472,8 @@ def delete_camera(cam_id):
         cam = Camera.query.get_or_404(cam_id)
         db.session.delete(cam)
         db.session.commit()
+        config_cache.invalidate_camera(cam_id)
+        config_cache.invalidate_model(cam_id)
         
         flash("Kamera berhasil dihapus!", "success")
     except Exception as e:
@@ -506,6 +490,7 @@ def edit_camera(cam_id):
     cam.location = request.form.get('camera-location', cam.location)
     cam.rtsp_url = request.form.get('rtsp-ip', cam.rtsp_url)
     db.session.commit()
+    config_cache.invalidate_camera(cam_id)
     flash('Camera updated successfully', 'success')
     return redirect(url_for('home_blueprint.cam_settings'))
     
@@ -545,6 +530,61 @@ def save_ai_settings():
         flash("Pilih kamera dan model AI terlebih dahulu!", "danger")
         return redirect(url_for('home_blueprint.ai_settings'))
 
+    # Pengaturan motion gate per kamera; input kosong mempertahankan nilai lama
+    camera = Camera.query.get(cam_id)
+    if camera:
+        camera.motion_gate = 'motionGate' in request.form
+        try:
+            for field, attribute, cast in (('motionPixelThreshold', 'motion_pixel_threshold', int),
+                                           ('motionAreaThreshold', 'motion_area_threshold', float),
+                                           ('motionKeyframeInterval', 'motion_keyframe_interval', int)):
+                value = request.form.get(field)
+                if value:
+                    setattr(camera, attribute, cast(value))
+        except ValueError:
+            flash("❌ Nilai pengaturan motion gate tidak valid. Harap masukkan angka.", "danger")
+            return redirect(url_for('home_blueprint.ai_settings'))
+
+        # Pengaturan ROI: mode, padding, dan polygon (JSON koordinat ternormalisasi)
+        roi_mode = request.form.get('roiMode')
+        if roi_mode in ('off', 'line', 'polygon') and roi_mode != camera.roi_mode:
+            camera.roi_mode = roi_mode
+        roi_padding = request.form.get('roiPadding')
+        if roi_padding:
+            try:
+                camera.roi_padding = float(roi_padding)
+            except ValueError:
+                flash("❌ Nilai padding ROI tidak valid. Harap masukkan angka.", "danger")
+                return redirect(url_for('home_blueprint.ai_settings'))
+        roi_polygon = request.form.get('roiPolygon')
+        if roi_polygon is not None and roi_polygon.strip():
+            if parse_polygon(roi_polygon) is None:
+                flash("❌ Polygon ROI tidak valid. Gunakan format [[x, y], ...] dengan minimal 3 titik bernilai 0-1.", "danger")
+                return redirect(url_for('home_blueprint.ai_settings'))
+            camera.roi_polygon = roi_polygon.strip()
+
+        # Pengaturan tile: grid baris x kolom dan overlap antar tile
+        try:
+            for field, attribute, cast in (('tileRows', 'tile_rows', int),
+                                           ('tileCols', 'tile_cols', int),
+                                           ('tileOverlap', 'tile_overlap', float)):
+                value = request.form.get(field)
+                if value:
+                    setattr(camera, attribute, cast(value))
+        except ValueError:
+            flash("❌ Nilai pengaturan tile tidak valid. Harap masukkan angka.", "danger")
+            return redirect(url_for('home_blueprint.ai_settings'))
+
+        # Mode keyframe dengan optical flow di antara deteksi
+        camera.flow_tracking = 'flowTracking' in request.form
+        flow_max_interval = request.form.get('flowMaxInterval')
+        if flow_max_interval:
+            try:
+                camera.flow_max_interval = int(flow_max_interval)
+            except ValueError:
+                flash("❌ Nilai interval keyframe maksimum tidak valid. Harap masukkan angka.", "danger")
+                return redirect(url_for('home_blueprint.ai_settings'))
+
     existing_model = AIModel.query.filter_by(cam_id=cam_id).first()
 
     # Logika untuk menangani file yang diunggah
@@ -567,6 +607,7 @@ def save_ai_settings():
                      # Hapus file lama hanya jika bukan model bawaan
                     if os.path.exists(existing_model.file_path):
                         os.remove(existing_model.file_path)
+                    remove_onnx_artifacts(existing_model.file_path)
                     
                 db.session.delete(existing_model)
             except OSError as e:
@@ -592,6 +633,8 @@ def save_ai_settings():
                 default_filename = "yolov8n.pt"
             elif ai_model_name == 'yolov5':
                 default_filename = "yolov5n.pt"
+            elif ai_model_name == 'yolov3':
+                default_filename = "yolov3-tiny.weights"
             else:
                 default_filename = "yolov8n.pt"
                 
@@ -613,6 +656,16 @@ def save_ai_settings():
             existing_model.iou_threshold = iou_threshold   # Perbarui nilai
             db.session.commit()
             flash(f"Pengaturan berhasil diperbarui untuk Kamera {cam_id}. Menggunakan model {ai_model_name}.", "success")
+
+    # Pengaturan kamera dan model baru berlaku di pipeline AI pada frame berikutnya
+    config_cache.invalidate_camera(cam_id)
+    config_cache.invalidate_model(cam_id)
+
+    # Muat dan panaskan model di latar belakang agar menyalakan AI tidak menunggu;
+    # jika AI_ONNX_RUNTIME aktif, ekspor ONNX untuk bobot baru juga terjadi di sini
+    preload_thread = threading.Thread(target=preload_camera_model, args=(current_app._get_current_object(), int(cam_id)))
+    preload_thread.daemon = True
+    preload_thread.start()
     
     return redirect(url_for('home_blueprint.ai_settings'))
 
@@ -628,11 +681,13 @@ def delete_model(model_id):
         if not model.filename.startswith("yolov8n"):
             if os.path.exists(model.file_path):
                 os.remove(model.file_path)
+            remove_onnx_artifacts(model.file_path)
     except OSError as e:
         flash(f"Error menghapus file: {e.strerror}", "danger")
         
     db.session.delete(model)
     db.session.commit()
+    config_cache.invalidate_model(model.cam_id)
     flash("Model berhasil dihapus!", "success")
     return redirect(url_for('home_blueprint.ai_settings'))
 
@@ -675,6 +730,12 @@ def people_count():
         else:
             # If it's empty or None, set it to None to be safe
             cam.counting_line = None
+
+        # Geometri lengkap (beberapa garis dan zona) untuk editor
+        try:
+            cam.counting_geometry = json.loads(cam.counting_geometry) if cam.counting_geometry else None
+        except (json.JSONDecodeError, TypeError):
+            cam.counting_geometry = None
             
     return render_template('home/people_count.html',
                            segment='people_count',
@@ -697,15 +758,33 @@ def handle_save_counting_line(data):
         logger.error(f"❌ Gagal mengonversi ID kamera: {e}")
         return
 
-    line_coords = data.get('line_coords')
+    # Format baru: geometry = {"lines": [...], "zones": [...]}; format lama: satu line_coords
+    geometry = data.get('geometry')
+    if geometry is None:
+        geometry = {'lines': [data.get('line_coords')], 'zones': []}
+    try:
+        lines, zones = parse_geometry(geometry)
+    except (TypeError, AttributeError, ValueError) as e:
+        emit('error_message', {'message': f'Geometri garis/zona tidak valid: {str(e)}'})
+        return
+    if not lines and not zones:
+        emit('error_message', {'message': 'Tidak ada garis atau zona yang valid untuk disimpan.'})
+        return
+    # Hanya entri yang valid yang disimpan
+    geometry = serialize_geometry(lines, zones)
+    line_coords = geometry['lines'][0] if lines else None
     
     camera = Camera.query.get(cam_id)
     if camera:
         try:
-            camera.counting_line = json.dumps(line_coords)
+            # counting_line tetap berisi garis pertama untuk kompatibilitas
+            camera.counting_line = json.dumps(line_coords) if line_coords else None
+            camera.counting_geometry = json.dumps(geometry)
             db.session.commit()
-            emit('line_saved_success', {'cam_id': cam_id, 'line_coords': line_coords})
-            logger.info(f"✅ Garis hitung berhasil disimpan untuk Kamera {cam_id}: {line_coords}")
+            # Pipeline AI mengompilasi ulang geometri pada frame berikutnya
+            config_cache.invalidate_camera(cam_id)
+            emit('line_saved_success', {'cam_id': cam_id, 'line_coords': line_coords, 'geometry': geometry})
+            logger.info(f"✅ Geometri hitung berhasil disimpan untuk Kamera {cam_id}: {len(lines)} garis, {len(zones)} zona")
         except Exception as e:
             db.session.rollback()
             emit('error_message', {'message': f'Gagal menyimpan garis: {str(e)}'})
@@ -733,7 +812,9 @@ def handle_clear_line(data):
     if camera:
         try:
             camera.counting_line = None # Set menjadi None untuk menghapus garis
+            camera.counting_geometry = None
             db.session.commit()
+            config_cache.invalidate_camera(cam_id)
             emit('line_cleared_success', {'cam_id': cam_id})
             logger.info(f"✅ Garis hitung berhasil dihapus untuk Kamera {cam_id}.")
         except Exception as e:
@@ -801,6 +882,7 @@ def upload_video():
         video_cam = Camera(name=filename, rtsp_url=upload_path, location="Dev", is_ai_enabled=False)
         db.session.add(video_cam)
         db.session.commit()
+        config_cache.invalidate_camera(video_cam.id)
         
         flash("Video berhasil diunggah dan disimpan sebagai kamera baru!", "success")
     return redirect(url_for('home_blueprint.dev_page'))
@@ -861,10 +943,16 @@ def delete_video(cam_id):
             db.session.delete(ai_model)
             flash(f"Model AI '{os.path.basename(ai_model.file_path)}' berhasil dihapus.", "success")
         
+        # Hitungan dan rollup kamera dilepas dari kamera, sama seperti delete_camera
+        Count.query.filter_by(camera_id=cam_id).update({'camera_id': None})
+        detach_camera_rollups(cam_id)
+
         # Hapus kamera dari database.
         # Database sekarang akan otomatis mengosongkan cam_id di tabel log.
         db.session.delete(camera_to_delete)
         db.session.commit()
+        config_cache.invalidate_camera(cam_id)
+        config_cache.invalidate_model(cam_id)
 
         flash(f"Kamera '{camera_to_delete.name}' berhasil dihapus.", "success")
         
@@ -921,6 +1009,7 @@ def alarm_settings():
         global_settings = GlobalSettings()
         db.session.add(global_settings)
         db.session.commit()
+        config_cache.invalidate_global()
     
     return render_template('home/alarm_settings.html', 
                            cameras=all_cameras,
@@ -949,6 +1038,8 @@ def set_storage():
     global_settings.save_screenshots = save_screenshots
 
     db.session.commit()
+    # Folder dan opsi penyimpanan baru berlaku untuk alarm berikutnya
+    config_cache.invalidate_global()
 
     return redirect(url_for('home_blueprint.alarm_settings'))
 
@@ -1073,7 +1164,9 @@ def clear_people_count_log():
     try:
         # Hapus semua data dari tabel PeopleCountLog
         db.session.query(Count).delete()
+        db.session.query(CountRollup).delete()
         db.session.commit()
+        dashboard_feed.invalidate()
         flash('Semua log People Counting berhasil dihapus.', 'success')
     except SQLAlchemyError as e:
         db.session.rollback()
@@ -1086,6 +1179,7 @@ def clear_alarm_log():
         # Hapus semua data dari tabel AlarmLog
         db.session.query(AlarmLog).delete()
         db.session.commit()
+        dashboard_feed.invalidate()
         flash('Semua log Alarm berhasil dihapus.', 'success')
     except SQLAlchemyError as e:
         db.session.rollback()
@@ -1111,6 +1205,8 @@ def factory_default():
         db.session.execute(delete_statement)
         
         db.session.commit()
+        config_cache.invalidate_all()
+        dashboard_feed.invalidate()
         flash('Aplikasi berhasil dikembalikan ke pengaturan pabrik. Semua database kecuali akun admin telah dikosongkan.', 'success')
     except SQLAlchemyError as e:
         db.session.rollback()
@@ -0,0 +1,112 @@
+# apps/home/scheduler.py
+# -*- encoding: utf-8 -*-
+import math
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceScheduler:
+    """
+    Penjadwal inferensi per kamera. Mengukur latensi detektor lalu memilih
+    stride (deteksi setiap N frame) agar total pemakaian CPU semua kamera
+    tetap di dalam anggaran AI_CPU_BUDGET (dalam satuan core).
+    Di frame di antara dua deteksi, track digeser dengan optical flow
+    (FlowTracker.bridge) sehingga penghitungan garis tetap berjalan.
+    """
+    _active = {}
+    _active_lock = threading.Lock()
+
+    def __init__(self, cam_id, cpu_budget=1.0, max_fps=15.0, max_stride=30, smoothing=0.2):
+        self.cam_id = cam_id
+        self.cpu_budget = float(cpu_budget)
+        self.max_fps = float(max_fps)
+        self.max_stride = int(max_stride)
+        self.smoothing = smoothing
+
+        self.stride = 1
+        self.latency = None
+        self.frame_index = 0
+        self.fps = 0.0
+        self.detect_fps = 0.0
+
+        self._last_tick = None
+        self._window_start = time.time()
+        self._window_frames = 0
+        self._window_detections = 0
+
+        with InferenceScheduler._active_lock:
+            InferenceScheduler._active[cam_id] = self
+
+    @classmethod
+    def from_config(cls, cam_id, config):
+        return cls(
+            cam_id,
+            cpu_budget=config.get('AI_CPU_BUDGET', 1.0),
+            max_fps=config.get('AI_MAX_FPS', 15.0),
+            max_stride=config.get('AI_MAX_STRIDE', 30),
+        )
+
+    def close(self):
+        with InferenceScheduler._active_lock:
+            if InferenceScheduler._active.get(self.cam_id) is self:
+                del InferenceScheduler._active[self.cam_id]
+
+    def camera_budget(self):
+        """Anggaran core untuk kamera ini: anggaran total dibagi rata ke kamera aktif."""
+        with InferenceScheduler._active_lock:
+            active = max(len(InferenceScheduler._active), 1)
+        return self.cpu_budget / active
+
+    def should_detect(self):
+        return self.frame_index % self.stride == 0
+
+    def record_detection(self, latency):
+        """Mencatat latensi satu panggilan detektor (detik) dan menghitung ulang stride."""
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency += self.smoothing * (latency - self.latency)
+        self._window_detections += 1
+
+        # Laju deteksi maksimum yang muat di anggaran, lalu stride agar loop tetap di max_fps
+        max_detect_fps = self.camera_budget() / max(self.latency, 1e-3)
+        stride = math.ceil(self.max_fps / max_detect_fps) if max_detect_fps > 0 else self.max_stride
+        stride = min(max(stride, 1), self.max_stride)
+        if stride != self.stride:
+            logger.info(f"⚙️ Stride inferensi kamera {self.cam_id}: {self.stride} -> {stride} (latensi {self.latency * 1000:.0f} ms).")
+            self.stride = stride
+
+    def wait(self):
+        """
+        Dipanggil di akhir setiap iterasi loop analisis. Menjaga loop pada
+        max_fps dan memperbarui statistik FPS.
+        """
+        now = time.time()
+        if self._last_tick is not None:
+            remaining = (1.0 / self.max_fps) - (now - self._last_tick)
+            if remaining > 0:
+                time.sleep(remaining)
+                now = time.time()
+        self._last_tick = now
+        self.frame_index += 1
+        self._window_frames += 1
+
+        elapsed = now - self._window_start
+        if elapsed >= 1.0:
+            self.fps = self._window_frames / elapsed
+            self.detect_fps = self._window_detections / elapsed
+            self._window_start = now
+            self._window_frames = 0
+            self._window_detections = 0
+
+    def stats(self):
+        return {
+            'fps': round(self.fps, 1),
+            'detect_fps': round(self.detect_fps, 1),
+            'stride': self.stride,
+            'latency_ms': round(self.latency * 1000, 1) if self.latency is not None else None,
+            'cpu_budget': round(self.camera_budget(), 2),
+        }
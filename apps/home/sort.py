@@ -2,16 +2,10 @@ from __future__ import print_function
 
 import os
 import numpy as np
-import matplotlib
-matplotlib.use('TkAgg')
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
-from skimage import io
 
 import glob
 import time
 import argparse
-from filterpy.kalman import KalmanFilter
 
 np.random.seed(0)
 
@@ -83,6 +77,8 @@ class KalmanBoxTracker(object):
     """
     Initialises a tracker using initial bounding box.
     """
+    from filterpy.kalman import KalmanFilter # only the classic engine needs filterpy
+
     #define constant velocity model
     self.kf = KalmanFilter(dim_x=7, dim_z=4) 
     self.kf.F = np.array([[1,0,0,0,1,0,0],[0,1,0,0,0,1,0],[0,0,1,0,0,0,1],[0,0,0,1,0,0,0],  [0,0,0,0,1,0,0],[0,0,0,0,0,1,0],[0,0,0,0,0,0,1]])
@@ -154,29 +150,111 @@ def associate_detections_to_trackers(detections,trackers,iou_threshold = 0.3):
   else:
     matched_indices = np.empty(shape=(0,2))
 
-  unmatched_detections = []
-  for d, det in enumerate(detections):
-    if(d not in matched_indices[:,0]):
-      unmatched_detections.append(d)
-  unmatched_trackers = []
-  for t, trk in enumerate(trackers):
-    if(t not in matched_indices[:,1]):
-      unmatched_trackers.append(t)
+  matched_indices = np.asarray(matched_indices, dtype=int).reshape(-1, 2)
+  matched_dets = np.zeros(len(detections), dtype=bool)
+  matched_dets[matched_indices[:,0]] = True
+  matched_trks = np.zeros(len(trackers), dtype=bool)
+  matched_trks[matched_indices[:,1]] = True
 
   #filter out matched with low IOU
-  matches = []
-  for m in matched_indices:
-    if(iou_matrix[m[0], m[1]]<iou_threshold):
-      unmatched_detections.append(m[0])
-      unmatched_trackers.append(m[1])
-    else:
-      matches.append(m.reshape(1,2))
-  if(len(matches)==0):
-    matches = np.empty((0,2),dtype=int)
-  else:
-    matches = np.concatenate(matches,axis=0)
+  low_iou = iou_matrix[matched_indices[:,0], matched_indices[:,1]] < iou_threshold
+  unmatched_detections = np.concatenate((np.flatnonzero(~matched_dets), matched_indices[low_iou,0]))
+  unmatched_trackers = np.concatenate((np.flatnonzero(~matched_trks), matched_indices[low_iou,1]))
+  matches = matched_indices[~low_iou]
+
+  return matches, unmatched_detections, unmatched_trackers
+
+
+def candidate_pairs(detections, trackers, cell_size=None):
+  """
+  Uniform grid index over both box sets: every box is registered in the cells it
+  covers and only detection/tracker pairs sharing a cell are returned, so IoU is
+  never computed for boxes that cannot overlap. Returns ([K] det idx, [K] trk idx).
+  """
+  boxes = np.concatenate((detections[:, :4], trackers[:, :4]))
+  if cell_size is None:
+    cell_size = max(np.median(np.maximum(boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1])), 1.)
+
+  c0 = np.floor(boxes[:, :2] / cell_size).astype(np.int64)
+  c1 = np.maximum(np.floor(boxes[:, 2:4] / cell_size).astype(np.int64), c0)
+  nx = c1[:, 0] - c0[:, 0] + 1
+  counts = nx * (c1[:, 1] - c0[:, 1] + 1)
+  owner = np.repeat(np.arange(len(boxes)), counts)
+  k = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+  cx = c0[owner, 0] + k % nx[owner]
+  cy = c0[owner, 1] + k // nx[owner]
+  cells = (cx << 32) + cy
+
+  is_det = owner < len(detections)
+  det_cells, det_owner = cells[is_det], owner[is_det]
+  order = np.argsort(cells[~is_det], kind='stable')
+  trk_cells, trk_owner = cells[~is_det][order], owner[~is_det][order] - len(detections)
+
+  lo = np.searchsorted(trk_cells, det_cells, 'left')
+  hits = np.searchsorted(trk_cells, det_cells, 'right') - lo
+  d = np.repeat(det_owner, hits)
+  t = trk_owner[np.repeat(lo - np.cumsum(hits) + hits, hits) + np.arange(hits.sum())]
+  pairs = np.unique(d * len(trackers) + t)
+  return pairs // len(trackers), pairs % len(trackers)
+
+
+def associate_gated(detections, trackers, iou_threshold=0.3):
+  """
+  Same contract as associate_detections_to_trackers, for crowded scenes. IoU is
+  computed only for pairs found by candidate_pairs and only pairs above the
+  threshold become edges; each connected component of that bipartite graph is
+  an independent assignment problem: components with a single detection or track
+  take their best edge, the rest are solved as blocks of one small lap problem.
+  """
+  from scipy.sparse import coo_matrix
+  from scipy.sparse.csgraph import connected_components
+
+  n_det, n_trk = len(detections), len(trackers)
+  if n_det == 0 or n_trk == 0:
+    return np.empty((0,2),dtype=int), np.arange(n_det), np.arange(n_trk)
 
-  return matches, np.array(unmatched_detections), np.array(unmatched_trackers)
+  d, t = candidate_pairs(detections, trackers)
+  a, b = detections[d], trackers[t]
+  w = np.maximum(0., np.minimum(a[:, 2], b[:, 2]) - np.maximum(a[:, 0], b[:, 0]))
+  h = np.maximum(0., np.minimum(a[:, 3], b[:, 3]) - np.maximum(a[:, 1], b[:, 1]))
+  wh = w * h
+  iou = wh / ((a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1]) + (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1]) - wh)
+  edge = iou >= iou_threshold
+  d, t, iou = d[edge], t[edge], iou[edge]
+
+  matches = [np.empty((0,2),dtype=int)]
+  if len(d):
+    graph = coo_matrix((np.ones(len(d)), (d, n_det + t)), shape=(n_det + n_trk,) * 2)
+    _, labels = connected_components(graph, directed=False)
+    comp = labels[d]
+    # per component: edges sorted by IoU (best first), number of distinct dets and tracks
+    order = np.lexsort((-iou, comp))
+    d, t, iou, comp = d[order], t[order], iou[order], comp[order]
+    starts = np.flatnonzero(np.r_[True, comp[1:] != comp[:-1]])
+    sizes = np.diff(np.r_[starts, len(comp)])
+    n_dets = np.bincount(labels[np.unique(d)], minlength=len(labels))[comp[starts]]
+    n_trks = np.bincount(labels[n_det + np.unique(t)], minlength=len(labels))[comp[starts]]
+
+    # one detection or one track in the component: the best edge is the assignment
+    star = (n_dets == 1) | (n_trks == 1)
+    matches.append(np.stack((d[starts[star]], t[starts[star]]), axis=1))
+    # the remaining components share one block-diagonal matrix: entries between
+    # components stay 0 and are dropped, so each block is solved independently
+    # without a Python loop over components
+    general = np.repeat(~star, sizes)
+    if general.any():
+      rows, r = np.unique(d[general], return_inverse=True)
+      cols, c = np.unique(t[general], return_inverse=True)
+      block = np.zeros((len(rows), len(cols)))
+      block[r, c] = iou[general]
+      assigned = np.asarray(linear_assignment(-block), dtype=int).reshape(-1, 2)
+      assigned = assigned[block[assigned[:, 0], assigned[:, 1]] > 0]
+      matches.append(np.stack((rows[assigned[:, 0]], cols[assigned[:, 1]]), axis=1))
+
+  matches = np.concatenate(matches)
+  unmatched_detections = np.setdiff1d(np.arange(n_det), matches[:, 0])
+  unmatched_trackers = np.setdiff1d(np.arange(n_trk), matches[:, 1])
+  return matches, unmatched_detections, unmatched_trackers
 
 
 class Sort(object):
@@ -235,6 +313,152 @@ class Sort(object):
       return np.concatenate(ret)
     return np.empty((0,5))
 
+# Constant velocity model shared by every track of the batched engine (same as KalmanBoxTracker)
+_F = np.eye(7)
+_F[[0, 1, 2], [4, 5, 6]] = 1
+_Q = np.diag([1., 1., 1., 1., 0.01, 0.01, 0.0001])
+_R = np.diag([1., 1., 10., 10.])
+_P0 = np.diag([10., 10., 10., 10., 10000., 10000., 10000.])
+
+
+def convert_bboxes_to_z(bboxes):
+  """
+  Vectorised convert_bbox_to_z: [N,4+] boxes [x1,y1,x2,y2] -> [N,4] [x,y,s,r]
+  """
+  w = bboxes[:, 2] - bboxes[:, 0]
+  h = bboxes[:, 3] - bboxes[:, 1]
+  return np.stack((bboxes[:, 0] + w/2., bboxes[:, 1] + h/2., w * h, w / h), axis=1)
+
+
+def convert_xs_to_bboxes(xs):
+  """
+  Vectorised convert_x_to_bbox: [N,7+] states -> [N,4] boxes [x1,y1,x2,y2]
+  """
+  with np.errstate(invalid='ignore'):
+    w = np.sqrt(xs[:, 2] * xs[:, 3])
+    h = xs[:, 2] / w
+  return np.stack((xs[:, 0] - w/2., xs[:, 1] - h/2., xs[:, 0] + w/2., xs[:, 1] + h/2.), axis=1)
+
+
+class BatchSort(object):
+  """
+  SORT with every track's Kalman state and covariance stacked in arrays
+  ([N,7] and [N,7,7]), so predict and update run as one vectorised step for
+  all tracks instead of one filterpy KalmanFilter per track.
+  Drop-in replacement for Sort: same parameters, same update(dets) contract.
+  Once detections x tracks reaches gating_min_pairs, association switches to the
+  spatially gated associate_gated (None disables gating).
+  """
+  count = 0
+  def __init__(self, max_age=1, min_hits=3, iou_threshold=0.3, gating_min_pairs=40000):
+    self.max_age = max_age
+    self.min_hits = min_hits
+    self.iou_threshold = iou_threshold
+    self.gating_min_pairs = gating_min_pairs
+    self.frame_count = 0
+    # seconds spent in the association step: last frame and running total
+    self.association_time = 0.
+    self.association_total = 0.
+
+    self.x = np.empty((0, 7))
+    self.P = np.empty((0, 7, 7))
+    self.ids = np.empty(0, dtype=int)
+    self.time_since_update = np.empty(0, dtype=int)
+    self.hits = np.empty(0, dtype=int)
+    self.hit_streak = np.empty(0, dtype=int)
+    self.age = np.empty(0, dtype=int)
+    self.det_index = np.empty(0, dtype=int)
+    # index into the last dets of every returned row, aligned with update()'s output
+    self.last_indices = np.empty(0, dtype=int)
+
+  def _keep(self, mask):
+    for name in ('x', 'P', 'ids', 'time_since_update', 'hits', 'hit_streak', 'age', 'det_index'):
+      setattr(self, name, getattr(self, name)[mask])
+
+  def _predict(self):
+    """
+    Advances every track one step; returns the predicted boxes [N,4].
+    """
+    self.x[(self.x[:, 6] + self.x[:, 2]) <= 0, 6] = 0.
+    self.x = self.x @ _F.T
+    self.P = _F @ self.P @ _F.T + _Q
+    self.age += 1
+    self.hit_streak[self.time_since_update > 0] = 0
+    self.time_since_update += 1
+    return convert_xs_to_bboxes(self.x)
+
+  def _update(self, idx, dets, det_index):
+    """
+    Kalman update of tracks idx with the matched detections (Joseph form, as filterpy).
+    """
+    z = convert_bboxes_to_z(dets)
+    x, P = self.x[idx], self.P[idx]
+    y = z - x[:, :4]
+    S = P[:, :4, :4] + _R
+    K = P[:, :, :4] @ np.linalg.inv(S)
+    self.x[idx] = x + (K @ y[:, :, None])[:, :, 0]
+    I_KH = np.broadcast_to(np.eye(7), P.shape).copy()
+    I_KH[:, :, :4] -= K
+    self.P[idx] = I_KH @ P @ I_KH.transpose(0, 2, 1) + K @ _R @ K.transpose(0, 2, 1)
+
+    self.time_since_update[idx] = 0
+    self.det_index[idx] = det_index
+    self.hits[idx] += 1
+    self.hit_streak[idx] += 1
+
+  def _create(self, dets, det_index):
+    n = len(dets)
+    x = np.zeros((n, 7))
+    x[:, :4] = convert_bboxes_to_z(dets)
+    self.x = np.concatenate((self.x, x))
+    self.P = np.concatenate((self.P, np.broadcast_to(_P0, (n, 7, 7))))
+    self.ids = np.concatenate((self.ids, BatchSort.count + np.arange(n)))
+    BatchSort.count += n
+    zeros = np.zeros(n, dtype=int)
+    self.time_since_update = np.concatenate((self.time_since_update, zeros))
+    self.hits = np.concatenate((self.hits, zeros))
+    self.hit_streak = np.concatenate((self.hit_streak, zeros))
+    self.age = np.concatenate((self.age, zeros))
+    self.det_index = np.concatenate((self.det_index, det_index))
+
+  def update(self, dets=np.empty((0, 5))):
+    """
+    Same contract as Sort.update: dets is [[x1,y1,x2,y2,score],...], must be called
+    once per frame (np.empty((0, 5)) when empty), returns [[x1,y1,x2,y2,id],...].
+    """
+    self.frame_count += 1
+    trks = self._predict()
+    valid = ~np.any(np.isnan(trks), axis=1)
+    if not valid.all():
+      self._keep(valid)
+      trks = trks[valid]
+
+    start_time = time.perf_counter()
+    if self.gating_min_pairs is not None and len(dets) * len(trks) >= self.gating_min_pairs:
+      matched, unmatched_dets, unmatched_trks = associate_gated(dets, trks, self.iou_threshold)
+    else:
+      matched, unmatched_dets, unmatched_trks = associate_detections_to_trackers(dets, trks, self.iou_threshold)
+    self.association_time = time.perf_counter() - start_time
+    self.association_total += self.association_time
+
+    if len(matched):
+      self._update(matched[:, 1], dets[matched[:, 0], :4], matched[:, 0])
+    if len(unmatched_dets):
+      unmatched_dets = unmatched_dets.astype(int)
+      self._create(dets[unmatched_dets, :4], unmatched_dets)
+
+    # same output order as Sort: newest track first
+    boxes = convert_xs_to_bboxes(self.x)[::-1]
+    show = ((self.time_since_update < 1) & ((self.hit_streak >= self.min_hits) | (self.frame_count <= self.min_hits)))[::-1]
+    ret = np.concatenate((boxes[show], (self.ids[::-1][show] + 1)[:, None]), axis=1) # +1 as MOT benchmark requires positive
+    self.last_indices = self.det_index[::-1][show]
+
+    # remove dead tracklets
+    alive = self.time_since_update <= self.max_age
+    if not alive.all():
+      self._keep(alive)
+    return ret if len(ret) else np.empty((0,5))
+
 def parse_args():
     """Parse input arguments."""
     parser = argparse.ArgumentParser(description='SORT demo')
@@ -257,12 +481,19 @@ if __name__ == '__main__':
   display = args.display
   phase = args.phase
   total_time = 0.0
+  batch_time = 0.0
+  association_time = 0.0
   total_frames = 0
   colours = np.random.rand(32, 3) #used only for display
   if(display):
     if not os.path.exists('mot_benchmark'):
       print('\n\tERROR: mot_benchmark link not found!\n\n    Create a symbolic link to the MOT benchmark\n    (https://motchallenge.net/data/2D_MOT_2015/#download). E.g.:\n\n    $ ln -s /path/to/MOT2015_challenge/2DMOT2015 mot_benchmark\n\n')
       exit()
+    import matplotlib
+    matplotlib.use('TkAgg')
+    import matplotlib.pyplot as plt
+    import matplotlib.patches as patches
+    from skimage import io
     plt.ion()
     fig = plt.figure()
     ax1 = fig.add_subplot(111, aspect='equal')
@@ -274,6 +505,9 @@ if __name__ == '__main__':
     mot_tracker = Sort(max_age=args.max_age, 
                        min_hits=args.min_hits,
                        iou_threshold=args.iou_threshold) #create instance of the SORT tracker
+    batch_tracker = BatchSort(max_age=args.max_age,
+                              min_hits=args.min_hits,
+                              iou_threshold=args.iou_threshold) #same tracker, vectorised Kalman engine
     seq_dets = np.loadtxt(seq_dets_fn, delimiter=',')
     seq = seq_dets_fn[pattern.find('*'):].split(os.path.sep)[0]
     
@@ -296,6 +530,10 @@ if __name__ == '__main__':
         cycle_time = time.time() - start_time
         total_time += cycle_time
 
+        start_time = time.time()
+        batch_tracker.update(dets)
+        batch_time += time.time() - start_time
+
         for d in trackers:
           print('%d,%d,%.2f,%.2f,%.2f,%.2f,1,-1,-1,-1'%(frame,d[4],d[0],d[1],d[2]-d[0],d[3]-d[1]),file=out_file)
           if(display):
@@ -306,8 +544,11 @@ if __name__ == '__main__':
           fig.canvas.flush_events()
           plt.draw()
           ax1.cla()
+    association_time += batch_tracker.association_total
 
   print("Total Tracking took: %.3f seconds for %d frames or %.1f FPS" % (total_time, total_frames, total_frames / total_time))
+  print("Batch engine took: %.3f seconds for %d frames or %.1f FPS" % (batch_time, total_frames, total_frames / batch_time))
+  print("Batch engine association took: %.3f seconds" % (association_time))
 
   if(display):
     print("Note: to get real runtime results run without the option: --display")
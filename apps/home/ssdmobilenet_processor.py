@@ -4,9 +4,12 @@ import cv2
 import numpy as np
 import logging
 import os
+import threading
 
 logger = logging.getLogger(__name__)
 
+INPUT_SIZE = (300, 300)
+
 class SSDMobileNetProcessor:
     def __init__(self, model_path, config_path, labels_path):
         self.model_path = model_path
@@ -14,6 +17,9 @@ class SSDMobileNetProcessor:
         self.labels_path = labels_path
         self.net = None
         self.classes = []
+        # Satu instance dibagi beberapa kamera lewat model registry
+        self._lock = threading.Lock()
+        self._allocate_buffers()
         self._load_model()
 
     def _load_model(self):
@@ -45,47 +51,129 @@ class SSDMobileNetProcessor:
             logger.error(f"❌ Gagal memuat label SSD MobileNetV3: {e}")
             raise
 
-    def process_frame(self, frame, conf_threshold=0.5):
+    def _allocate_buffers(self):
+        # Buffer preprocessing yang dipakai ulang setiap frame (dilindungi _lock)
+        self._resized = np.empty((INPUT_SIZE[1], INPUT_SIZE[0], 3), dtype=np.uint8)
+        self._rgb = np.empty_like(self._resized)
+        self._blob = np.empty((1, 3, INPUT_SIZE[1], INPUT_SIZE[0]), dtype=np.float32)
+
+    def _blob_from_image(self, frame):
+        """
+        Setara cv2.dnn.blobFromImage(frame, 1/127.5, (300, 300), (127.5,)*3,
+        swapRB=True), tetapi menulis ke buffer yang dipakai ulang antar frame.
+        Harus dipanggil dengan self._lock terkunci.
+        """
+        cv2.resize(frame, INPUT_SIZE, dst=self._resized)
+        cv2.cvtColor(self._resized, cv2.COLOR_BGR2RGB, dst=self._rgb)
+        np.subtract(self._rgb.transpose(2, 0, 1), 127.5, out=self._blob[0], casting='unsafe')
+        self._blob *= 1 / 127.5
+        return self._blob
+
+    def process_frame(self, frame, conf_threshold=0.5, classes=None):
+        """classes: id label SSD (lihat names) yang dipertahankan; None berarti semua."""
         h, w, _ = frame.shape
 
         # Preprocessing: normalisasi sesuai SSD MobileNet (scale 1/127.5 dan mean 127.5)
-        blob = cv2.dnn.blobFromImage(
-            frame, scalefactor=1/127.5, size=(300, 300),
-            mean=(127.5, 127.5, 127.5), swapRB=True, crop=False
-        )
-        self.net.setInput(blob)
-        detections = self.net.forward()
-
-        results = []
-        for i in range(detections.shape[2]):
-            confidence = detections[0, 0, i, 2]
-
-            if confidence > conf_threshold:  # gunakan threshold (misal 0.5)
-                idx = int(detections[0, 0, i, 1])
-                if idx >= len(self.classes):
-                    continue
-                label = self.classes[idx - 1]
-
-                box = detections[0, 0, i, 3:7] * np.array([w, h, w, h])
-                (startX, startY, endX, endY) = box.astype("int")
-
-                # Clip biar tidak keluar dari frame
-                offset_x = int(0.05 * w)
-                startX = max(0, startX)
-                startY = max(0, startY)
-                endX = min(w - 1, endX)
-                endY = min(h - 1, endY)
-
-                center_x = int((startX + endX) / 2)
-                center_y = int((startY + endY) / 2)
-
-                results.append({
-                    'name': label,
-                    'confidence': float(confidence),
-                    'box': [startX, startY, endX, endY],
-                    'center': (center_x, center_y)
-                })
-        return results
+        with self._lock:
+            self.net.setInput(self._blob_from_image(frame))
+            detections = self.net.forward()
+        return self.decode(detections, w, h, conf_threshold, classes)
+
+    def decode(self, detections, w, h, conf_threshold=0.5, classes=None):
+        """Decode semua baris output sekaligus: mask ambang, skala, clip, dan titik tengah."""
+        rows = detections[0, 0]
+        class_ids = rows[:, 1].astype(int)
+        # Indeks 0 adalah background; label i memakai baris ke-(i - 1) file coco.names
+        mask = (rows[:, 2] > conf_threshold) & (class_ids >= 1) & (class_ids < len(self.classes))
+        if classes is not None:
+            mask &= np.isin(class_ids, classes)
+        if not mask.any():
+            return []
+
+        rows, class_ids = rows[mask], class_ids[mask]
+        boxes = (rows[:, 3:7] * np.array([w, h, w, h])).astype(int)
+        # Clip biar tidak keluar dari frame
+        boxes[:, [0, 1]] = boxes[:, [0, 1]].clip(0)
+        boxes[:, 2] = boxes[:, 2].clip(max=w - 1)
+        boxes[:, 3] = boxes[:, 3].clip(max=h - 1)
+        centers = (boxes[:, :2] + boxes[:, 2:]) // 2
+
+        return [
+            {
+                'name': self.classes[class_id - 1],
+                'confidence': confidence,
+                'box': box,
+                'center': tuple(center)
+            }
+            for class_id, confidence, box, center in zip(class_ids.tolist(), rows[:, 2].tolist(), boxes.tolist(), centers.tolist())
+        ]
+
+    @property
+    def names(self):
+        """Pemetaan id label SSD -> nama kelas (id 0 adalah background)."""
+        return {i + 1: name for i, name in enumerate(self.classes)}
 
     def get_class_names(self):
-        return self.classes
\ No newline at end of file
+        return self.classes
+
+
+def _legacy_process(frame, net_output, classes, conf_threshold=0.5):
+    """Implementasi lama (blob baru + loop per baris), hanya untuk benchmark."""
+    h, w, _ = frame.shape
+    cv2.dnn.blobFromImage(frame, scalefactor=1/127.5, size=INPUT_SIZE, mean=(127.5, 127.5, 127.5), swapRB=True, crop=False)
+    results = []
+    for i in range(net_output.shape[2]):
+        confidence = net_output[0, 0, i, 2]
+        if confidence > conf_threshold:
+            idx = int(net_output[0, 0, i, 1])
+            if idx >= len(classes):
+                continue
+            label = classes[idx - 1]
+            box = net_output[0, 0, i, 3:7] * np.array([w, h, w, h])
+            (startX, startY, endX, endY) = box.astype("int")
+            startX, startY = max(0, startX), max(0, startY)
+            endX, endY = min(w - 1, endX), min(h - 1, endY)
+            results.append({'name': label, 'confidence': float(confidence), 'box': [startX, startY, endX, endY],
+                            'center': (int((startX + endX) / 2), int((startY + endY) / 2))})
+    return results
+
+
+if __name__ == '__main__':
+    # Micro-benchmark preprocessing + decode (tanpa forward pass jaringan):
+    # python apps/home/ssdmobilenet_processor.py
+    import time
+
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 255, (720, 1280, 3), dtype=np.uint8)
+    processor = SSDMobileNetProcessor.__new__(SSDMobileNetProcessor)
+    processor.classes = [f'class_{i}' for i in range(80)]
+    processor._lock = threading.Lock()
+    processor._allocate_buffers()
+
+    reference = cv2.dnn.blobFromImage(frame, scalefactor=1/127.5, size=INPUT_SIZE, mean=(127.5, 127.5, 127.5), swapRB=True, crop=False)
+    print(f"selisih maks blob: {np.abs(processor._blob_from_image(frame) - reference).max():.2e}")
+
+    iterations = 500
+    print(f"{'deteksi':>8}{'lama (ms)':>12}{'baru (ms)':>12}{'speedup':>10}")
+    for count in (5, 20, 50, 100):
+        # Output SSD: 100 baris, `count` di antaranya di atas ambang
+        output = np.zeros((1, 1, 100, 7), dtype=np.float32)
+        output[0, 0, :, 1] = rng.integers(1, 80, 100)
+        output[0, 0, :, 2] = rng.uniform(0.0, 0.4, 100)
+        output[0, 0, :count, 2] = rng.uniform(0.6, 1.0, count)
+        corners = np.sort(rng.random((100, 2, 2)), axis=1)
+        output[0, 0, :, 3:7] = corners.transpose(0, 2, 1).reshape(100, 4)[:, [0, 2, 1, 3]]
+
+        started = time.perf_counter()
+        for _ in range(iterations):
+            _legacy_process(frame, output, processor.classes)
+        legacy_ms = (time.perf_counter() - started) / iterations * 1000
+
+        started = time.perf_counter()
+        for _ in range(iterations):
+            with processor._lock:
+                processor._blob_from_image(frame)
+            processor.decode(output, 1280, 720)
+        new_ms = (time.perf_counter() - started) / iterations * 1000
+
+        print(f"{count:>8}{legacy_ms:>12.3f}{new_ms:>12.3f}{legacy_ms / new_ms:>9.2f}x")
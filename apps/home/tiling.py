@@ -0,0 +1,204 @@
+# apps/home/tiling.py
+# -*- encoding: utf-8 -*-
+import logging
+import argparse
+from functools import lru_cache
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OVERLAP = 0.2
+# Kotak dari dua tile dianggap objek yang sama jika IoU atau
+# intersection-over-smaller (objek terpotong di tepi tile) melewati ambang ini
+MERGE_IOU_THRESHOLD = 0.5
+MERGE_IOS_THRESHOLD = 0.8
+
+
+@lru_cache(maxsize=64)
+def tile_boxes(height, width, rows, cols, overlap=DEFAULT_OVERLAP):
+    """
+    Membagi area height x width menjadi rows x cols tile yang saling tumpang
+    tindih sebesar overlap (fraksi ukuran tile). Mengembalikan tuple kotak
+    (x1, y1, x2, y2); hasil di-cache per resolusi dan pengaturan.
+    """
+    def spans(length, count):
+        if count <= 1:
+            return [(0, length)]
+        size = int(np.ceil(length / (count - overlap * (count - 1))))
+        step = size * (1 - overlap)
+        starts = [min(int(round(i * step)), length - size) for i in range(count)]
+        return [(start, start + size) for start in starts]
+
+    return tuple(
+        (x1, y1, x2, y2)
+        for y1, y2 in spans(height, rows)
+        for x1, x2 in spans(width, cols)
+    )
+
+
+class TileGrid:
+    """Pengaturan tile per kamera (baris, kolom, overlap); aktif jika lebih dari satu tile."""
+    def __init__(self, rows=1, cols=1, overlap=DEFAULT_OVERLAP):
+        self.rows = rows
+        self.cols = cols
+        self.overlap = overlap
+
+    @classmethod
+    def from_camera(cls, camera_data):
+        grid = cls()
+        grid.configure(camera_data)
+        return grid
+
+    def configure(self, camera_data):
+        """Mengambil pengaturan per kamera; kolom kosong berarti satu tile (nonaktif)."""
+        self.rows = max(camera_data.tile_rows or 1, 1)
+        self.cols = max(camera_data.tile_cols or 1, 1)
+        self.overlap = min(max(camera_data.tile_overlap if camera_data.tile_overlap is not None else DEFAULT_OVERLAP, 0.0), 0.9)
+
+    @property
+    def enabled(self):
+        return self.rows * self.cols > 1
+
+    def boxes(self, region):
+        """
+        Kotak tile dalam koordinat frame penuh untuk region (x1, y1, x2, y2),
+        misalnya seluruh frame atau crop ROI. None jika tiling nonaktif.
+        """
+        if not self.enabled:
+            return None
+        rx1, ry1, rx2, ry2 = region
+        return [
+            (x1 + rx1, y1 + ry1, x2 + rx1, y2 + ry1)
+            for x1, y1, x2, y2 in tile_boxes(ry2 - ry1, rx2 - rx1, self.rows, self.cols, self.overlap)
+        ]
+
+    def stats(self):
+        return {'tiles': self.rows * self.cols}
+
+
+def merge_detections(detections, offsets, iou_threshold=MERGE_IOU_THRESHOLD, ios_threshold=MERGE_IOS_THRESHOLD):
+    """
+    Menggabungkan deteksi (N, 6) -- x1, y1, x2, y2, confidence, class_id --
+    dari beberapa tile: digeser ke koordinat frame penuh lalu NMS lintas tile
+    per kelas. Selain IoU, intersection-over-smaller juga dipakai sehingga
+    potongan objek di tepi tile tertekan oleh deteksi utuhnya.
+    """
+    shifted = [
+        dets + np.array([dx, dy, dx, dy, 0, 0], dtype=np.float32)
+        for dets, (dx, dy) in zip(detections, offsets) if len(dets)
+    ]
+    if not shifted:
+        return np.empty((0, 6), dtype=np.float32)
+    merged = np.concatenate(shifted)
+    if len(shifted) == 1:
+        return merged
+
+    merged = merged[np.argsort(-merged[:, 4], kind='stable')]
+    boxes, classes = merged[:, :4], merged[:, 5]
+    areas = (boxes[:, 2] - boxes[:, 0]).clip(0) * (boxes[:, 3] - boxes[:, 1]).clip(0)
+    suppressed = np.zeros(len(merged), dtype=bool)
+    keep = []
+    for i in range(len(merged)):
+        if suppressed[i]:
+            continue
+        keep.append(i)
+        rest = np.arange(i + 1, len(merged))
+        rest = rest[~suppressed[rest] & (classes[rest] == classes[i])]
+        if not len(rest):
+            continue
+        w = (np.minimum(boxes[i, 2], boxes[rest, 2]) - np.maximum(boxes[i, 0], boxes[rest, 0])).clip(0)
+        h = (np.minimum(boxes[i, 3], boxes[rest, 3]) - np.maximum(boxes[i, 1], boxes[rest, 1])).clip(0)
+        inter = w * h
+        iou = inter / np.maximum(areas[i] + areas[rest] - inter, 1e-6)
+        ios = inter / np.maximum(np.minimum(areas[i], areas[rest]), 1e-6)
+        suppressed[rest[(iou > iou_threshold) | (ios > ios_threshold)]] = True
+    return merged[keep]
+
+
+def detections_from_dicts(detections, names):
+    """Mengubah deteksi format dict (SSD) ke array (N, 6) untuk penggabungan tile."""
+    class_ids = {name: class_id for class_id, name in names.items()}
+    return np.array(
+        [[*d['box'], d['confidence'], class_ids[d['name']]] for d in detections],
+        dtype=np.float32
+    ).reshape(-1, 6)
+
+
+def _box_iou(a, b):
+    w = (np.minimum(a[:, None, 2], b[None, :, 2]) - np.maximum(a[:, None, 0], b[None, :, 0])).clip(0)
+    h = (np.minimum(a[:, None, 3], b[None, :, 3]) - np.maximum(a[:, None, 1], b[None, :, 1])).clip(0)
+    inter = w * h
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-6)
+
+
+def _recall(predicted, reference, iou_threshold=0.5):
+    if not len(reference):
+        return None
+    if not len(predicted):
+        return 0.0
+    return float((_box_iou(reference, predicted).max(axis=1) >= iou_threshold).mean())
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Perbandingan recall dan waktu per frame: tiled vs frame penuh')
+    parser.add_argument('model', help='Path model YOLO (.pt atau .onnx)')
+    parser.add_argument('source', help='Video atau pola gambar beresolusi tinggi (mis. lobby_%%04d.jpg)')
+    parser.add_argument('--frames', type=int, default=50)
+    parser.add_argument('--rows', type=int, default=2)
+    parser.add_argument('--cols', type=int, default=2)
+    parser.add_argument('--overlap', type=float, default=DEFAULT_OVERLAP)
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--reference-imgsz', type=int, default=1920,
+                        help='Inferensi frame penuh beresolusi tinggi yang dipakai sebagai acuan recall')
+    parser.add_argument('--classes', type=int, nargs='*', default=[0], help='Default: person')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    # python -m apps.home.tiling apps/static/models/yolov8n.pt lobby.mp4 --rows 2 --cols 2
+    # Tanpa anotasi manual, acuan recall adalah deteksi frame penuh pada --reference-imgsz.
+    import time
+    import cv2
+    from ultralytics import YOLO
+
+    args = parse_args()
+    model = YOLO(args.model)
+    cap = cv2.VideoCapture(args.source)
+    grid = TileGrid(args.rows, args.cols, args.overlap)
+
+    totals = {'full': [0.0, []], 'tiled': [0.0, []]}
+    processed = 0
+    while processed < args.frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        processed += 1
+        h, w = frame.shape[:2]
+
+        reference = model.predict(frame, imgsz=args.reference_imgsz, classes=args.classes, verbose=False)[0].boxes.data.cpu().numpy()
+
+        started = time.perf_counter()
+        full = model.predict(frame, imgsz=args.imgsz, classes=args.classes, verbose=False)[0].boxes.data.cpu().numpy()
+        totals['full'][0] += time.perf_counter() - started
+
+        started = time.perf_counter()
+        tiles = grid.boxes((0, 0, w, h))
+        results = model.predict([frame[y1:y2, x1:x2] for x1, y1, x2, y2 in tiles], imgsz=args.imgsz, classes=args.classes, verbose=False)
+        tiled = merge_detections([r.boxes.data.cpu().numpy()[:, [0, 1, 2, 3, -2, -1]] for r in results], [(x1, y1) for x1, y1, _, _ in tiles])
+        totals['tiled'][0] += time.perf_counter() - started
+
+        for name, predicted in (('full', full), ('tiled', tiled)):
+            recall = _recall(predicted[:, :4], reference[:, :4])
+            if recall is not None:
+                totals[name][1].append(recall)
+    cap.release()
+
+    if not processed:
+        raise SystemExit(f"Tidak ada frame yang bisa dibaca dari {args.source}")
+    print(f"{processed} frame, tile {args.rows}x{args.cols} overlap {args.overlap}, acuan imgsz {args.reference_imgsz}")
+    print(f"{'mode':<8}{'ms/frame':>10}{'recall':>10}")
+    for name, (elapsed, recalls) in totals.items():
+        recall = f"{np.mean(recalls):.3f}" if recalls else '-'
+        print(f"{name:<8}{elapsed / processed * 1000:>10.1f}{recall:>10}")
@@ -4,8 +4,8 @@
 import cv2
 import numpy as np
 import logging
-import math
 import os
+import threading
 import urllib.request
 
 # Konfigurasi logging untuk output yang lebih jelas
@@ -27,6 +27,8 @@ class YOLOv3Processor:
         """
         self.confidence_threshold = float(confidence_threshold)
         self.nms_threshold = float(nms_threshold)
+        # Satu instance dibagi beberapa kamera lewat model registry
+        self._lock = threading.Lock()
         
         self.cfg_path = os.path.join(MODEL_DIR, "yolov3-tiny.cfg")
         self.weights_path = os.path.join(MODEL_DIR, "yolov3-tiny.weights")
@@ -81,50 +83,63 @@ class YOLOv3Processor:
                     os.remove(filepath)
                 raise
 
-    def process_frame(self, frame):
+    def process_frame(self, frame, classes=None):
         """
-        Metode utama untuk memproses frame video dan mengembalikan deteksi mentah.
+        Metode utama untuk memproses frame video dan mengembalikan deteksi mentah
+        sebagai array float32 berukuran (N, 6): x1, y1, x2, y2, confidence, class_id.
+        classes membatasi id kelas yang dipertahankan (sebelum NMS); None berarti semua.
         """
         h, w = frame.shape[:2]
         blob = cv2.dnn.blobFromImage(frame, 1/255.0, (416, 416), swapRB=True, crop=False)
-        self.net.setInput(blob)
-        layer_outputs = self.net.forward(self.output_layers)
+        with self._lock:
+            self.net.setInput(blob)
+            layer_outputs = self.net.forward(self.output_layers)
+        return self.decode(layer_outputs, w, h, classes)
 
-        boxes, confidences, class_ids = [], [], []
+    def decode(self, layer_outputs, w, h, classes=None):
+        """
+        Decode seluruh output layer sekaligus dengan operasi array: gabungkan,
+        saring berdasarkan confidence, konversi kotak, lalu NMS per kelas.
+        """
+        outputs = np.concatenate([output.reshape(-1, output.shape[-1]) for output in layer_outputs])
+        scores = outputs[:, 5:]
+        class_ids = scores.argmax(axis=1)
+        confidences = scores[np.arange(len(scores)), class_ids]
 
-        for output in layer_outputs:
-            for detection in output:
-                scores = detection[5:]
-                class_id = np.argmax(scores)
-                confidence = scores[class_id]
+        mask = confidences > self.confidence_threshold
+        if classes is not None:
+            mask &= np.isin(class_ids, classes)
+        if not mask.any():
+            return np.empty((0, 6), dtype=np.float32)
+        outputs, class_ids, confidences = outputs[mask], class_ids[mask], confidences[mask]
 
-                if confidence > self.confidence_threshold:
-                    center_x = int(detection[0] * w)
-                    center_y = int(detection[1] * h)
-                    box_w = int(detection[2] * w)
-                    box_h = int(detection[3] * h)
+        # cx, cy, w, h ternormalisasi -> x, y, w, h dalam piksel
+        boxes = outputs[:, :4] * np.array([w, h, w, h], dtype=np.float32)
+        boxes[:, :2] -= boxes[:, 2:] / 2
 
-                    x = int(center_x - box_w / 2)
-                    y = int(center_y - box_h / 2)
+        # NMS per kelas dalam satu panggilan: kotak tiap kelas digeser ke wilayah
+        # koordinat sendiri sehingga kelas berbeda tidak pernah saling menekan
+        offsets = class_ids[:, None].astype(np.float32) * (max(w, h) + 1)
+        shifted = boxes.copy()
+        shifted[:, :2] += offsets
+        indices = cv2.dnn.NMSBoxes(shifted, confidences, self.confidence_threshold, self.nms_threshold)
+        indices = np.asarray(indices, dtype=np.int64).reshape(-1)
+
+        detections = np.empty((len(indices), 6), dtype=np.float32)
+        detections[:, :2] = boxes[indices, :2]
+        detections[:, 2:4] = boxes[indices, :2] + boxes[indices, 2:]
+        detections[:, [0, 2]] = detections[:, [0, 2]].clip(0, w - 1)
+        detections[:, [1, 3]] = detections[:, [1, 3]].clip(0, h - 1)
+        detections[:, 4] = confidences[indices]
+        detections[:, 5] = class_ids[indices]
+
+        logger.debug(f"Ditemukan {len(detections)} deteksi setelah NMS.")
+        return detections
+
+    @property
+    def names(self):
+        return self.classes
+
+    def get_class_names(self):
+        return [self.classes[i] for i in sorted(self.classes)]
 
-                    boxes.append([x, y, box_w, box_h])
-                    confidences.append(float(confidence))
-                    class_ids.append(class_id)
-        
-        indices = cv2.dnn.NMSBoxes(boxes, confidences, self.confidence_threshold, self.nms_threshold)
-        
-        detections_list = []
-        if len(indices) > 0:
-            for i in indices.flatten():
-                (x, y, box_w, box_h) = boxes[i]
-                obj_name = self.classes.get(class_ids[i])
-                if not obj_name: continue
-                
-                detections_list.append({
-                    'name': obj_name,
-                    'box': [x, y, x + box_w, y + box_h], 
-                    'confidence': confidences[i]
-                })
-        
-        logger.debug(f"Ditemukan {len(detections_list)} deteksi setelah NMS.")
-        return detections_list
\ No newline at end of file
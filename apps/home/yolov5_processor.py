@@ -2,6 +2,8 @@
 # -*- encoding: utf-8 -*-
 
 import os
+import threading
+import numpy as np
 from ultralytics import YOLO
 import logging
 
@@ -16,6 +18,8 @@ os.makedirs(MODEL_DIR, exist_ok=True)
 class YOLOv5Processor:
     def __init__(self, model_path='yolov5n.pt'):
         self.model_path = os.path.join(MODEL_DIR, model_path)
+        # Satu instance dibagi beberapa kamera lewat model registry
+        self._lock = threading.Lock()
         self.download_yolov5_model()
 
         try:
@@ -47,27 +51,43 @@ class YOLOv5Processor:
         except Exception as e:
             logger.error(f"❌ Gagal mengunduh atau memindahkan model YOLOv5: {e}")
 
-    def process_frame(self, frame, classes=None):
-        results = self.model(frame, verbose=False)
-        detections_list = []
+    @property
+    def names(self):
+        return self.model.names
 
-        if results and results[0].boxes:
-            for r in results:
-                for box in r.boxes:
-                    x1, y1, x2, y2 = box.xyxy[0].tolist()
-                    conf = box.conf[0].item()
-                    cls = int(box.cls[0].item())
-                    name = self.model.names[cls]
-                    
-                    center_x = (x1 + x2) / 2
-                    center_y = (y1 + y2) / 2
+    def process_frame(self, frame, classes=None, conf=None, iou=None):
+        """
+        Menjalankan model dan mengembalikan array float32 (N, 6):
+        x1, y1, x2, y2, confidence, class_id. Ambang dan filter kelas
+        diterapkan di dalam pemanggilan model (sebelum NMS), bukan setelahnya.
+        """
+        return self.process_frames([frame], classes, conf, iou)[0]
 
-                    detections_list.append({
-                        'name': name,
-                        'box': [int(x1), int(y1), int(x2), int(y2)],
-                        'confidence': conf,
-                        'center': (int(center_x), int(center_y))
-                    })
-        
-        logger.debug(f"Ditemukan {len(detections_list)} deteksi di frame.")
-        return detections_list
\ No newline at end of file
+    def process_frames(self, frames, classes=None, conf=None, iou=None):
+        """Seperti process_frame, tetapi beberapa frame (misalnya tile) dalam satu batch."""
+        kwargs = {}
+        if classes is not None:
+            kwargs['classes'] = list(classes)
+        if conf is not None:
+            kwargs['conf'] = conf
+        if iou is not None:
+            kwargs['iou'] = iou
+
+        with self._lock:
+            results = self.model(frames, verbose=False, **kwargs)
+
+        batch = []
+        for result in results:
+            if result.boxes is None or len(result.boxes) == 0:
+                batch.append(np.empty((0, 6), dtype=np.float32))
+                continue
+            # Satu kali transfer ke NumPy untuk seluruh frame, bukan .item() per kotak
+            boxes = result.boxes.cpu().numpy()
+            detections = np.empty((len(boxes), 6), dtype=np.float32)
+            detections[:, :4] = boxes.xyxy
+            detections[:, 4] = boxes.conf
+            detections[:, 5] = boxes.cls
+            batch.append(detections)
+
+        logger.debug(f"Ditemukan {sum(len(d) for d in batch)} deteksi di {len(frames)} frame.")
+        return batch
@@ -201,6 +201,12 @@ document.addEventListener('DOMContentLoaded', function() {
                 els.loadingSpinner.style.display = 'none';
                 els.placeholder.style.display = 'block';
                 els.placeholder.querySelector('span').textContent = data.message;
+            } else if (data.type === 'health' && data.state !== 'streaming') {
+                // Kamera sedang reconnect (connecting/backoff) atau tidak merespons (failed)
+                els.loadingSpinner.style.display = data.state === 'failed' ? 'none' : 'block';
+                els.placeholder.style.display = 'block';
+                els.placeholder.querySelector('span').textContent = data.message;
+                els.videoFeed.style.display = 'none';
             } else if (data.type === 'error') {
                 els.loadingSpinner.style.display = 'none';
                 els.placeholder.style.display = 'block';
@@ -27,6 +27,12 @@ document.addEventListener('DOMContentLoaded', function() {
     // Inisialisasi koneksi Socket.IO
     const socket = io('/dashboard');
 
+    // State dasbor di klien; server hanya mengirim kamera dan baris log yang berubah
+    const MAX_LOG_LINES = 7;
+    let liveCounts = {};
+    let countingLogs = [];
+    let alarmLogs = [];
+
     /**
      * Inisialisasi grafik batang. Ini hanya akan dipanggil satu kali.
      */
@@ -116,26 +122,46 @@ document.addEventListener('DOMContentLoaded', function() {
     // Panggil fungsi inisialisasi grafik saat halaman dimuat
     initializeChart();
 
+    /**
+     * Menambahkan baris log baru ({seq, text}) tanpa duplikat dan memotong ke MAX_LOG_LINES.
+     */
+    function mergeLogs(current, incoming) {
+        const lastSeq = current.length ? current[current.length - 1].seq : 0;
+        const merged = current.concat((incoming || []).filter(log => log.seq > lastSeq));
+        return merged.slice(-MAX_LOG_LINES);
+    }
+
+    function renderDashboard() {
+        updateLiveCountsUI(liveCounts);
+        updateChartData(liveCounts);
+        updateLogsUI({
+            counting_logs: countingLogs.map(log => log.text),
+            alarm_logs: alarmLogs.map(log => log.text)
+        });
+    }
+
     // Socket.IO Listeners
     socket.on('dashboard_data_update', function(data) {
-        // Perbarui UI hitungan langsung
-        if (data.chart_data) {
-            updateLiveCountsUI(data.chart_data);
-            // Panggil fungsi pembaruan grafik di sini
-            updateChartData(data.chart_data);
+        if (data.reset) {
+            // Data di server dimuat ulang (mis. log dihapus): ganti seluruh state
+            liveCounts = data.chart_data || {};
+            countingLogs = (data.counting_logs || []).slice(-MAX_LOG_LINES);
+            alarmLogs = (data.alarm_logs || []).slice(-MAX_LOG_LINES);
+        } else {
+            // Hanya kamera yang berubah yang dikirim
+            Object.assign(liveCounts, data.chart_data || {});
+            countingLogs = mergeLogs(countingLogs, data.counting_logs);
+            alarmLogs = mergeLogs(alarmLogs, data.alarm_logs);
         }
-
-        // Perbarui log
-        updateLogsUI(data);
+        renderDashboard();
     });
 
     socket.on('initial_dashboard_data', function(data) {
-        // Data awal saat koneksi pertama
-        if (data.chart_data) {
-            updateLiveCountsUI(data.chart_data);
-            updateChartData(data.chart_data);
-        }
-        updateLogsUI(data);
+        // Data awal (snapshot penuh) saat koneksi pertama
+        liveCounts = data.chart_data || {};
+        countingLogs = (data.counting_logs || []).slice(-MAX_LOG_LINES);
+        alarmLogs = (data.alarm_logs || []).slice(-MAX_LOG_LINES);
+        renderDashboard();
     });
 
     /**
@@ -9,6 +9,9 @@ const saveLineBtn = document.getElementById('saveLineBtn');
 const clearLineBtn = document.getElementById('clearLineBtn');
 const statusLog = document.getElementById('statusLog');
 const peopleCountBadge = document.getElementById('peopleCountBadge');
+const shapeModeSelect = document.getElementById('shapeMode');
+const shapeNameInput = document.getElementById('shapeName');
+const shapeList = document.getElementById('shapeList');
 
 // Mendapatkan konteks 2D untuk menggambar di canvas
 const canvasContext = drawCanvas.getContext('2d');
@@ -19,6 +22,11 @@ let startPoint = {};
 let endPoint = {};
 let currentCamId = null;
 
+// Semua garis dan zona kamera aktif, koordinat ternormalisasi (0-1)
+let geometry = { lines: [], zones: [] };
+// Titik zona yang sedang digambar (piksel canvas)
+let zonePoints = [];
+
 /**
  * Menambahkan pesan log ke elemen statusLog
  * @param {string} message - Pesan yang akan ditambahkan ke log
@@ -46,9 +54,7 @@ function drawPoint(p, color) {
  * @param {Object} p1 - Titik awal {x, y}
  * @param {Object} p2 - Titik akhir {x, y}
  */
-function drawLineWithLabels(p1, p2) {
-    clearCanvas();
-    
+function drawLineWithLabels(p1, p2, name) {
     // Menggambar garis utama
     canvasContext.beginPath();
     canvasContext.moveTo(p1.x, p1.y);
@@ -99,6 +105,117 @@ function drawLineWithLabels(p1, p2) {
 
     canvasContext.fillText('IN', inLabelX, inLabelY);
     canvasContext.fillText('OUT', outLabelX, outLabelY);
+
+    if (name) {
+        canvasContext.font = '12px Arial';
+        canvasContext.fillText(name, p1.x, p1.y - 10);
+    }
+}
+
+/**
+ * Menggambar polygon zona; zona yang belum selesai digambar tanpa menutup sisi terakhir.
+ * @param {Array} points - Titik-titik {x, y} dalam piksel canvas
+ * @param {string} name - Nama zona
+ * @param {boolean} closed - Apakah polygon sudah ditutup
+ */
+function drawZone(points, name, closed) {
+    if (points.length === 0) return;
+    canvasContext.beginPath();
+    canvasContext.moveTo(points[0].x, points[0].y);
+    points.slice(1).forEach(p => canvasContext.lineTo(p.x, p.y));
+    if (closed) {
+        canvasContext.closePath();
+        canvasContext.fillStyle = 'rgba(255, 0, 255, 0.15)';
+        canvasContext.fill();
+    }
+    canvasContext.strokeStyle = 'magenta';
+    canvasContext.lineWidth = 2;
+    canvasContext.stroke();
+    points.forEach(p => drawPoint(p, 'magenta'));
+
+    if (name) {
+        canvasContext.font = 'bold 14px Arial';
+        canvasContext.fillStyle = 'white';
+        canvasContext.textAlign = 'left';
+        canvasContext.fillText(name, points[0].x, points[0].y - 10);
+    }
+}
+
+/**
+ * Menggambar ulang semua garis dan zona tersimpan, ditambah bentuk yang sedang digambar.
+ */
+function renderGeometry(previewLine) {
+    clearCanvas();
+    const w = drawCanvas.width;
+    const h = drawCanvas.height;
+    geometry.lines.forEach(line => {
+        drawLineWithLabels({ x: line.x1 * w, y: line.y1 * h }, { x: line.x2 * w, y: line.y2 * h }, line.name);
+    });
+    geometry.zones.forEach(zone => {
+        drawZone(zone.points.map(p => ({ x: p[0] * w, y: p[1] * h })), zone.name, true);
+    });
+    if (previewLine) {
+        drawLineWithLabels(previewLine[0], previewLine[1]);
+    }
+    drawZone(zonePoints, null, false);
+}
+
+/**
+ * Menampilkan daftar garis/zona dengan tombol hapus per bentuk.
+ */
+function renderShapeList() {
+    shapeList.innerHTML = '';
+    const addItem = (label, onRemove) => {
+        const item = document.createElement('li');
+        item.className = 'list-group-item d-flex justify-content-between align-items-center';
+        item.textContent = label;
+        const removeBtn = document.createElement('button');
+        removeBtn.type = 'button';
+        removeBtn.className = 'btn btn-sm btn-outline-danger';
+        removeBtn.textContent = '✕';
+        removeBtn.addEventListener('click', () => {
+            onRemove();
+            renderShapeList();
+            renderGeometry();
+            saveLineBtn.disabled = false;
+        });
+        item.appendChild(removeBtn);
+        shapeList.appendChild(item);
+    };
+    geometry.lines.forEach((line, i) => addItem(`Garis: ${line.name}`, () => geometry.lines.splice(i, 1)));
+    geometry.zones.forEach((zone, i) => addItem(`Zona: ${zone.name}`, () => geometry.zones.splice(i, 1)));
+}
+
+/**
+ * Nama bentuk berikutnya: dari input, atau nomor urut otomatis.
+ */
+function nextShapeName(kind) {
+    const name = shapeNameInput.value.trim();
+    shapeNameInput.value = '';
+    if (name) return name;
+    return kind === 'zone' ? `zona ${geometry.zones.length + 1}` : `garis ${geometry.lines.length + 1}`;
+}
+
+/**
+ * Membaca geometri kamera dari dataset opsi; garis lama (satu garis) diubah ke format baru.
+ */
+function loadGeometry(option) {
+    const parse = (value) => {
+        if (!value || value === 'null') return null;
+        try {
+            return JSON.parse(value);
+        } catch (e) {
+            addLog(`ERROR: Gagal mem-parse data garis: ${e.message}`);
+            console.error("Failed to parse JSON:", value, e);
+            return null;
+        }
+    };
+    const stored = parse(option.dataset.geometry);
+    if (stored) {
+        return { lines: stored.lines || [], zones: stored.zones || [] };
+    }
+    const lineCoords = parse(option.dataset.lineCoords);
+    return { lines: lineCoords ? [Object.assign({ name: 'garis 1' }, lineCoords)] : [], zones: [] };
 }
 
 /**
@@ -138,23 +255,14 @@ cameraSelect.addEventListener('change', () => {
         addLog(`Memulai streaming untuk kamera dengan ID: ${currentCamId}`);
         socket.emit('start_stream', { cam_id: currentCamId });
         
-        const lineCoordsString = selectedOption.dataset.lineCoords || 'null';
-        let lineCoords = null;
-        
-        // Periksa apakah data garis valid
-        if (lineCoordsString && lineCoordsString !== 'null') {
-            try {
-                lineCoords = JSON.parse(lineCoordsString);
-            } catch (e) {
-                addLog(`ERROR: Gagal mem-parse data garis: ${e.message}`);
-                console.error("Failed to parse JSON:", lineCoordsString, e);
-            }
-        }
-        
-        if (lineCoords) {
+        geometry = loadGeometry(selectedOption);
+        zonePoints = [];
+        renderShapeList();
+
+        if (geometry.lines.length || geometry.zones.length) {
             // Panggil fungsi yang menunggu video dimuat
-            drawExistingLine(lineCoords);
-            addLog('Garis hitung yang sudah ada dimuat.');
+            drawExistingGeometry();
+            addLog(`Geometri tersimpan dimuat: ${geometry.lines.length} garis, ${geometry.zones.length} zona.`);
             saveLineBtn.disabled = false;
             clearLineBtn.disabled = false;
         } else {
@@ -189,24 +297,15 @@ function stopStream() {
     }
 }
 
-function drawExistingLine(coords) {
+function drawExistingGeometry() {
     // Inner function to perform the actual drawing logic
     const draw = () => {
-        const videoWidth = videoFeed.offsetWidth;
-        const videoHeight = videoFeed.offsetHeight;
-        
         // Periksa kembali untuk memastikan dimensi valid
-        if (videoWidth === 0 || videoHeight === 0) {
+        if (videoFeed.offsetWidth === 0 || videoFeed.offsetHeight === 0) {
             console.error('Video feed has no dimensions. Cannot draw line.');
             return;
         }
-
-        // Perbarui variabel global
-        startPoint = { x: coords.x1 * videoWidth, y: coords.y1 * videoHeight };
-        endPoint = { x: coords.x2 * videoWidth, y: coords.y2 * videoHeight };
-
-        // Panggil fungsi gambar dengan titik-titik yang sudah diperbarui
-        drawLineWithLabels(startPoint, endPoint);
+        renderGeometry();
     };
 
     // Pengecekan status video: jika sudah siap, gambar langsung
@@ -219,43 +318,68 @@ function drawExistingLine(coords) {
 }
 
 // Mendengarkan event mouse pada canvas untuk menggambar
+function canvasPoint(e) {
+    const rect = drawCanvas.getBoundingClientRect();
+    return { x: e.clientX - rect.left, y: e.clientY - rect.top };
+}
+
 drawCanvas.addEventListener('mousedown', (e) => {
     if (!currentCamId) {
         addLog('ERROR: Pilih kamera terlebih dahulu sebelum menggambar.');
         return;
     }
+    if (shapeModeSelect.value === 'zone') return; // Zona digambar dengan klik per titik
     isDrawing = true;
-    const rect = drawCanvas.getBoundingClientRect();
-    startPoint = {
-        x: e.clientX - rect.left,
-        y: e.clientY - rect.top
-    };
+    startPoint = canvasPoint(e);
     endPoint = {};
-    saveLineBtn.disabled = true;
 });
 
 drawCanvas.addEventListener('mouseup', (e) => {
     if (isDrawing) {
         isDrawing = false;
-        const rect = drawCanvas.getBoundingClientRect();
-        endPoint = {
-            x: e.clientX - rect.left,
-            y: e.clientY - rect.top
-        };
-        drawLineWithLabels(startPoint, endPoint);
+        endPoint = canvasPoint(e);
+        if (startPoint.x === endPoint.x && startPoint.y === endPoint.y) return;
+        geometry.lines.push({
+            name: nextShapeName('line'),
+            x1: startPoint.x / drawCanvas.width,
+            y1: startPoint.y / drawCanvas.height,
+            x2: endPoint.x / drawCanvas.width,
+            y2: endPoint.y / drawCanvas.height
+        });
+        renderShapeList();
+        renderGeometry();
         saveLineBtn.disabled = false;
     }
 });
 
 drawCanvas.addEventListener('mousemove', (e) => {
     if (!isDrawing) return;
-    const rect = drawCanvas.getBoundingClientRect();
-    const currentPoint = {
-        x: e.clientX - rect.left,
-        y: e.clientY - rect.top
-    };
-    clearCanvas();
-    drawLineWithLabels(startPoint, currentPoint);
+    renderGeometry([startPoint, canvasPoint(e)]);
+});
+
+// Mode zona: klik menambah titik, klik ganda menutup polygon (minimal 3 titik)
+drawCanvas.addEventListener('click', (e) => {
+    if (!currentCamId || shapeModeSelect.value !== 'zone') return;
+    zonePoints.push(canvasPoint(e));
+    renderGeometry();
+});
+
+drawCanvas.addEventListener('dblclick', () => {
+    if (shapeModeSelect.value !== 'zone') return;
+    // Klik ganda juga memicu dua event click; titik duplikat terakhir dibuang
+    zonePoints = zonePoints.filter((p, i) => i === 0 || p.x !== zonePoints[i - 1].x || p.y !== zonePoints[i - 1].y);
+    if (zonePoints.length < 3) {
+        addLog('ERROR: Zona membutuhkan minimal 3 titik.');
+        return;
+    }
+    geometry.zones.push({
+        name: nextShapeName('zone'),
+        points: zonePoints.map(p => [p.x / drawCanvas.width, p.y / drawCanvas.height])
+    });
+    zonePoints = [];
+    renderShapeList();
+    renderGeometry();
+    saveLineBtn.disabled = false;
 });
 
 // Menangani tombol "Simpan Garis"
@@ -264,25 +388,15 @@ saveLineBtn.addEventListener('click', () => {
         addLog('ERROR: Pilih kamera terlebih dahulu.');
         return;
     }
-    if (Object.keys(startPoint).length === 0 || Object.keys(endPoint).length === 0) {
-        addLog('ERROR: Tidak ada garis untuk disimpan. Gambar garis terlebih dahulu.');
+    if (geometry.lines.length === 0 && geometry.zones.length === 0) {
+        addLog('ERROR: Tidak ada garis atau zona untuk disimpan. Gambar terlebih dahulu.');
         return;
     }
 
-    const videoWidth = videoFeed.offsetWidth;
-    const videoHeight = videoFeed.offsetHeight;
-
-    const lineCoords = {
-        x1: startPoint.x / videoWidth,
-        y1: startPoint.y / videoHeight,
-        x2: endPoint.x / videoWidth,
-        y2: endPoint.y / videoHeight
-    };
-    
-    addLog('Mengirim koordinat garis ke server...');
+    addLog('Mengirim geometri garis dan zona ke server...');
     socket.emit('save_counting_line', {
         cam_id: currentCamId,
-        line_coords: lineCoords
+        geometry: geometry
     });
 });
 
@@ -296,6 +410,9 @@ clearLineBtn.addEventListener('click', () => {
     clearCanvas();
     startPoint = {};
     endPoint = {};
+    geometry = { lines: [], zones: [] };
+    zonePoints = [];
+    renderShapeList();
     saveLineBtn.disabled = true;
     clearLineBtn.disabled = true;
     addLog('Garis berhasil dihapus.');
@@ -314,20 +431,14 @@ socket.on('log', (data) => {
 });
 
 socket.on('line_saved_success', (data) => {
-    addLog(`BERHASIL: Garis disimpan untuk kamera ${data.cam_id}.`);
+    addLog(`BERHASIL: Garis dan zona disimpan untuk kamera ${data.cam_id}.`);
     const selectedOption = cameraSelect.options[cameraSelect.selectedIndex];
-    // Simpan koordinat baru ke dataset
+    // Simpan geometri baru ke dataset
     selectedOption.dataset.lineCoords = JSON.stringify(data.line_coords);
-    
-    // Perbarui startPoint dan endPoint saat berhasil disimpan
-    if (videoFeed.readyState >= 2) {
-        drawExistingLine(data.line_coords);
-    } else {
-        // Jika video belum dimuat, tunggu sampai siap
-        videoFeed.addEventListener('loadeddata', () => {
-            drawExistingLine(data.line_coords);
-        }, { once: true });
-    }
+    selectedOption.dataset.geometry = JSON.stringify(data.geometry);
+    geometry = loadGeometry(selectedOption);
+    renderShapeList();
+    drawExistingGeometry();
 });
 
 socket.on('line_cleared_success', (data) => {
@@ -335,6 +446,7 @@ socket.on('line_cleared_success', (data) => {
     const selectedOption = cameraSelect.options[cameraSelect.selectedIndex];
     // Set dataset ke 'null' untuk konsistensi dengan logika awal
     selectedOption.dataset.lineCoords = 'null';
+    selectedOption.dataset.geometry = 'null';
     saveLineBtn.disabled = true;
     clearLineBtn.disabled = true;
     addLog('Garis berhasil dihapus.');
@@ -353,10 +465,8 @@ window.onload = () => {
 
 window.addEventListener('resize', () => {
     resizeCanvas();
-    const selectedOption = cameraSelect.options[cameraSelect.selectedIndex];
-    const lineCoords = JSON.parse(selectedOption.dataset.lineCoords || 'null');
-    if (lineCoords) {
-        drawExistingLine(lineCoords);
+    if (geometry.lines.length || geometry.zones.length) {
+        drawExistingGeometry();
     }
 });
 
@@ -0,0 +1,51 @@
+"""Kolom motion gate per kamera
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def existing_columns(table):
+    """
+    Nama kolom yang sudah ada, atau None jika tabel belum ada. Database baru
+    dibuat oleh db.create_all() langsung dengan semua kolom model, jadi
+    migrasi hanya menambahkan kolom yang belum ada pada database lama.
+    """
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table(table):
+        return None
+    return {column['name'] for column in inspector.get_columns(table)}
+
+
+def upgrade():
+    columns = existing_columns('camera')
+    if columns is None:
+        return
+    with op.batch_alter_table('camera') as batch_op:
+        if 'motion_gate' not in columns:
+            batch_op.add_column(sa.Column('motion_gate', sa.Boolean(), nullable=True, server_default=sa.text('1')))
+        if 'motion_pixel_threshold' not in columns:
+            batch_op.add_column(sa.Column('motion_pixel_threshold', sa.Integer(), nullable=True, server_default='25'))
+        if 'motion_area_threshold' not in columns:
+            batch_op.add_column(sa.Column('motion_area_threshold', sa.Float(), nullable=True, server_default='0.002'))
+        if 'motion_keyframe_interval' not in columns:
+            batch_op.add_column(sa.Column('motion_keyframe_interval', sa.Integer(), nullable=True, server_default='30'))
+
+
+def downgrade():
+    with op.batch_alter_table('camera') as batch_op:
+        batch_op.drop_column('motion_keyframe_interval')
+        batch_op.drop_column('motion_area_threshold')
+        batch_op.drop_column('motion_pixel_threshold')
+        batch_op.drop_column('motion_gate')
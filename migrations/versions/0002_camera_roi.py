@@ -0,0 +1,48 @@
+"""Kolom ROI deteksi per kamera
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def existing_columns(table):
+    """
+    Nama kolom yang sudah ada, atau None jika tabel belum ada. Database baru
+    dibuat oleh db.create_all() langsung dengan semua kolom model, jadi
+    migrasi hanya menambahkan kolom yang belum ada pada database lama.
+    """
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table(table):
+        return None
+    return {column['name'] for column in inspector.get_columns(table)}
+
+
+def upgrade():
+    columns = existing_columns('camera')
+    if columns is None:
+        return
+    with op.batch_alter_table('camera') as batch_op:
+        if 'roi_mode' not in columns:
+            batch_op.add_column(sa.Column('roi_mode', sa.String(length=20), nullable=True, server_default='off'))
+        if 'roi_padding' not in columns:
+            batch_op.add_column(sa.Column('roi_padding', sa.Float(), nullable=True, server_default='0.2'))
+        if 'roi_polygon' not in columns:
+            batch_op.add_column(sa.Column('roi_polygon', sa.Text(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('camera') as batch_op:
+        batch_op.drop_column('roi_polygon')
+        batch_op.drop_column('roi_padding')
+        batch_op.drop_column('roi_mode')
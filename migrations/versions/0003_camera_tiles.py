@@ -0,0 +1,48 @@
+"""Kolom tile deteksi per kamera
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def existing_columns(table):
+    """
+    Nama kolom yang sudah ada, atau None jika tabel belum ada. Database baru
+    dibuat oleh db.create_all() langsung dengan semua kolom model, jadi
+    migrasi hanya menambahkan kolom yang belum ada pada database lama.
+    """
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table(table):
+        return None
+    return {column['name'] for column in inspector.get_columns(table)}
+
+
+def upgrade():
+    columns = existing_columns('camera')
+    if columns is None:
+        return
+    with op.batch_alter_table('camera') as batch_op:
+        if 'tile_rows' not in columns:
+            batch_op.add_column(sa.Column('tile_rows', sa.Integer(), nullable=True, server_default='1'))
+        if 'tile_cols' not in columns:
+            batch_op.add_column(sa.Column('tile_cols', sa.Integer(), nullable=True, server_default='1'))
+        if 'tile_overlap' not in columns:
+            batch_op.add_column(sa.Column('tile_overlap', sa.Float(), nullable=True, server_default='0.2'))
+
+
+def downgrade():
+    with op.batch_alter_table('camera') as batch_op:
+        batch_op.drop_column('tile_overlap')
+        batch_op.drop_column('tile_cols')
+        batch_op.drop_column('tile_rows')
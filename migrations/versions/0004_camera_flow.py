@@ -0,0 +1,45 @@
+"""Kolom optical flow per kamera
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def existing_columns(table):
+    """
+    Nama kolom yang sudah ada, atau None jika tabel belum ada. Database baru
+    dibuat oleh db.create_all() langsung dengan semua kolom model, jadi
+    migrasi hanya menambahkan kolom yang belum ada pada database lama.
+    """
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table(table):
+        return None
+    return {column['name'] for column in inspector.get_columns(table)}
+
+
+def upgrade():
+    columns = existing_columns('camera')
+    if columns is None:
+        return
+    with op.batch_alter_table('camera') as batch_op:
+        if 'flow_tracking' not in columns:
+            batch_op.add_column(sa.Column('flow_tracking', sa.Boolean(), nullable=True, server_default=sa.text('0')))
+        if 'flow_max_interval' not in columns:
+            batch_op.add_column(sa.Column('flow_max_interval', sa.Integer(), nullable=True, server_default='10'))
+
+
+def downgrade():
+    with op.batch_alter_table('camera') as batch_op:
+        batch_op.drop_column('flow_max_interval')
+        batch_op.drop_column('flow_tracking')
@@ -0,0 +1,50 @@
+"""Geometri hitung per kamera dan nama garis per hitungan
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def existing_columns(table):
+    """
+    Nama kolom yang sudah ada, atau None jika tabel belum ada. Database baru
+    dibuat oleh db.create_all() langsung dengan semua kolom model, jadi
+    migrasi hanya menambahkan kolom yang belum ada pada database lama.
+    """
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table(table):
+        return None
+    return {column['name'] for column in inspector.get_columns(table)}
+
+
+def upgrade():
+    columns = existing_columns('camera')
+    if columns is not None:
+        with op.batch_alter_table('camera') as batch_op:
+            if 'counting_geometry' not in columns:
+                batch_op.add_column(sa.Column('counting_geometry', sa.Text(), nullable=True))
+
+    columns = existing_columns('count')
+    if columns is not None:
+        with op.batch_alter_table('count') as batch_op:
+            if 'line_name' not in columns:
+                batch_op.add_column(sa.Column('line_name', sa.String(length=100), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('camera') as batch_op:
+        batch_op.drop_column('counting_geometry')
+
+    with op.batch_alter_table('count') as batch_op:
+        batch_op.drop_column('line_name')
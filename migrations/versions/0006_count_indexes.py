@@ -0,0 +1,47 @@
+"""Index tabel count untuk filter rentang timestamp
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = (
+    ('ix_count_camera_timestamp_direction', ['camera_id', 'timestamp', 'direction']),
+    ('ix_count_timestamp', ['timestamp']),
+)
+
+
+def existing_indexes(table):
+    """
+    Nama index yang sudah ada, atau None jika tabel belum ada. Tabel baru
+    dari db.create_all() sudah memiliki index yang didefinisikan di model.
+    """
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table(table):
+        return None
+    return {index['name'] for index in inspector.get_indexes(table)}
+
+
+def upgrade():
+    indexes = existing_indexes('count')
+    if indexes is None:
+        return
+    for name, columns in INDEXES:
+        if name not in indexes:
+            op.create_index(name, 'count', columns)
+
+
+def downgrade():
+    for name, _ in reversed(INDEXES):
+        op.drop_index(name, table_name='count')
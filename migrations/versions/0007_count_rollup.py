@@ -0,0 +1,39 @@
+"""Tabel rollup hitungan per menit/jam/hari
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # db.create_all() membuat tabel ini lebih dulu saat aplikasi dijalankan
+    if sa.inspect(op.get_bind()).has_table('count_rollup'):
+        return
+    op.create_table(
+        'count_rollup',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('granularity', sa.String(length=10), nullable=False),
+        sa.Column('bucket', sa.DateTime(), nullable=False),
+        sa.Column('camera_id', sa.Integer(), nullable=True),
+        sa.Column('direction', sa.String(length=10), nullable=False),
+        sa.Column('total', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['camera_id'], ['camera.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_count_rollup_bucket', 'count_rollup', ['granularity', 'bucket', 'camera_id', 'direction'], unique=True)
+
+
+def downgrade():
+    op.drop_index('ix_count_rollup_bucket', table_name='count_rollup')
+    op.drop_table('count_rollup')
@@ -8,12 +8,13 @@ from os import environ
 from sys import exit
 from apps import create_app, socketio, db
 from apps.config import config_dict
-from flask_migrate import Migrate
+from flask_migrate import Migrate, upgrade
 from flask_minify import Minify
 import os
 import threading
 import logging
 from apps.home.models import Camera, AlarmLog
+from apps.home.rollup import backfill_rollups
 from flask import Flask
 
 # Inisialisasi Logger
@@ -29,7 +30,8 @@ app_config = config_dict[config_mode]
 app = create_app(app_config)
 
 # Database Migration
-Migrate(app, db)
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+Migrate(app, db, directory=MIGRATIONS_DIR)
 
 # Minify jika production
 if not DEBUG:
@@ -46,7 +48,14 @@ if __name__ == "__main__":
     with app.app_context():
         # Buat tabel database jika belum ada
         db.create_all()
-        from apps.home.routes import client_sids, camera_threads, camera_stop_events, ai_stream, background_data_sender, dashboard_stop_event
+        # Kolom dan index baru untuk tabel yang dibuat oleh versi sebelumnya (flask db upgrade)
+        upgrade(directory=MIGRATIONS_DIR)
+        # Rollup hitungan dibangun dari data lama jika tabelnya masih kosong
+        backfill_rollups()
+        from apps.home.routes import client_sids, camera_threads, camera_stop_events, ai_stream, start_dashboard_sender
+        from apps.home.dashboard_feed import dashboard_feed
+        # Snapshot dasbor dimuat sebelum thread AI mulai mencatat hitungan
+        dashboard_feed.seed(app)
          
         # Mulai stream untuk setiap kamera yang is_ai_enabled = True
         cameras = Camera.query.filter_by(is_ai_enabled=True).all()
@@ -62,11 +71,8 @@ if __name__ == "__main__":
                 logger.info(f"✅ AI thread for camera {cam.id} started automatically on startup.")
 
         # --- Tambahan Kode untuk Mengatasi Masalah Dasbor ---
-        logger.info("✅ Starting dashboard data sender thread...")
-        # Perhatikan argumen `app` yang ditambahkan di sini
-        dashboard_thread = threading.Thread(target=background_data_sender, args=(app, dashboard_stop_event,))
-        dashboard_thread.daemon = True
-        dashboard_thread.start()
+        # Thread menunggu tanpa polling sampai ada klien /dashboard yang terhubung
+        start_dashboard_sender(app)
         # ---------------------------------------------------
 
     socketio.run(app, host="0.0.0.0", port=5001, debug=DEBUG)
\ No newline at end of file